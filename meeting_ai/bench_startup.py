@@ -0,0 +1,103 @@
+"""
+Measure the import cost of the Streamlit app's startup path.
+
+Runs ``python -X importtime`` in a fresh interpreter on the top-level imports of
+``record.py`` (what Streamlit executes before the first page renders) and
+reports the total import time and the slowest packages. Fails when a heavy ML
+package is imported at startup or the total exceeds ``--budget-ms``, so the
+check can run in CI to catch regressions.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --module transcribe_whisper --top 15
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+# Packages that must only be imported when a job or summary actually runs
+HEAVY_PACKAGES = ("torch", "whisper", "faster_whisper", "nemo", "omegaconf", "langchain_core", "llama_index")
+
+
+def startup_imports(script):
+    """Top-level import statements of ``script`` as source lines."""
+    with open(script) as f:
+        tree = ast.parse(f.read(), filename=script)
+    return [
+        ast.unparse(node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def import_times(code, runs=1):
+    """
+    Run ``code`` under ``-X importtime`` and parse the report.
+
+    Returns:
+    - dict[str, int]: Cumulative microseconds per imported module (best of ``runs``).
+    """
+    best = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        times = {}
+        for line in proc.stderr.splitlines():
+            # "import time:   self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Nested imports are indented by two spaces per level
+            times[name[1:].rstrip()] = int(cumulative)
+        for name, us in times.items():
+            best[name] = min(us, best.get(name, us))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app startup import time.")
+    parser.add_argument("--script", default="record.py", help="Script whose top-level imports are timed")
+    parser.add_argument("--module", default=None, help="Time `import MODULE` instead of a script")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=0, help="Fail above this total (0 = no budget)")
+    args = parser.parse_args()
+
+    code = f"import {args.module}" if args.module else "\n".join(startup_imports(args.script))
+    times = import_times(code, args.runs)
+    # Modules the bare interpreter imports anyway (site, encodings, ...)
+    baseline = import_times("pass")
+
+    # Non-indented entries are imported directly by the code and sum to the total
+    roots = {
+        name: us for name, us in times.items() if not name.startswith(" ") and name not in baseline
+    }
+    total_ms = sum(roots.values()) / 1000
+    print(f"{'cumulative ms':>14} | module")
+    for name, us in sorted(roots.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"{us / 1000:>14.1f} | {name}")
+    print(f"{total_ms:>14.1f} | total ({args.module or args.script})")
+
+    heavy = sorted(
+        {name.strip().split(".")[0] for name in times} & set(HEAVY_PACKAGES)
+    )
+    failed = False
+    if heavy and not args.module:
+        print(f"FAIL: heavy packages imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: startup imports took {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark the summarizer against a local mock Ollama server.
+
+The mock answers ``/api/chat`` with schema-shaped JSON after a fixed latency,
+serving up to ``--server-parallel`` requests at once (like OLLAMA_NUM_PARALLEL),
+so map-phase speedups can be measured without a GPU or a real model.
+``--malformed`` makes that share of replies truncated or wrapped in prose, to
+exercise the structured-output repair path.
+
+Each concurrency level gets a fresh, empty LLM cache, so every level makes the
+same LLM calls instead of replaying the previous level's answers.
+
+Usage:
+    python bench_summarizer.py --rows 120 --latency 0.5 --concurrency 1 4 8
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+
+def _mock_value(schema, defs):
+    """Build a minimal value that satisfies a JSON schema."""
+    if "$ref" in schema:
+        return _mock_value(defs[schema["$ref"].split("/")[-1]], defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            return _mock_value(schema[key][0], defs)
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {
+            name: _mock_value(prop, defs)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    return {
+        "string": "mock summary text",
+        "number": 0.0,
+        "integer": 0,
+        "boolean": False,
+        "array": [],
+    }.get(kind)
+
+
+def _corrupt(content):
+    """Truncate a JSON reply or wrap it in chatty prose, like small models sometimes do."""
+    if random.random() < 0.5:
+        return content[: max(len(content) * 4 // 5, 1)]
+    return f"Sure! Here is the summary:\n```json\n{content}\n```\nLet me know if you need more."
+
+
+def start_mock_ollama(port=0, latency=0.5, parallel=4, malformed=0.0):
+    """
+    Start a mock Ollama ``/api/chat`` server in a daemon thread.
+
+    Returns:
+    - (ThreadingHTTPServer, dict): The server (``server_address`` has the port)
+      and a stats dict with the number of chat requests served and corrupted, and
+      the ``options`` each request carried.
+    """
+    slots = threading.BoundedSemaphore(parallel)
+    stats = {"requests": 0, "malformed": 0, "options": []}
+    stats_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.startswith("/api/chat"):
+                self.send_error(404)
+                return
+
+            with slots:
+                time.sleep(latency)
+            with stats_lock:
+                stats["requests"] += 1
+                stats["options"].append(body.get("options") or {})
+
+            message = {"role": "assistant", "content": ""}
+            if body.get("tools"):
+                fn = body["tools"][0]["function"]
+                params = fn.get("parameters", {})
+                message["tool_calls"] = [
+                    {"function": {"name": fn["name"], "arguments": _mock_value(params, params.get("$defs", {}))}}
+                ]
+            else:
+                schema = body.get("format") if isinstance(body.get("format"), dict) else {}
+                message["content"] = json.dumps(_mock_value(schema, schema.get("$defs", {})) if schema else {})
+                if random.random() < malformed:
+                    message["content"] = _corrupt(message["content"])
+                    with stats_lock:
+                        stats["malformed"] += 1
+
+            response = {
+                "model": body.get("model", "mock"),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": message,
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int(latency * 1e9),
+                "prompt_eval_count": 1,
+                "eval_count": 1,
+            }
+            payload = (json.dumps(response) + "\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-ollama").start()
+    return server, stats
+
+
+def synthetic_transcript(rows, speakers=3, words=40):
+    """A transcript DataFrame shaped like diarize_split_transcribe output."""
+    records = []
+    for n in range(rows):
+        records.append(
+            {
+                "Speaker": f"speaker_{n % speakers}",
+                "Start Time": n * 10.0,
+                "End Time": n * 10.0 + 9.5,
+                "Whisper Transcription": " ".join(f"word{n}_{i}" for i in range(words)),
+            }
+        )
+    return pd.DataFrame.from_records(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark summarizer map-phase concurrency.")
+    parser.add_argument("--rows", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mock LLM seconds per call")
+    parser.add_argument("--server-parallel", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of replies to corrupt")
+    args = parser.parse_args()
+
+    import summarizer
+    from llm_cache import LLMCache
+
+    server, stats = start_mock_ollama(
+        latency=args.latency, parallel=args.server_parallel, malformed=args.malformed
+    )
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    df = synthetic_transcript(args.rows)
+
+    cache_dir = tempfile.TemporaryDirectory(prefix="bench_summarizer_")
+    baseline = None
+    print(f"{'concurrency':>12} | {'llm calls':>9} | {'cache hits':>10} | {'seconds':>8} | {'speedup':>7}")
+    for concurrency in args.concurrency:
+        # Fresh cache per level: a shared one would answer later levels without the LLM
+        cache = LLMCache(os.path.join(cache_dir.name, f"level_{concurrency}.sqlite3"))
+        summarizer._LLM_CACHE = cache
+        before = stats["requests"]
+        t0 = time.perf_counter()
+        summarizer.generate_summary(df, base_url=base_url, concurrency=concurrency)
+        elapsed = time.perf_counter() - t0
+        baseline = baseline or elapsed
+        print(
+            f"{concurrency:>12} | {stats['requests'] - before:>9} | {cache.hits:>10} | "
+            f"{elapsed:>8.2f} | {baseline / elapsed:>6.2f}x"
+        )
+
+    if args.malformed:
+        print(f"{stats['malformed']} of {stats['requests']} replies were malformed")
+    server.shutdown()
+    cache_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
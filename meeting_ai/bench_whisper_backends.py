@@ -0,0 +1,94 @@
+"""
+Side-by-side benchmark of the Whisper backends in transcribe_whisper.py.
+
+Each backend runs in its own spawned process so that peak memory is measured
+in isolation. Reports load time, transcription time, real-time factor
+(processing seconds per audio second, lower is better) and peak memory.
+
+Usage:
+    python bench_whisper_backends.py static/taunt.wav --backends openai faster-whisper
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+
+def _run_backend(backend, model_name, audio_path, repeat, queue):
+    try:
+        import torch
+        from pydub import AudioSegment
+        from transcribe_whisper import get_whisper_model
+
+        audio_s = len(AudioSegment.from_file(audio_path)) / 1000.0
+
+        t0 = time.perf_counter()
+        model = get_whisper_model(model_name=model_name, backend=backend)
+        load_s = time.perf_counter() - t0
+
+        runs = []
+        text = ""
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            text = model.transcribe(audio_path, language="en")["text"]
+            runs.append(time.perf_counter() - t0)
+
+        best_s = min(runs)
+        queue.put(
+            {
+                "backend": backend,
+                "model": model_name,
+                "audio_s": round(audio_s, 2),
+                "load_s": round(load_s, 2),
+                "transcribe_s": round(best_s, 2),
+                "mean_s": round(sum(runs) / len(runs), 2),
+                "rtf": round(best_s / audio_s, 3) if audio_s else None,
+                # ru_maxrss is reported in kilobytes on Linux
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "peak_gpu_mb": round(torch.cuda.max_memory_allocated() / 2**20, 1)
+                if torch.cuda.is_available()
+                else None,
+                "chars": len(text),
+            }
+        )
+    except Exception as e:
+        queue.put({"backend": backend, "model": model_name, "error": f"{type(e).__name__}: {e}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Whisper transcription backends.")
+    parser.add_argument("audio", nargs="?", default="static/taunt.wav")
+    parser.add_argument("--backends", nargs="+", default=["openai", "faster-whisper"])
+    parser.add_argument("--model", default=None, help="Model name (defaults to WHISPER_MODEL)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in args.backends:
+        queue = ctx.Queue()
+        proc = ctx.Process(
+            target=_run_backend, args=(backend, args.model, args.audio, args.repeat, queue)
+        )
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    if args.json:
+        for r in results:
+            print(json.dumps(r))
+        return
+
+    columns = ["backend", "audio_s", "load_s", "transcribe_s", "rtf", "peak_rss_mb", "peak_gpu_mb"]
+    print(" | ".join(f"{c:>14}" for c in columns))
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:>14} | error: {r['error']}")
+            continue
+        print(" | ".join(f"{str(r[c]):>14}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
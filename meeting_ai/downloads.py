@@ -0,0 +1,259 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import mimetypes
+import os
+import re
+import secrets
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+# Files are served only from DOWNLOAD_FOLDER, on DOWNLOAD_PORT (0 disables), through
+# short-lived HMAC-signed links. The signing key is DOWNLOAD_SECRET or, when that is
+# unset, a random key kept in DOWNLOAD_SECRET_FILE, so every process and replica
+# sharing the uploads volume accepts the same links. The folder sits next to the
+# uploads so staging a recording is a hard link, not a copy.
+DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER", os.path.join("/tmp", "uploads", "downloads"))
+DOWNLOAD_PORT = int(os.getenv("DOWNLOAD_PORT", "3881"))
+DOWNLOAD_BASE_URL = os.getenv("DOWNLOAD_BASE_URL", "")
+DOWNLOAD_TOKEN_TTL = int(os.getenv("DOWNLOAD_TOKEN_TTL", "900"))
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_SECRET_FILE = os.getenv(
+    "DOWNLOAD_SECRET_FILE", os.path.join(os.path.dirname(DOWNLOAD_FOLDER), ".download_secret")
+)
+
+
+def load_secret(path=DOWNLOAD_SECRET_FILE):
+    """
+    Read the signing key from ``path``, creating it with a random key on first use.
+
+    Falls back to a per-process key (links then only work in this process) when
+    the file cannot be created or read.
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            # O_EXCL: when several processes start at once, exactly one writes the key
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+        except FileExistsError:
+            pass
+        for _ in range(50):
+            with open(path) as f:
+                key = f.read().strip()
+            if key:
+                return key.encode()
+            time.sleep(0.02)  # another process is still writing it
+        raise OSError(f"{path} is empty")
+    except OSError as e:
+        print(f">>> Download links limited to this process, no shared key: {e}")
+        return secrets.token_bytes(32)
+
+
+DOWNLOAD_SECRET = os.getenv("DOWNLOAD_SECRET", "").encode() or load_secret()
+
+# Touched in a staged file's directory whenever a link to it is signed
+STAGED_MARKER = ".staged"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def sign_token(rel_path, ttl=DOWNLOAD_TOKEN_TTL, secret=DOWNLOAD_SECRET):
+    """Signed token granting access to ``rel_path`` (inside DOWNLOAD_FOLDER) for ``ttl`` seconds."""
+    payload = _b64(json.dumps({"p": rel_path, "e": int(time.time() + ttl)}).encode())
+    signature = _b64(hmac.new(secret, payload.encode(), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+
+def verify_token(token, secret=DOWNLOAD_SECRET):
+    """Return the relative path a token grants, or None if it is forged or expired."""
+    try:
+        payload, signature = token.split(".", 1)
+        expected = _b64(hmac.new(secret, payload.encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            return None
+        claims = json.loads(_unb64(payload))
+    except (ValueError, TypeError):
+        return None
+    # A correctly signed payload could still be any JSON value
+    if not isinstance(claims, dict) or not isinstance(claims.get("p"), str):
+        return None
+    if not isinstance(claims.get("e"), (int, float)) or claims["e"] < time.time():
+        return None
+    return claims["p"]
+
+
+def download_url(rel_path, base_url=None, ttl=DOWNLOAD_TOKEN_TTL):
+    """Signed URL for a file staged in DOWNLOAD_FOLDER."""
+    base_url = (base_url or DOWNLOAD_BASE_URL or f"http://localhost:{DOWNLOAD_PORT}").rstrip("/")
+    return f"{base_url}/download/{sign_token(rel_path, ttl)}/{quote(os.path.basename(rel_path))}"
+
+
+def cleanup_downloads(root=DOWNLOAD_FOLDER, max_age=DOWNLOAD_TOKEN_TTL):
+    """
+    Remove staged files whose newest link has expired.
+
+    Each staged file has its own directory in ``root``; its STAGED_MARKER is
+    touched every time a link is signed, so a directory whose marker is older
+    than ``max_age`` can no longer be downloaded. Hard links to deleted
+    recordings, and copies made across filesystems, would otherwise stay on disk.
+
+    Returns:
+    - int: Number of staged directories removed.
+    """
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(root):
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            staged_at = os.stat(os.path.join(entry.path, STAGED_MARKER)).st_mtime
+        except FileNotFoundError:
+            staged_at = entry.stat().st_mtime
+        if staged_at < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header.
+
+    Returns:
+    - tuple[int, int] | None | False: Inclusive (start, end) byte offsets, None when
+      the whole file should be sent, False when the range is not satisfiable.
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match:
+        # Missing, multi-range or malformed headers get the full file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        # No byte of an empty file can be addressed
+        return False
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def start_download_server(port=DOWNLOAD_PORT, root=DOWNLOAD_FOLDER):
+    """
+    Serve signed ``/download/<token>/<name>`` links from ``root`` in a daemon thread.
+
+    Files are streamed in DOWNLOAD_CHUNK_SIZE pieces with single-range support, so
+    memory stays flat regardless of file size.
+    """
+    root = os.path.realpath(root)
+    removed = cleanup_downloads(root)
+    if removed:
+        print(f">>> Removed {removed} expired downloads from {root}")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _resolve(self):
+            parts = self.path.split("?")[0].split("/")
+            if len(parts) < 3 or parts[1] != "download":
+                return None
+            rel_path = verify_token(parts[2])
+            if rel_path is None:
+                return None
+            path = os.path.realpath(os.path.join(root, rel_path))
+            # Tokens only ever name files inside root, but don't trust that blindly
+            if not path.startswith(root + os.sep) or not os.path.isfile(path):
+                return None
+            return path
+
+        def _send(self, body):
+            path = self._resolve()
+            if path is None:
+                self.send_error(404)
+                return
+
+            size = os.path.getsize(path)
+            byte_range = parse_range(self.headers.get("Range"), size)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = max(end - start + 1, 0)
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(os.path.basename(path))}")
+            self.send_header("Cache-Control", "private, no-store")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if not body:
+                return
+
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+
+        def do_GET(self):
+            try:
+                self._send(body=True)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client cancelled the download
+
+        def do_HEAD(self):
+            self._send(body=False)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="download-server").start()
+    print(f">>> Download server listening on :{server.server_address[1]}/download")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve signed download links from DOWNLOAD_FOLDER.")
+    parser.add_argument("--port", type=int, default=DOWNLOAD_PORT or 3881)
+    parser.add_argument("--root", default=DOWNLOAD_FOLDER)
+    args = parser.parse_args()
+
+    start_download_server(args.port, args.root)
+    threading.Event().wait()
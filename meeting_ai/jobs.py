@@ -0,0 +1,482 @@
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+import metrics
+
+# Job database location and worker settings (overridable from the environment)
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("/tmp", "uploads", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5.0"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60.0"))
+# A job whose worker died this many times is failed instead of re-queued (e.g. OOM, CUDA crash)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Summarize transcripts live while they are transcribed (needs Ollama reachable from workers)
+SUMMARY_LIVE = os.getenv("SUMMARY_LIVE", "0") == "1"
+LIVE_SUMMARY_FILE = "live_summary.json"
+# Preload the transcription models in each worker as soon as it starts
+WARMUP = os.getenv("WARMUP", "0") == "1"
+
+# Build the transcript embedding index (transcript_index.py) when a transcription finishes
+INDEX_TRANSCRIPTS = os.getenv("INDEX_TRANSCRIPTS", "1") == "1"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    message TEXT,
+    progress REAL DEFAULT 0,
+    worker TEXT,
+    attempts INTEGER DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs (dedupe_key);
+"""
+
+
+class JobQueue:
+    """
+    Durable FIFO job queue stored in a local SQLite database.
+
+    The database is the only shared state, so the Streamlit app, embedded
+    worker processes and standalone workers (``python jobs.py``) can all use
+    the same queue, and job status survives page reloads and server restarts.
+    """
+
+    def __init__(self, db_path=JOB_DB_PATH):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind, payload, dedupe_key=None):
+        """
+        Enqueue a job and return its id.
+
+        If ``dedupe_key`` is given and a queued or running job with the same key
+        already exists, that job's id is returned instead of adding a duplicate.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dedupe_key is not None:
+                    row = conn.execute(
+                        "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) "
+                        "ORDER BY created_at DESC LIMIT 1",
+                        (dedupe_key, *ACTIVE_STATES),
+                    ).fetchone()
+                    if row is not None:
+                        conn.execute("COMMIT")
+                        return row["id"]
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, dedupe_key, status, payload, message, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, dedupe_key, QUEUED, json.dumps(payload), "Queued", time.time()),
+                )
+                conn.execute("COMMIT")
+                return job_id
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list_jobs(self, limit=20):
+        """Return the most recently created jobs, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def queue_position(self, job_id):
+        """Number of queued jobs ahead of ``job_id`` (0 when it is next or running)."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE status = ? AND created_at < "
+                "(SELECT created_at FROM jobs WHERE id = ?)",
+                (QUEUED, job_id),
+            ).fetchone()
+        return row["n"] if row else 0
+
+    def _recover(self, where, params, max_attempts):
+        """Re-queue running jobs matching ``where``, failing those out of attempts."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = conn.execute(
+                    f"UPDATE jobs SET status = ?, worker = NULL, finished_at = ?, error = "
+                    f"'Worker lost ' || attempts || ' times while running this job', message = ? "
+                    f"WHERE status = ? AND attempts >= ? AND {where}",
+                    (FAILED, now, "Failed: worker kept crashing", RUNNING, max_attempts, *params),
+                ).rowcount
+                requeued = conn.execute(
+                    f"UPDATE jobs SET status = ?, worker = NULL, message = ? WHERE status = ? AND {where}",
+                    (QUEUED, "Re-queued after worker loss", RUNNING, *params),
+                ).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return requeued + failed
+
+    def requeue_stale(self, stale_after=JOB_STALE_AFTER, max_attempts=JOB_MAX_ATTEMPTS):
+        """
+        Put running jobs whose worker stopped heartbeating back on the queue.
+
+        A job that has already been started ``max_attempts`` times is marked
+        failed instead, so a job that crashes its worker is not retried forever.
+        """
+        cutoff = time.time() - stale_after
+        return self._recover("COALESCE(heartbeat_at, started_at, 0) < ?", (cutoff,), max_attempts)
+
+    def requeue_worker(self, worker_id, max_attempts=JOB_MAX_ATTEMPTS):
+        """Recover the jobs of a worker known to be dead, without waiting for them to go stale."""
+        return self._recover("worker = ?", (worker_id,), max_attempts)
+
+    def claim(self, worker_id):
+        """Atomically move the oldest queued job to running and return it."""
+        self.requeue_stale()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, heartbeat_at = ?, message = ? WHERE id = ?",
+                    (RUNNING, worker_id, now, now, "Starting...", row["id"]),
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(job)
+
+    def update(self, job_id, **fields):
+        """Update arbitrary job columns; ``result`` is stored as JSON."""
+        if not fields:
+            return
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def heartbeat(self, job_id):
+        self.update(job_id, heartbeat_at=time.time())
+
+    def complete(self, job_id, result):
+        self.update(
+            job_id, status=DONE, result=result, progress=1.0,
+            message="Completed", finished_at=time.time(),
+        )
+
+    def fail(self, job_id, error):
+        self.update(job_id, status=FAILED, error=error, finished_at=time.time())
+
+
+class JobProgress:
+    """
+    Progress sink that mimics the parts of ``st.status`` used by the pipeline
+    (``write`` and ``progress``) and records them on the job row instead.
+    """
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.last_message = None
+
+    def write(self, message):
+        self.last_message = str(message)
+        self.queue.update(self.job_id, message=self.last_message, heartbeat_at=time.time())
+
+    def progress(self, value, text=None):
+        fields = {"progress": float(value), "heartbeat_at": time.time()}
+        if text:
+            self.last_message = " ".join(str(text).split())
+            fields["message"] = self.last_message
+        self.queue.update(self.job_id, **fields)
+        return self
+
+
+# ---------------------------------------------------------------------------
+# Job handlers
+# ---------------------------------------------------------------------------
+
+
+def write_live_summary(path, summary, end_time):
+    """Atomically write the rolling MeetingSummary so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"end_time": end_time, "summary": summary.model_dump()}, f)
+    os.replace(tmp_path, path)
+
+
+def run_transcription_job(payload, progress):
+    """
+    Convert the uploaded recording and run diarization + Whisper transcription.
+
+    Heavy ML modules are imported here so that only worker processes pay for them.
+    """
+    from transcribe_whisper import diarize_split_transcribe
+    from utils import convert_audio_to_mono_wav_file, convert_video_to_audio
+
+    output_dir = payload["output_dir"]
+    input_path = payload["input_path"]
+    output_mp3_name = os.path.join(output_dir, "output.mp3")
+    output_wav_name = os.path.join(output_dir, "output.wav")
+    output_csv_name = os.path.join(output_dir, "output.csv")
+
+    progress.write(f"Extracting mp3... `{input_path}`")
+    with metrics.stage("convert.mp3"):
+        output_mp3_name = convert_video_to_audio(input_path, output_mp3_name, "mp3")
+
+    progress.write(f"Extracting wav... `{output_mp3_name}`")
+    with metrics.stage("convert.wav"):
+        output_wav_name = convert_audio_to_mono_wav_file(output_mp3_name, output_wav_name)
+
+    live = None
+    summary_path = os.path.join(output_dir, LIVE_SUMMARY_FILE)
+    if SUMMARY_LIVE:
+        from summarizer import IncrementalSummarizer
+
+        live = IncrementalSummarizer(
+            on_update=lambda summary, end_time: write_live_summary(summary_path, summary, end_time)
+        )
+
+    transcription_frame = diarize_split_transcribe(
+        output_wav_name,
+        output_csv_name,
+        output_dir=output_dir,
+        progress_bar=progress,
+        on_row=live.add_rows if live is not None else None,
+    )
+    # diarize_split_transcribe reports errors to the progress sink and returns None
+    if transcription_frame is None:
+        raise RuntimeError(progress.last_message or "Transcription failed")
+
+    result = {
+        "audio_path": output_mp3_name,
+        "wav_path": output_wav_name,
+        "csv_path": output_csv_name,
+        "rows": int(transcription_frame.shape[0]),
+    }
+
+    if INDEX_TRANSCRIPTS and not transcription_frame.empty:
+        from transcript_index import index_transcript
+
+        progress.write("Indexing transcript for search...")
+        try:
+            with metrics.stage("index", rows=result["rows"]):
+                result["index_path"] = index_transcript(transcription_frame, output_dir)
+        except Exception as e:
+            # Search is optional; the index can be rebuilt from the CSV later
+            print(f">>> Transcript indexing failed: {e}")
+
+    if live is not None:
+        if live.rows == 0:
+            # Transcript came from an existing CSV; summarize it in one go
+            live.add_rows(transcription_frame)
+        progress.write("Finishing live summary...")
+        try:
+            with metrics.stage("summarize.live", rows=live.rows):
+                live.finish()
+        except Exception as e:
+            # The transcript is still good; the summary can be extracted later
+            print(f">>> Live summary failed: {e}")
+        if live.summary is not None:
+            result["summary_path"] = summary_path
+
+    return result
+
+
+JOB_HANDLERS = {
+    "transcribe": run_transcription_job,
+}
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+
+def _heartbeat_loop(queue, job_id, stop_event):
+    while not stop_event.wait(JOB_HEARTBEAT_INTERVAL):
+        try:
+            queue.heartbeat(job_id)
+        except sqlite3.Error:
+            pass
+
+
+def worker_loop(db_path=JOB_DB_PATH, worker_id=None, stop_event=None):
+    """Claim and run jobs until ``stop_event`` is set."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(db_path)
+    print(f">>> Job worker {worker_id} started ({db_path})")
+
+    if WARMUP:
+        try:
+            from transcribe_whisper import warm_up
+
+            warm_up()
+            print(f">>> Job worker {worker_id} warmed up")
+        except Exception as e:
+            # Jobs still load the models on demand
+            print(f">>> Job worker {worker_id} warm-up failed: {e}")
+
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            queue.fail(job["id"], f"Unknown job kind: {job['kind']}")
+            continue
+
+        beat_stop = threading.Event()
+        beat = threading.Thread(
+            target=_heartbeat_loop, args=(queue, job["id"], beat_stop), daemon=True
+        )
+        beat.start()
+        metrics.bind(job_id=job["id"], worker=worker_id)
+        try:
+            with metrics.stage(f"job.{job['kind']}"):
+                result = handler(job["payload"], JobProgress(queue, job["id"]))
+            queue.complete(job["id"], result)
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job["id"], f"{type(e).__name__}: {e}")
+        finally:
+            beat_stop.set()
+            beat.join()
+
+
+def start_workers(num_workers=JOB_WORKERS, db_path=JOB_DB_PATH):
+    """
+    Start ``num_workers`` worker processes and return them.
+
+    A supervisor thread replaces any worker that dies (in place in the returned
+    list) and recovers its running job. Workers are not daemonic because NeMo
+    spawns its own dataloader processes; they are stopped from an ``atexit``
+    hook instead.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+    processes = []
+    # Ids are unique per spawn: the app and a standalone ``jobs.py`` on the same
+    # host and database each have a worker 0, and must not recover each other's jobs
+    worker_ids = [None] * num_workers
+
+    def _spawn(n):
+        worker_ids[n] = f"{socket.gethostname()}:{os.getpid()}:worker{n}:{uuid.uuid4().hex[:8]}"
+        proc = ctx.Process(
+            target=worker_loop,
+            args=(db_path, worker_ids[n], stop_event),
+            name=f"meeting-ai-worker-{n}",
+        )
+        proc.start()
+        return proc
+
+    for n in range(num_workers):
+        processes.append(_spawn(n))
+
+    def _supervise():
+        # Replace workers that died (OOM kill, segfault in CUDA/ctranslate2) and
+        # hand their job back to the queue right away
+        queue = JobQueue(db_path)
+        while not stop_event.wait(JOB_POLL_INTERVAL):
+            for n, proc in enumerate(processes):
+                if proc.is_alive() or stop_event.is_set():
+                    continue
+                print(f">>> Job worker {proc.name} exited with {proc.exitcode}; restarting")
+                try:
+                    queue.requeue_worker(worker_ids[n])
+                except sqlite3.Error as e:
+                    print(f">>> Could not recover jobs of {proc.name}: {e}")
+                processes[n] = _spawn(n)
+
+    threading.Thread(target=_supervise, daemon=True, name="meeting-ai-worker-supervisor").start()
+
+    def _shutdown():
+        stop_event.set()
+        for proc in processes:
+            proc.join(timeout=2)
+            if proc.is_alive():
+                proc.terminate()
+
+    atexit.register(_shutdown)
+    return processes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Meeting AI transcription workers.")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1))
+    parser.add_argument("--db", default=JOB_DB_PATH)
+    args = parser.parse_args()
+
+    start_workers(args.workers, args.db)
+    # The supervisor thread keeps the workers running; wait until interrupted
+    threading.Event().wait()
@@ -0,0 +1,344 @@
+import argparse
+import contextvars
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-stage metrics are appended as JSON lines to METRICS_LOG (empty disables).
+# The log is shared by the app and the worker processes; the Prometheus
+# exporter on METRICS_PORT (0 disables) aggregates it on every scrape.
+METRICS_LOG = os.getenv("METRICS_LOG", os.path.join("/tmp", "uploads", "metrics.jsonl"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Once the log passes this size it is moved to METRICS_LOG.1 and a new one is started
+METRICS_LOG_MAX_MB = float(os.getenv("METRICS_LOG_MAX_MB", "50"))
+
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+_stage_stack = contextvars.ContextVar("meeting_ai_stage_stack", default=())
+_labels = contextvars.ContextVar("meeting_ai_metric_labels", default={})
+# Peak GPU memory seen by each open stage, innermost last (the CUDA peak counter is
+# reset when a stage starts, so enclosing stages keep their own running maximum here)
+_gpu_peaks = contextvars.ContextVar("meeting_ai_gpu_peaks", default=())
+_write_lock = threading.Lock()
+
+
+def bind(**labels):
+    """Attach labels (e.g. ``job_id``) to every stage recorded in the current context."""
+    _labels.set({**_labels.get(), **labels})
+
+
+def _cuda():
+    # Only look at torch if the pipeline already imported it
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return torch.cuda
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+
+
+def emit(record, log_path=None, max_mb=METRICS_LOG_MAX_MB):
+    """Append one metrics record to the JSON-lines log, rotating it past ``max_mb``."""
+    log_path = METRICS_LOG if log_path is None else log_path
+    if not log_path:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        log_dir = os.path.dirname(log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        try:
+            if max_mb and os.path.getsize(log_path) > max_mb * 2**20:
+                os.replace(log_path, log_path + ".1")
+        except OSError:
+            pass  # not created yet, or another process rotated it first
+        # O_APPEND keeps whole lines intact across processes
+        with open(log_path, "a") as f:
+            f.write(line)
+
+
+@contextmanager
+def stage(name, **labels):
+    """
+    Time a pipeline stage and emit its metrics when it finishes.
+
+    Records wall time, process CPU time, RSS at entry and exit, the process peak
+    RSS so far and (when CUDA is in use) the peak GPU memory during this stage.
+    Stages nest: the enclosing stage is recorded as ``parent``.
+    """
+    stack = _stage_stack.get()
+    token = _stage_stack.set(stack + (name,))
+    cuda = _cuda()
+    peaks = _gpu_peaks.get()
+    gpu = [0]
+    if cuda is not None:
+        # Credit the peak so far to the enclosing stage, then measure this one alone
+        if peaks:
+            peaks[-1][0] = max(peaks[-1][0], cuda.max_memory_allocated())
+        cuda.reset_peak_memory_stats()
+    gpu_token = _gpu_peaks.set(peaks + (gpu,))
+    rss0 = _rss_mb()
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _stage_stack.reset(token)
+        _gpu_peaks.reset(gpu_token)
+        gpu_peak_mb = None
+        if cuda is not None:
+            gpu[0] = max(gpu[0], cuda.max_memory_allocated())
+            if peaks:
+                peaks[-1][0] = max(peaks[-1][0], gpu[0])
+            gpu_peak_mb = round(gpu[0] / 2**20, 1)
+        rss1 = _rss_mb()
+        emit(
+            {
+                "ts": time.time(),
+                "stage": name,
+                "parent": stack[-1] if stack else None,
+                "status": status,
+                "wall_s": round(time.perf_counter() - wall0, 4),
+                "cpu_s": round(time.process_time() - cpu0, 4),
+                "rss_start_mb": rss0,
+                "rss_end_mb": rss1,
+                "rss_delta_mb": round(rss1 - rss0, 1) if rss0 is not None and rss1 is not None else None,
+                # Process lifetime peak (ru_maxrss is reported in kilobytes on Linux)
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "gpu_peak_mb": gpu_peak_mb,
+                "pid": os.getpid(),
+                **_labels.get(),
+                **labels,
+            }
+        )
+
+
+def timed(name):
+    """Decorator form of ``stage`` for plain functions."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(obj, stages):
+    """
+    Wrap callables reachable from ``obj`` so each call is recorded as a stage.
+
+    ``obj`` may be an instance, a class or a module. ``stages`` maps dotted
+    attribute paths (``"a.b.method"``) to stage names. Paths that do not exist
+    (e.g. other library versions) or are already wrapped are skipped. Returns
+    the paths that were instrumented.
+    """
+    instrumented = []
+    for path, stage_name in stages.items():
+        *parents, attr = path.split(".")
+        target = obj
+        for part in parents:
+            target = getattr(target, part, None)
+            if target is None:
+                break
+        method = getattr(target, attr, None) if target is not None else None
+        if not callable(method) or getattr(method, "_metrics_stage", None):
+            continue
+
+        def make_wrapper(method, stage_name):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                with stage(stage_name):
+                    return method(*args, **kwargs)
+
+            wrapper._metrics_stage = stage_name
+            return wrapper
+
+        setattr(target, attr, make_wrapper(method, stage_name))
+        instrumented.append(path)
+    return instrumented
+
+
+# ---------------------------------------------------------------------------
+# Prometheus exposition
+# ---------------------------------------------------------------------------
+
+
+class MetricsAggregator:
+    """Incrementally folds the JSON-lines log into per-stage Prometheus series."""
+
+    def __init__(self, log_path=METRICS_LOG, buckets=STAGE_BUCKETS):
+        self.log_path = log_path
+        self.buckets = buckets
+        self.offset = 0
+        self.inode = None
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def _stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = {
+                "buckets": [0] * len(self.buckets),
+                "count": 0,
+                "sum": 0.0,
+                "cpu": 0.0,
+                "errors": 0,
+                "peak_rss_mb": 0.0,
+                "rss_growth_mb": 0.0,
+                "gpu_peak_mb": 0.0,
+            }
+        return self.stages[name]
+
+    def _read(self, path):
+        with open(path) as f:
+            f.seek(self.offset)
+            while True:
+                line = f.readline()
+                if not line.endswith("\n"):
+                    break  # partial line still being written
+                self.offset = f.tell()
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.observe(record)
+
+    def refresh(self):
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        with self.lock:
+            st = os.stat(self.log_path)
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                # Log was rotated or truncated: finish the rotated file, then
+                # read the new one from the start
+                rotated = self.log_path + ".1"
+                try:
+                    if self.inode is not None and os.stat(rotated).st_ino == self.inode:
+                        self._read(rotated)
+                except OSError:
+                    pass
+                self.offset = 0
+                self.inode = st.st_ino
+            self._read(self.log_path)
+
+    def observe(self, record):
+        s = self._stage(record.get("stage", "unknown"))
+        wall = float(record.get("wall_s") or 0.0)
+        for i, bound in enumerate(self.buckets):
+            if wall <= bound:
+                s["buckets"][i] += 1
+        s["count"] += 1
+        s["sum"] += wall
+        s["cpu"] += float(record.get("cpu_s") or 0.0)
+        s["peak_rss_mb"] = max(s["peak_rss_mb"], float(record.get("rss_end_mb") or 0.0))
+        s["rss_growth_mb"] = max(s["rss_growth_mb"], float(record.get("rss_delta_mb") or 0.0))
+        s["gpu_peak_mb"] = max(s["gpu_peak_mb"], float(record.get("gpu_peak_mb") or 0.0))
+        if record.get("status") == "error":
+            s["errors"] += 1
+
+    def render(self):
+        """Return the aggregated metrics in Prometheus text format."""
+        self.refresh()
+        lines = [
+            "# HELP meeting_ai_stage_seconds Wall time per pipeline stage.",
+            "# TYPE meeting_ai_stage_seconds histogram",
+        ]
+        with self.lock:
+            stages = sorted(self.stages.items())
+            for name, s in stages:
+                for bound, count in zip(self.buckets, s["buckets"]):
+                    lines.append(f'meeting_ai_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'meeting_ai_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {s["count"]}')
+                lines.append(f'meeting_ai_stage_seconds_sum{{stage="{name}"}} {s["sum"]:.4f}')
+                lines.append(f'meeting_ai_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+            lines += [
+                "# HELP meeting_ai_stage_cpu_seconds_total Process CPU time spent per stage.",
+                "# TYPE meeting_ai_stage_cpu_seconds_total counter",
+            ]
+            lines += [f'meeting_ai_stage_cpu_seconds_total{{stage="{n}"}} {s["cpu"]:.4f}' for n, s in stages]
+            lines += [
+                "# HELP meeting_ai_stage_errors_total Stages that raised.",
+                "# TYPE meeting_ai_stage_errors_total counter",
+            ]
+            lines += [f'meeting_ai_stage_errors_total{{stage="{n}"}} {s["errors"]}' for n, s in stages]
+            lines += [
+                "# HELP meeting_ai_stage_peak_rss_bytes Highest process RSS observed at the end of a stage.",
+                "# TYPE meeting_ai_stage_peak_rss_bytes gauge",
+            ]
+            lines += [
+                f'meeting_ai_stage_peak_rss_bytes{{stage="{n}"}} {int(s["peak_rss_mb"] * 2**20)}'
+                for n, s in stages
+            ]
+            lines += [
+                "# HELP meeting_ai_stage_rss_growth_bytes Largest RSS increase from the start to the end of a stage.",
+                "# TYPE meeting_ai_stage_rss_growth_bytes gauge",
+            ]
+            lines += [
+                f'meeting_ai_stage_rss_growth_bytes{{stage="{n}"}} {int(s["rss_growth_mb"] * 2**20)}'
+                for n, s in stages
+            ]
+            lines += [
+                "# HELP meeting_ai_stage_gpu_peak_bytes Highest GPU memory allocated during a stage.",
+                "# TYPE meeting_ai_stage_gpu_peak_bytes gauge",
+            ]
+            lines += [
+                f'meeting_ai_stage_gpu_peak_bytes{{stage="{n}"}} {int(s["gpu_peak_mb"] * 2**20)}'
+                for n, s in stages
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port=METRICS_PORT, log_path=METRICS_LOG):
+    """Serve ``/metrics`` in Prometheus format from a daemon thread."""
+    aggregator = MetricsAggregator(log_path)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = aggregator.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    print(f">>> Metrics exporter listening on :{port}/metrics")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Meeting AI stage metrics for Prometheus.")
+    parser.add_argument("--port", type=int, default=METRICS_PORT or 9464)
+    parser.add_argument("--log", default=METRICS_LOG)
+    args = parser.parse_args()
+
+    start_metrics_server(args.port, args.log)
+    threading.Event().wait()
@@ -1,17 +1,23 @@
 import shutil
-from summarizer import generate_summary
+import importlib
+import threading
 import streamlit as st
 import streamlit.components.v1 as components
 import tempfile, os, json
 from pydub import AudioSegment
-from transcribe_whisper import diarize_split_transcribe
+import metrics
+from transcript_index import TranscriptIndex, INDEX_FILE
+from jobs import JobQueue, start_workers, JOB_DB_PATH, JOB_WORKERS, ACTIVE_STATES, QUEUED, DONE, FAILED, LIVE_SUMMARY_FILE, WARMUP
 from utils import (
     convert_video_to_audio,
     convert_audio_to_mono_wav_file,
     cleanup_temp_files,
     generate_html_download_link,
     stage_file_for_download,
+    stage_download,
+    write_text_if_changed,
 )
+from downloads import DOWNLOAD_BASE_URL, DOWNLOAD_PORT, download_url, start_download_server
 import base64
 import pandas as pd
 # Set up the page
@@ -183,6 +189,178 @@ if "transcription_text" not in st.session_state:
     st.session_state["audio_path"] = ""
     st.session_state["csv_path"] = ""
     st.session_state["namespace"] = ""
+    # The job id is mirrored in the URL so a reload can pick the job back up
+    st.session_state["job_id"] = st.query_params.get("job", "")
+    st.session_state["loaded_job"] = ""
+    st.session_state["meeting_summary"] = None
+    st.session_state["transcript_index"] = None
+
+
+@st.cache_resource
+def get_job_queue():
+    """Shared transcription job queue; embedded workers start once per server process."""
+    queue = JobQueue(JOB_DB_PATH)
+    if JOB_WORKERS > 0:
+        start_workers(JOB_WORKERS, JOB_DB_PATH)
+    return queue
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Prometheus exporter for the shared stage metrics log (disabled when METRICS_PORT=0)."""
+    if metrics.METRICS_PORT:
+        return metrics.start_metrics_server(metrics.METRICS_PORT, metrics.METRICS_LOG)
+    return None
+
+
+get_metrics_server()
+
+
+@st.cache_resource
+def get_download_server():
+    """Streams staged downloads through signed links (disabled when DOWNLOAD_PORT=0)."""
+    if DOWNLOAD_PORT:
+        return start_download_server(DOWNLOAD_PORT)
+    return None
+
+
+get_download_server()
+
+
+def download_base_url():
+    """Public URL of the download server: DOWNLOAD_BASE_URL, or this page's host."""
+    if DOWNLOAD_BASE_URL:
+        return DOWNLOAD_BASE_URL
+    context = getattr(st, "context", None)
+    host = context.headers.get("Host", "localhost") if context is not None else "localhost"
+    return f"http://{host.rsplit(':', 1)[0]}:{DOWNLOAD_PORT}"
+
+
+def download_link(container, label, file_path, file_name=None, mime=None, key=None):
+    """Download button for ``file_path`` that streams it instead of embedding it in the page."""
+    file_name = file_name or os.path.basename(file_path)
+    if get_download_server() is None:
+        # Download server disabled: send the file through Streamlit
+        with open(file_path, "rb") as fh:
+            container.download_button(label, fh.read(), file_name=file_name, mime=mime, key=key)
+        return
+    container.link_button(label, download_url(stage_download(file_path, file_name), download_base_url()))
+
+
+@st.cache_resource
+def start_warm_up():
+    """Import the summarizer stack (LangChain, LlamaIndex) in the background once per server."""
+    if WARMUP:
+        threading.Thread(
+            target=importlib.import_module, args=("summarizer",), daemon=True, name="warmup"
+        ).start()
+
+
+start_warm_up()
+
+
+def load_job_result(job):
+    """Load a finished transcription job's outputs into the session."""
+    result = job["result"] or {}
+    st.session_state["transcription_text"] = pd.read_csv(result["csv_path"])
+    st.session_state["audio_path"] = result["audio_path"]
+    st.session_state["csv_path"] = result["csv_path"]
+    st.session_state["namespace"] = job["payload"]["output_dir"]
+    st.session_state["loaded_job"] = job["id"]
+    st.session_state["transcript_index"] = None
+    if result.get("summary_path") and os.path.exists(result["summary_path"]):
+        from summarizer import MeetingSummary
+
+        with open(result["summary_path"]) as f:
+            st.session_state["meeting_summary"] = MeetingSummary.model_validate(json.load(f)["summary"])
+
+
+def clear_job():
+    st.session_state["job_id"] = ""
+    st.session_state["loaded_job"] = ""
+    st.session_state["meeting_summary"] = None
+    st.session_state["transcript_index"] = None
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+
+@st.fragment(run_every=2)
+def job_status_panel(job_id):
+    """Poll the job queue and rerun the app once the job leaves the active states."""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None or job["status"] not in ACTIVE_STATES:
+        st.rerun()
+
+    if job["status"] == QUEUED:
+        ahead = queue.queue_position(job_id)
+        st.info(f"Queued for transcription ({ahead} job(s) ahead).")
+    else:
+        st.progress(min(max(job["progress"] or 0.0, 0.0), 1.0), text=job["message"] or "Transcribing...")
+
+    # Rolling summary written by the worker while it transcribes (SUMMARY_LIVE=1)
+    live_path = os.path.join(job["payload"]["output_dir"], LIVE_SUMMARY_FILE)
+    if os.path.exists(live_path):
+        from summarizer import MeetingSummary
+
+        with open(live_path) as f:
+            live = json.load(f)
+        with st.expander(f"Live summary (up to {live['end_time']:.0f}s)", expanded=True):
+            render_meeting_summary(MeetingSummary.model_validate(live["summary"]))
+
+
+def get_transcript_index():
+    """Index of the loaded transcript: the one saved by the job, or built on first use."""
+    if st.session_state.get("transcript_index") is None:
+        index_path = os.path.join(st.session_state.get("namespace") or "", INDEX_FILE)
+        if st.session_state.get("namespace") and os.path.exists(index_path):
+            st.session_state["transcript_index"] = TranscriptIndex.load(index_path)
+        else:
+            st.session_state["transcript_index"] = TranscriptIndex.build(st.session_state["transcription_text"])
+    return st.session_state["transcript_index"]
+
+
+def render_meeting_summary(meeting_summary):
+    """Render a MeetingSummary (final or live) as markdown."""
+    st.markdown("## Final Summary")
+    st.caption(meeting_summary.overall_summary)
+    if hasattr(meeting_summary, "speaker_identities") and meeting_summary.speaker_identities:
+        st.markdown("### Participants")
+
+        # Sort speaker0, speaker1, speaker2 ... properly
+        ordered_keys = sorted(
+            meeting_summary.speaker_identities.keys(),
+            key=lambda k: int(''.join(filter(str.isdigit, k))) if any(ch.isdigit() for ch in k) else 999
+        )
+
+        for spk in ordered_keys:
+            identity = meeting_summary.speaker_identities[spk]
+            st.caption(f"- **{spk}** → {identity}")
+
+    if meeting_summary.topics:
+        st.markdown("### Topics")
+        for t in meeting_summary.topics:
+            st.caption(f" - {t}")
+
+    if meeting_summary.decisions:
+        st.markdown("### Decisions")
+        for d in meeting_summary.decisions:
+            st.caption(f" - {d}")
+
+    if meeting_summary.action_items:
+        st.markdown("### Action Items")
+        for a in meeting_summary.action_items:
+            st.caption(f" - {a}")
+
+    if meeting_summary.risks:
+        st.markdown("### Risks")
+        for r in meeting_summary.risks:
+            st.caption(f" - {r}")
+
+    if meeting_summary.follow_ups:
+        st.markdown("### Follow-ups")
+        for f in meeting_summary.follow_ups:
+            st.caption(f" - {f}")
 
 
 # Define the pages (Main and Visual Guide)
@@ -242,47 +420,31 @@ def main_page():
                 st.session_state["transcription_text"] = None
                 st.session_state["audio_path"] = ""
 
-                with progress_review.status("Transcribing...", expanded=True) as progress_bar:
-                    try:
-                        bytes_data = uploaded_file.read()
-                        bytes_len = len(bytes_data)
-
-                        prefix_path = f"f{abs(hash(os.path.splitext(os.path.basename(uploaded_file.name))[0]))}_{bytes_len}"
-                        output_dir = os.path.join(UPLOAD_FOLDER, prefix_path)
-                        os.makedirs(output_dir, exist_ok=True)
-                        st.session_state["namespace"] = output_dir
-
-                        input_video_name = os.path.join(output_dir, f"input{os.path.splitext(uploaded_file.name)[1]}")
-                        output_mp3_name = os.path.join(output_dir, "output.mp3")
-                        output_wav_name = os.path.join(output_dir, "output.wav")
-                        output_csv_name = os.path.join(output_dir, "output.csv")
-
-                        with open(input_video_name, "wb") as tmp_video:
-                            tmp_video.write(bytes_data)
-
-                        progress_bar.write(f"Extracting mp3... `{input_video_name}`")
-                        output_mp3_name = convert_video_to_audio(input_video_name, output_mp3_name, "mp3")
-
-                        progress_bar.write(f"Extracting wav... `{output_mp3_name}`")
-                        output_wav_name = convert_audio_to_mono_wav_file(output_mp3_name, output_wav_name)
-
-                        audio_filename = output_wav_name
-                        st.session_state["audio_path"] = output_mp3_name
-                        st.session_state["csv_path"] = output_csv_name
-
-                        transcription_frame = diarize_split_transcribe(
-                            audio_filename,
-                            output_csv_name,
-                            output_dir=output_dir,
-                            progress_bar=progress_bar
-                        )
-
-                        st.session_state["transcription_text"] = transcription_frame
-                        progress_bar.update(label="Transcription Complete", state="complete", expanded=False)
+                try:
+                    bytes_data = uploaded_file.read()
+                    bytes_len = len(bytes_data)
+
+                    prefix_path = f"f{abs(hash(os.path.splitext(os.path.basename(uploaded_file.name))[0]))}_{bytes_len}"
+                    output_dir = os.path.join(UPLOAD_FOLDER, prefix_path)
+                    os.makedirs(output_dir, exist_ok=True)
+                    st.session_state["namespace"] = output_dir
+
+                    input_video_name = os.path.join(output_dir, f"input{os.path.splitext(uploaded_file.name)[1]}")
+                    with open(input_video_name, "wb") as tmp_video:
+                        tmp_video.write(bytes_data)
+
+                    # Hand the work to the background workers; identical uploads share one job
+                    job_id = get_job_queue().submit(
+                        "transcribe",
+                        {"input_path": input_video_name, "output_dir": output_dir},
+                        dedupe_key=output_dir,
+                    )
+                    st.session_state["job_id"] = job_id
+                    st.session_state["loaded_job"] = ""
+                    st.query_params["job"] = job_id
 
-                    except Exception as e:
-                        progress_bar.code(f"Error: {e}")
-                        progress_bar.update(label="Errored", state="error", expanded=True)
+                except Exception as e:
+                    progress_review.status("Errored", state="error", expanded=True).code(f"Error: {e}")
 
             # --- CLEAR ---
             if uploaded_file and col4[2].button("Clear", key="ResetBtn"):
@@ -290,6 +452,23 @@ def main_page():
                 st.session_state["audio_path"] = ""
                 st.session_state["csv_path"] = ""
                 st.session_state["namespace"] = ""
+                clear_job()
+
+        # --- Job Status ---
+        job_id = st.session_state.get("job_id")
+        job = get_job_queue().get(job_id) if job_id else None
+        if job is not None:
+            if job["status"] in ACTIVE_STATES:
+                with progress_review.container():
+                    job_status_panel(job_id)
+            elif job["status"] == DONE and st.session_state.get("loaded_job") != job_id:
+                try:
+                    load_job_result(job)
+                    progress_review.status("Transcription Complete", state="complete", expanded=False)
+                except Exception as e:
+                    progress_review.status("Errored", state="error", expanded=True).code(f"Error: {e}")
+            elif job["status"] == FAILED:
+                progress_review.status("Errored", state="error", expanded=True).code(f"Error: {job['error']}")
 
         # --- Show Transcription ---
         if st.session_state["transcription_text"] is not None:
@@ -306,33 +485,23 @@ def main_page():
             # AUDIO
             if "audio_path" in st.session_state and st.session_state["audio_path"]:
                 try:
-                    with open(st.session_state["audio_path"], "rb") as fh:
-                        four_columns[1].markdown('<div class="download-btn">', unsafe_allow_html=True)
-                        four_columns[1].download_button(
-                            "Download MP3",
-                            fh.read(),
-                            file_name=os.path.basename(st.session_state["audio_path"]),
-                            mime="audio/mpeg",
-                        )
-                        four_columns[1].markdown('</div>', unsafe_allow_html=True)
+                    four_columns[1].markdown('<div class="download-btn">', unsafe_allow_html=True)
+                    download_link(four_columns[1], "Download MP3", st.session_state["audio_path"], mime="audio/mpeg")
+                    four_columns[1].markdown('</div>', unsafe_allow_html=True)
                 except:
                     pass
 
             # TRANSCRIPT CSV
             if st.session_state["transcription_text"] is not None:
                 csv_filename = f"{os.path.splitext(os.path.basename(st.session_state['audio_path']))[0]}_transcript.csv"
-                st.session_state["transcription_text"].to_csv(csv_filename, index=False)
+                csv_path = os.path.join(st.session_state["namespace"], csv_filename)
+                # Atomic and only on change: a staged download may share the old file
+                write_text_if_changed(csv_path, st.session_state["transcription_text"].to_csv(index=False))
 
                 try:
-                    with open(csv_filename, "rb") as fh:
-                        four_columns[2].markdown('<div class="download-btn">', unsafe_allow_html=True)
-                        four_columns[2].download_button(
-                            "Download Transcript",
-                            fh.read(),
-                            file_name=csv_filename,
-                            mime="text/csv",
-                        )
-                        four_columns[2].markdown('</div>', unsafe_allow_html=True)
+                    four_columns[2].markdown('<div class="download-btn">', unsafe_allow_html=True)
+                    download_link(four_columns[2], "Download Transcript", csv_path, mime="text/csv")
+                    four_columns[2].markdown('</div>', unsafe_allow_html=True)
                 except:
                     pass
 
@@ -354,14 +523,7 @@ def main_page():
             for label, fname, mime in samples:
                 file_path = static_dir / fname
                 if file_path.exists():
-                    with open(file_path, "rb") as fh:
-                        st.download_button(
-                            label=label,
-                            data=fh.read(),
-                            file_name=fname,
-                            mime=mime,
-                            key=f"download_{fname}",
-                        )
+                    download_link(st, label, str(file_path), fname, mime=mime, key=f"download_{fname}")
 
     # ---------------------------------------------------------------------
     #  TAB 3 — SUMMARIZE
@@ -387,8 +549,11 @@ def main_page():
                 cols4 = st.columns(3)
                 if cols4[1].button("Extract Summary"):
                     ps = progress_result.empty().status("Analyzing...", expanded=True)
+                    # Imported on first use; LangChain/LlamaIndex are slow to import
+                    from summarizer import generate_summary
+
                     summary_payload = generate_summary(
-                        st.session_state["transcription_text"].head(200),
+                        st.session_state["transcription_text"],
                         progress_status=ps,
                     )
 
@@ -396,47 +561,25 @@ def main_page():
                         ps.update(label="AI Summarization Complete", state="complete", expanded=False)
 
                     if summary_payload and "final_summary" in summary_payload:
-                        meeting_summary = summary_payload["final_summary"]
-                        with summary_div:
-                            st.markdown("## Final Summary")
-                            st.caption(meeting_summary.overall_summary)
-                            if hasattr(meeting_summary, "speaker_identities") and meeting_summary.speaker_identities:
-                                st.markdown("### Participants")
-
-                                # Sort speaker0, speaker1, speaker2 ... properly
-                                ordered_keys = sorted(
-                                    meeting_summary.speaker_identities.keys(),
-                                    key=lambda k: int(''.join(filter(str.isdigit, k))) if any(ch.isdigit() for ch in k) else 999
-                                )
-
-                                for spk in ordered_keys:
-                                    identity = meeting_summary.speaker_identities[spk]
-                                    st.caption(f"- **{spk}** → {identity}")
-
-                            if meeting_summary.topics:
-                                st.markdown("### Topics")
-                                for t in meeting_summary.topics:
-                                    st.caption(f" - {t}")
-
-                            if meeting_summary.decisions:
-                                st.markdown("### Decisions")
-                                for d in meeting_summary.decisions:
-                                    st.caption(f" - {d}")
-
-                            if meeting_summary.action_items:
-                                st.markdown("### Action Items")
-                                for a in meeting_summary.action_items:
-                                    st.caption(f" - {a}")
-
-                            if meeting_summary.risks:
-                                st.markdown("### Risks")
-                                for r in meeting_summary.risks:
-                                    st.caption(f" - {r}")
-
-                            if meeting_summary.follow_ups:
-                                st.markdown("### Follow-ups")
-                                for f in meeting_summary.follow_ups:
-                                    st.caption(f" - {f}")
+                        st.session_state["meeting_summary"] = summary_payload["final_summary"]
+
+            if st.session_state.get("meeting_summary") is not None:
+                with summary_div:
+                    render_meeting_summary(st.session_state["meeting_summary"])
+
+            # --- Ask the transcript ---
+            if st.session_state["transcription_text"] is not None:
+                question = st.text_input("Ask about the meeting", placeholder="What did speaker_1 say about the budget?")
+                if question:
+                    try:
+                        speakers = st.session_state["transcription_text"]["Speaker"].astype(str).unique()
+                        # Restrict to a speaker when the question names one
+                        speaker = next((sp for sp in sorted(speakers, key=len, reverse=True) if sp in question), None)
+                        for hit in get_transcript_index().query(question, k=5, speaker=speaker):
+                            st.markdown(f"**{hit['start']:.1f}s – {hit['end']:.1f}s** · {', '.join(hit['speakers'])}")
+                            st.caption(hit["text"])
+                    except Exception as e:
+                        st.error(f"Search failed: {e}")
 
         analysis_cols[1].container(border=1).write("""
         1. AI will analyze your transcript.  
@@ -0,0 +1,109 @@
+import json
+import re
+
+from pydantic import ValidationError
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```\s*$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class StructuredOutputError(ValueError):
+    """The model's reply could not be parsed or repaired into the schema."""
+
+
+def _scan(text):
+    """
+    Walk a JSON document and track nesting outside of strings.
+
+    Returns:
+    - (int | None, list, bool, list): End index of the first complete value (None if
+      it is truncated), the open brackets at the end, whether the text ends inside a
+      string, and (position, open brackets) for every comma seen.
+    """
+    stack, commas = [], []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return i + 1, stack, False, commas
+        elif ch == ",":
+            commas.append((i, list(stack)))
+    return None, stack, in_string, commas
+
+
+def _close(text, stack):
+    return text + "".join(_CLOSERS[ch] for ch in reversed(stack))
+
+
+def repair_json(text):
+    """
+    Best-effort local repair of a model's JSON reply.
+
+    Strips code fences and any text around the first JSON object, drops trailing
+    commas and closes a truncated document, dropping its last incomplete member
+    when needed.
+
+    Returns:
+    - dict | list | None: The parsed value, or None if it could not be repaired.
+    """
+    text = _FENCE.sub("", text.strip())
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    text = text[min(starts):]
+
+    end, stack, in_string, commas = _scan(text)
+    if end is not None:
+        candidates = [text[:end]]
+    else:
+        # Truncated: close it as is, then retry without the last (partial) members
+        head = text + '"' if in_string else text
+        candidates = [_close(head, stack)]
+        candidates += [_close(text[:pos], opened) for pos, opened in reversed(commas[-3:])]
+
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                continue
+    return None
+
+
+def parse_structured(text, schema):
+    """
+    Validate a model reply against a Pydantic ``schema``, repairing it if needed.
+
+    Raises:
+    - StructuredOutputError: When neither the reply nor its repair fits the schema.
+    """
+    try:
+        return schema.model_validate_json(text)
+    except (ValidationError, ValueError):
+        pass
+
+    repaired = repair_json(text)
+    if repaired is not None:
+        try:
+            result = schema.model_validate(repaired)
+            print(f">>> Repaired malformed {schema.__name__} JSON from the model")
+            return result
+        except ValidationError:
+            pass
+    raise StructuredOutputError(
+        f"Model reply does not fit {schema.__name__}: {text[:200]!r}"
+    )
@@ -1,14 +1,25 @@
+import asyncio
+import contextvars
+import functools
 import os
+import random
+import threading
 from typing import Any, List, Optional
 
 import pandas as pd
 from pydantic import BaseModel, Field
 
+import httpx
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 
 from llama_index.core import Document
-from llama_index.core.node_parser import SimpleNodeParser
+from llama_index.core.schema import TextNode
+
+import metrics
+from llm_cache import LLM_CACHE_PATH, LLMCache, make_key
+from structured_output import parse_structured
 
 # ---------------------------------------------------------------------------
 # LLM + Cache
@@ -17,6 +28,45 @@ from llama_index.core.node_parser import SimpleNodeParser
 MODEL_NAME = os.getenv("MODEL_NAME", "qwen2.5vl:7b")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:11434")
 
+# Map-phase parallelism (match OLLAMA_NUM_PARALLEL on the server) and retry policy
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+SUMMARY_RETRIES = int(os.getenv("SUMMARY_RETRIES", "2"))
+SUMMARY_RETRY_BACKOFF = float(os.getenv("SUMMARY_RETRY_BACKOFF", "1.0"))
+
+# Token budget for reduce prompts: the context window minus room for the answer
+CONTEXT_WINDOW = int(os.getenv("SUMMARY_CONTEXT_WINDOW", "4096"))
+SUMMARY_OUTPUT_RESERVE = int(os.getenv("SUMMARY_OUTPUT_RESERVE", "1024"))
+
+# Transcript rows are packed into nodes of up to this many tokens (one LLM call each)
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1200"))
+
+# Live summaries fold this many new segment summaries into the rolling summary at a time
+SUMMARY_LIVE_REFRESH = int(os.getenv("SUMMARY_LIVE_REFRESH", "3"))
+# Share of the update prompt budget the rolling summary may fill before it is compacted
+SUMMARY_LIVE_MAX_SHARE = float(os.getenv("SUMMARY_LIVE_MAX_SHARE", "0.4"))
+
+
+_LLM_CACHE: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Process-wide LLM response cache (None when LLM_CACHE_PATH is empty).
+    """
+    global _LLM_CACHE
+    if _LLM_CACHE is None and LLM_CACHE_PATH:
+        _LLM_CACHE = LLMCache(LLM_CACHE_PATH)
+    return _LLM_CACHE
+
+
+# Ollama HTTP connections per pooled client, and how long idle ones stay open
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "8"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "300"))
+
+_LLM_POOL: dict = {}
+_LLM_POOL_LOCK = threading.Lock()
+_LLM_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
 
 def get_llm(
     model_name: str = MODEL_NAME,
@@ -25,22 +75,82 @@ def get_llm(
     timeout: int = 240,
 ) -> ChatOllama:
     """
-    Modern LangChain ChatOllama wrapper.
+    Pooled LangChain ChatOllama client.
+
+    One client is kept per (model, base_url, temperature, timeout) for the life
+    of the process, so its HTTP connections to Ollama stay alive across
+    generate_summary() calls. At most LLM_MAX_CONNECTIONS connections are
+    opened per client.
     """
-    return ChatOllama(
-        model=model_name,
-        base_url=base_url,
-        temperature=temperature,
-        request_timeout=timeout,
-        context_window=4096,
-    )
+    key = (model_name, base_url, temperature, timeout)
+    with _LLM_POOL_LOCK:
+        llm = _LLM_POOL.get(key)
+        if llm is None:
+            llm = ChatOllama(
+                model=model_name,
+                base_url=base_url,
+                temperature=temperature,
+                request_timeout=timeout,
+                num_ctx=CONTEXT_WINDOW,
+                client_kwargs={
+                    "timeout": timeout,
+                    "limits": httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                },
+            )
+            _LLM_POOL[key] = llm
+        return llm
+
+
+def get_llm_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop (in a daemon thread) that runs all summarizer coroutines.
+
+    The pooled clients' async connections belong to the loop they were opened
+    on, so every call must run on the same loop for them to be reused.
+    """
+    global _LLM_LOOP
+    with _LLM_POOL_LOCK:
+        if _LLM_LOOP is None:
+            _LLM_LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_LLM_LOOP.run_forever, daemon=True, name="summarizer-loop"
+            ).start()
+        return _LLM_LOOP
+
+
+def _submit_to_llm_loop(coro) -> Any:
+    """
+    Schedule ``coro`` on the shared LLM event loop; returns a concurrent Future.
+
+    The caller's context variables (e.g. metrics labels) are carried over.
+    """
+    ctx = contextvars.copy_context()
+
+    async def _with_context():
+        for var, value in ctx.items():
+            var.set(value)
+        return await coro
+
+    return asyncio.run_coroutine_threadsafe(_with_context(), get_llm_loop())
+
+
+def run_on_llm_loop(coro) -> Any:
+    """
+    Run ``coro`` on the shared LLM event loop and block until it finishes.
+
+    The caller's context variables (e.g. metrics labels) are carried over.
+    """
+    return _submit_to_llm_loop(coro).result()
 
 
 def llm_decorator():
     """
-    Injects an LLM as the first argument of the wrapped function.
+    Injects a pooled LLM as the first argument of the wrapped function.
     """
-    import functools
 
     def decorator(func):
         @functools.wraps(func)
@@ -51,11 +161,7 @@ def llm_decorator():
                 temperature=kwargs.get("temperature", 0.01),
                 timeout=kwargs.get("timeout", 240),
             )
-            args = (llm,) + args
-            try:
-                return func(*args, **kwargs)
-            finally:
-                del llm
+            return func(llm, *args, **kwargs)
 
         return wrapper
 
@@ -183,84 +289,438 @@ final_prompt = ChatPromptTemplate.from_messages(
 )
 
 
+reduce_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You merge consecutive meeting segment summaries into one concise summary.\n"
+            "Keep speaker labels (e.g. 'speaker0'), names, decisions, action items, "
+            "risks and follow-ups; drop repetition."
+        ),
+        (
+            "human",
+            "Segment index: {segment_index}\n"
+            "Time range: {time_range}\n"
+            "Speakers: {speakers}\n\n"
+            "Segment Summaries:\n{segment_summaries}\n\n"
+            "Write one combined summary."
+        ),
+    ]
+)
+
+
+update_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You maintain a running structured summary of a meeting that is still in progress.\n"
+            "The transcript contains diarized speaker labels such as 'speaker0', 'speaker1'.\n"
+            "Infer realistic names or professional roles for each speaker.\n"
+            "Always produce a mapping for *every speaker label observed*."
+        ),
+        (
+            "human",
+            "Current meeting summary (JSON):\n{current_summary}\n\n"
+            "New segment summaries since the last update:\n{segment_summaries}\n\n"
+            "Update the meeting summary with the new segments: extend the overall_summary, "
+            "add new topics, decisions, action_items, risks and follow_ups, keep the existing "
+            "ones unless the new segments change them, and refine speaker_identities.\n"
+            "Keep the whole summary under {max_words} words; shorten older parts to make room.\n\n"
+            "Return ONLY data that fits the Pydantic schema exactly."
+        ),
+    ]
+)
+
+
+compact_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You condense a running structured meeting summary that has grown too long."
+        ),
+        (
+            "human",
+            "Meeting summary (JSON):\n{current_summary}\n\n"
+            "Rewrite it in at most {max_words} words: shorten the overall_summary, merge "
+            "overlapping topics, decisions, action_items, risks and follow_ups, drop repeated "
+            "ones, and keep speaker_identities unchanged.\n\n"
+            "Return ONLY data that fits the Pydantic schema exactly."
+        ),
+    ]
+)
+
+
+# ---------------------------------------------------------------------------
+# Token budgeting + transcript chunking
+# ---------------------------------------------------------------------------
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+    """
+    return len(text) // 4 + 1
+
+
+def _prompt_overhead(prompt: ChatPromptTemplate) -> int:
+    """
+    Tokens taken by a prompt's fixed template text.
+    """
+    return sum(
+        estimate_tokens(getattr(getattr(m, "prompt", None), "template", ""))
+        for m in prompt.messages
+    )
+
+
+def _summary_line(s: SegmentSummary) -> str:
+    return f"- [{s.start_time:.1f}s–{s.end_time:.1f}s] {s.summary}"
+
+
+def _pack_summaries(
+    summaries: List[SegmentSummary], budget: int
+) -> List[List[SegmentSummary]]:
+    """
+    Greedily pack consecutive summaries into groups whose lines fit ``budget`` tokens.
+    """
+    groups: List[List[SegmentSummary]] = []
+    current: List[SegmentSummary] = []
+    used = 0
+    for s in summaries:
+        cost = estimate_tokens(_summary_line(s))
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(s)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _split_text(text: str, budget: int) -> List[str]:
+    """
+    Split text on word boundaries into pieces of at most ``budget`` tokens.
+    """
+    pieces, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and estimate_tokens(candidate) > budget:
+            pieces.append(current)
+            candidate = word
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def pack_transcript_nodes(
+    docs: List[Document], token_budget: int = SUMMARY_CHUNK_TOKENS
+) -> List[TextNode]:
+    """
+    Pack consecutive transcript rows into nodes of up to ``token_budget`` tokens.
+
+    Rows (speaker turns) are kept whole; a node is closed before a turn that
+    would overflow it. Only a single turn longer than the budget is split, on
+    word boundaries. Each line keeps its timestamp and speaker label, and the
+    node metadata carries the covered time range and the speakers in order
+    of appearance.
+    """
+    nodes: List[TextNode] = []
+    lines: List[str] = []
+    metas: List[dict] = []
+    used = 0
+
+    def _flush():
+        nonlocal lines, metas, used
+        if lines:
+            speakers = list(dict.fromkeys(md["speaker"] for md in metas))
+            nodes.append(
+                TextNode(
+                    text="\n".join(lines),
+                    metadata={
+                        "start": metas[0]["start"],
+                        "end": metas[-1]["end"],
+                        "speaker": speakers[0],
+                        "speakers": speakers,
+                        "rows": len(lines),
+                    },
+                )
+            )
+        lines, metas, used = [], [], 0
+
+    for doc in docs:
+        md = doc.metadata
+        line = f"[{md['start']:.1f}s] {doc.text}"
+        cost = estimate_tokens(line)
+
+        if cost > token_budget:
+            _flush()
+            for piece in _split_text(md["raw_text"], token_budget - estimate_tokens(md["speaker"]) - 8):
+                lines.append(f"[{md['start']:.1f}s] {md['speaker']}: {piece}")
+                metas.append(md)
+                _flush()
+            continue
+
+        if used + cost > token_budget:
+            _flush()
+        lines.append(line)
+        metas.append(md)
+        used += cost
+
+    _flush()
+    return nodes
+
+
+def _truncate_to_budget(text: str, budget: int) -> str:
+    max_chars = budget * 4
+    return text if len(text) <= max_chars else text[:max_chars] + "\n[...]"
+
+
 # ---------------------------------------------------------------------------
 # Async workers
 # ---------------------------------------------------------------------------
 
 
+async def _ainvoke_with_retry(
+    chain: Any,
+    inputs: dict,
+    retries: int = SUMMARY_RETRIES,
+    backoff: float = SUMMARY_RETRY_BACKOFF,
+) -> Any:
+    """
+    Invoke a chain, retrying failures with jittered exponential backoff.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await chain.ainvoke(inputs)
+        except Exception:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * (2 ** attempt) * (1 + random.random() / 4))
+
+
+async def _ainvoke_structured(
+    llm: ChatOllama,
+    prompt: ChatPromptTemplate,
+    schema: type,
+    inputs: dict,
+) -> Any:
+    """
+    Run ``prompt | llm`` with structured output, served from the LLM cache when possible.
+
+    The schema's JSON schema is sent as Ollama's ``format`` so decoding is
+    constrained to it; the reply is validated and, if malformed (truncated,
+    wrapped in prose), repaired locally. Only a reply that cannot be repaired
+    is retried, and only this call.
+
+    The cache key covers the model, server, temperature, prompt template, output
+    schema and rendered inputs, so only new or changed segments reach the LLM.
+    """
+    cache = get_llm_cache()
+    key = None
+    if cache is not None:
+        key = make_key(
+            model=llm.model,
+            base_url=llm.base_url,
+            temperature=llm.temperature,
+            template=[
+                getattr(getattr(m, "prompt", None), "template", str(m))
+                for m in prompt.messages
+            ],
+            schema=schema.model_json_schema(),
+            inputs=inputs,
+        )
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return schema.model_validate_json(cached)
+
+    chain = (
+        prompt
+        | llm.bind(format=schema.model_json_schema())
+        | RunnableLambda(lambda message: parse_structured(message.content, schema))
+    )
+    result = await _ainvoke_with_retry(chain, inputs)
+
+    if cache is not None:
+        await asyncio.to_thread(cache.set, key, result.model_dump_json())
+    return result
+
+
+async def _summarize_node_async(
+    llm: ChatOllama,
+    idx: int,
+    node: TextNode,
+    semaphore: asyncio.Semaphore,
+) -> tuple:
+    """
+    Summarize one packed transcript node; returns ``(idx, SegmentSummary)``.
+    """
+    md = node.metadata or {}
+    start = float(md.get("start", 0.0))
+    end = float(md.get("end", 0.0))
+    speakers = md.get("speakers") or [md.get("speaker", "unknown")]
+
+    async with semaphore:
+        with metrics.stage("llm.segment", segment_index=idx, chars=len(node.text)):
+            seg: SegmentSummary = await _ainvoke_structured(
+                llm,
+                segment_prompt,
+                SegmentSummary,
+                {
+                    "segment_index": idx,
+                    "time_range": f"{start:.2f}s to {end:.2f}s",
+                    "speakers": ", ".join(speakers),
+                    "segment_text": node.text,
+                },
+            )
+
+    seg.segment_index = idx
+    seg.start_time = start
+    seg.end_time = end
+    seg.speakers = speakers
+
+    return idx, seg
+
+
 async def _summarize_segments_async(
     llm: ChatOllama,
     docs: List[Document],
     progress_status: Optional[Any] = None,
+    concurrency: int = SUMMARY_CONCURRENCY,
 ) -> List[SegmentSummary]:
+    """
+    Map phase: summarize every node concurrently, at most ``concurrency`` at a time.
 
-    parser = SimpleNodeParser.from_defaults(chunk_size=1200, chunk_overlap=50)
-    nodes = parser.get_nodes_from_documents(docs)
+    Results are returned in node order regardless of completion order.
+    """
 
-    structured_llm = llm.with_structured_output(SegmentSummary)
-    chain = segment_prompt | structured_llm
+    nodes = pack_transcript_nodes(docs)
 
-    collapsed = []
     total = max(len(nodes), 1)
     sub_progress = progress_status.progress(0) if progress_status else None
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
 
-    for idx, node in enumerate(nodes):
-        md = node.metadata or {}
-        start = float(md.get("start", 0.0))
-        end = float(md.get("end", 0.0))
-        speaker = md.get("speaker", "unknown")
+    tasks = [
+        asyncio.ensure_future(_summarize_node_async(llm, idx, node, semaphore))
+        for idx, node in enumerate(nodes)
+    ]
+    collapsed: List[Optional[SegmentSummary]] = [None] * len(nodes)
+    try:
+        for done, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+            idx, seg = await next_result
+            collapsed[idx] = seg
+
+            if sub_progress:
+                text = nodes[idx].text
+                sub_progress.progress(
+                    done / total,
+                    text=f"[{done}/{len(nodes)}] " + text[:140] + ("..." if len(text) > 140 else "")
+                )
+    finally:
+        # A failed segment aborts the run; don't leave the others running
+        for task in tasks:
+            task.cancel()
 
-        speakers = [speaker]
+    return collapsed
 
-        if sub_progress:
-            sub_progress.progress(
-                (idx + 1) / total,
-                text=node.text[:140] + ("..." if len(node.text) > 140 else "")
-            )
 
-        seg: SegmentSummary = await chain.ainvoke(
-            {
-                "segment_index": idx,
-                "time_range": f"{start:.2f}s to {end:.2f}s",
-                "speakers": ", ".join(speakers),
-                "segment_text": node.text,
-            }
-        )
+async def _reduce_summaries_async(
+    llm: ChatOllama,
+    summaries: List[SegmentSummary],
+    budget: int,
+    progress_status: Optional[Any] = None,
+    concurrency: int = SUMMARY_CONCURRENCY,
+) -> List[SegmentSummary]:
+    """
+    Reduce phase: collapse summaries level by level until they fit ``budget``.
+
+    Each level packs consecutive summaries into groups that fit the budget and
+    merges every group in parallel, so the tree depth grows logarithmically
+    with the meeting length.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def _reduce_group(idx: int, group: List[SegmentSummary], level: int) -> SegmentSummary:
+        start = min(s.start_time for s in group)
+        end = max(s.end_time for s in group)
+        speakers = sorted({sp for s in group for sp in s.speakers})
+        lines = _truncate_to_budget("\n".join(_summary_line(s) for s in group), budget)
+
+        async with semaphore:
+            with metrics.stage("llm.reduce", level=level, segments=len(group)):
+                merged: SegmentSummary = await _ainvoke_structured(
+                    llm,
+                    reduce_prompt,
+                    SegmentSummary,
+                    {
+                        "segment_index": idx,
+                        "time_range": f"{start:.2f}s to {end:.2f}s",
+                        "speakers": ", ".join(speakers),
+                        "segment_summaries": lines,
+                    },
+                )
+
+        merged.segment_index = idx
+        merged.start_time = start
+        merged.end_time = end
+        merged.speakers = speakers
+        return merged
+
+    level = 0
+    while len(summaries) > 1 and sum(estimate_tokens(_summary_line(s)) for s in summaries) > budget:
+        level += 1
+        groups = _pack_summaries(summaries, budget)
+        if len(groups) == len(summaries):
+            # Every summary fills the budget alone; merge pairs so the tree still shrinks
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
 
-        seg.segment_index = idx
-        seg.start_time = start
-        seg.end_time = end
-        seg.speakers = speakers
+        if progress_status:
+            progress_status.write(
+                f"Reduce level {level}: collapsing {len(summaries)} summaries into {len(groups)}..."
+            )
 
-        collapsed.append(seg)
+        summaries = list(
+            await asyncio.gather(
+                *(_reduce_group(idx, group, level) for idx, group in enumerate(groups))
+            )
+        )
 
-    return collapsed
+    return summaries
 
 
 async def _generate_final_summary_async(
     llm: ChatOllama,
     segment_summaries: List[SegmentSummary],
     progress_status: Optional[Any] = None,
+    concurrency: int = SUMMARY_CONCURRENCY,
 ) -> MeetingSummary:
 
-    structured_llm = llm.with_structured_output(MeetingSummary)
-    chain = final_prompt | structured_llm
-
     if progress_status:
         progress_status.write(f"Combining {len(segment_summaries)} segment summaries...")
         progress_status.update(label="Collapsing summaries...", state="running")
 
-    bullet_lines = "\n".join(
-        f"- [{s.start_time:.1f}s–{s.end_time:.1f}s] {s.summary}"
-        for s in segment_summaries
+    budget = max(
+        CONTEXT_WINDOW
+        - SUMMARY_OUTPUT_RESERVE
+        - max(_prompt_overhead(final_prompt), _prompt_overhead(reduce_prompt)),
+        256,
     )
-
-    final_summary: MeetingSummary = await chain.ainvoke(
-        {
-            "segment_summaries": bullet_lines,
-        }
+    reduced = await _reduce_summaries_async(
+        llm, segment_summaries, budget, progress_status, concurrency
     )
 
+    bullet_lines = _truncate_to_budget("\n".join(_summary_line(s) for s in reduced), budget)
+
+    with metrics.stage("llm.final", segments=len(segment_summaries)):
+        final_summary: MeetingSummary = await _ainvoke_structured(
+            llm,
+            final_prompt,
+            MeetingSummary,
+            {
+                "segment_summaries": bullet_lines,
+            },
+        )
+
     if progress_status:
         progress_status.update(label="Final summary done.", state="complete")
 
@@ -289,33 +749,249 @@ def generate_summary(
         "final_summary": MeetingSummary
     }
     """
-    import asyncio
+    cache = get_llm_cache()
+    cache_before = cache.stats() if cache is not None else None
 
     async def _run():
+        with metrics.stage("summarize", rows=len(transcription_df)):
+            return await _summarize()
+
+    async def _summarize():
         docs = generate_transcript_docs(transcription_df)
 
         if progress_status:
             progress_status.write("Generating segment-level summaries...")
 
-        collapsed = await _summarize_segments_async(llm, docs, progress_status)
+        collapsed = await _summarize_segments_async(
+            llm,
+            docs,
+            progress_status,
+            concurrency=kwargs.get("concurrency", SUMMARY_CONCURRENCY),
+        )
 
         if progress_status:
             progress_status.write("Generating structured final summary...")
 
-        final_summary = await _generate_final_summary_async(llm, collapsed, progress_status)
+        final_summary = await _generate_final_summary_async(
+            llm,
+            collapsed,
+            progress_status,
+            concurrency=kwargs.get("concurrency", SUMMARY_CONCURRENCY),
+        )
 
         return collapsed, final_summary
 
-    try:
-        collapsed, summary = asyncio.run(_run())
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            collapsed, summary = loop.run_until_complete(_run())
-        finally:
-            loop.close()
+    collapsed, summary = run_on_llm_loop(_run())
+
+    if progress_status and cache is not None:
+        cache_after = cache.stats()
+        progress_status.write(
+            f"LLM cache: {cache_after['hits'] - cache_before['hits']} hits, "
+            f"{cache_after['misses'] - cache_before['misses']} misses."
+        )
 
     return {
         "collapsed_summaries": collapsed,
         "final_summary": summary,
     }
+
+
+# ---------------------------------------------------------------------------
+# Incremental (live) summarization
+# ---------------------------------------------------------------------------
+
+
+class IncrementalSummarizer:
+    """
+    Summarizes a transcript while it is still being produced.
+
+    Rows are buffered until they fill a ``chunk_tokens`` node, which is then
+    summarized right away on the shared LLM loop. Every ``refresh_every`` new
+    segment summaries (in transcript order) are folded into a rolling
+    MeetingSummary with ``update_prompt``, so the summary is extended rather
+    than recomputed from scratch. Once the summary passes
+    ``SUMMARY_LIVE_MAX_SHARE`` of the update budget it is first re-reduced with
+    ``compact_prompt``, so long meetings keep room for new segments.
+    ``on_update(summary, end_time)`` is called after every fold.
+
+    Usage:
+        live = IncrementalSummarizer(on_update=...)
+        live.add_rows(rows)          # as transcription produces them
+        payload = live.finish()      # same shape as generate_summary()
+    """
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        base_url: str = BASE_URL,
+        temperature: float = 0.01,
+        timeout: int = 240,
+        concurrency: int = SUMMARY_CONCURRENCY,
+        chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+        refresh_every: int = SUMMARY_LIVE_REFRESH,
+        on_update: Optional[Any] = None,
+    ):
+        self.llm = get_llm(model_name, base_url, temperature, timeout)
+        self.chunk_tokens = chunk_tokens
+        self.refresh_every = max(refresh_every, 1)
+        self.on_update = on_update
+        self.summary: Optional[MeetingSummary] = None
+        self.rows = 0
+        self.errors: List[str] = []
+
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self._fold_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self._pending: List[Document] = []
+        self._pending_tokens = 0
+        self._next_index = 0
+        self._segments: dict = {}
+        self._folded = 0
+        self._futures: List[Any] = []
+
+    def add_rows(self, rows: Any) -> None:
+        """
+        Add transcript rows (a DataFrame, a list of row dicts or one row dict).
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(rows)
+        if df.empty:
+            return
+
+        with self._lock:
+            for doc in generate_transcript_docs(df):
+                self.rows += 1
+                cost = estimate_tokens(f"[{doc.metadata['start']:.1f}s] {doc.text}")
+                if self._pending and self._pending_tokens + cost > self.chunk_tokens:
+                    self._flush()
+                self._pending.append(doc)
+                self._pending_tokens += cost
+            if self._pending_tokens >= self.chunk_tokens:
+                self._flush()
+
+    def _flush(self) -> None:
+        # Called with self._lock held
+        for node in pack_transcript_nodes(self._pending, self.chunk_tokens):
+            self._futures.append(
+                _submit_to_llm_loop(self._summarize(self._next_index, node))
+            )
+            self._next_index += 1
+        self._pending, self._pending_tokens = [], 0
+
+    async def _summarize(self, idx: int, node: TextNode) -> None:
+        try:
+            _, seg = await _summarize_node_async(self.llm, idx, node, self._semaphore)
+        except Exception as e:
+            # Keep going without this segment; the rest of the meeting still gets summarized
+            self.errors.append(f"segment {idx}: {e}")
+            print(f">>> Live summary: segment {idx} failed: {e}")
+            seg = None
+        self._segments[idx] = seg
+        await self._fold()
+
+    async def _fold(self, force: bool = False) -> None:
+        """
+        Fold the next contiguous run of finished segments into the rolling summary.
+        """
+        async with self._fold_lock:
+            ready = []
+            while self._folded + len(ready) in self._segments:
+                ready.append(self._segments[self._folded + len(ready)])
+            new = [s for s in ready if s is not None]
+            if len(ready) < self.refresh_every and not (force and ready):
+                return
+            if not new:
+                self._folded += len(ready)
+                return
+
+            budget = max(
+                CONTEXT_WINDOW - SUMMARY_OUTPUT_RESERVE - _prompt_overhead(update_prompt), 256
+            )
+            try:
+                if self.summary is None:
+                    lines = _truncate_to_budget("\n".join(_summary_line(s) for s in new), budget)
+                    with metrics.stage("llm.final", segments=len(new)):
+                        summary = await _ainvoke_structured(
+                            self.llm, final_prompt, MeetingSummary, {"segment_summaries": lines}
+                        )
+                else:
+                    limit = max(int(budget * SUMMARY_LIVE_MAX_SHARE), 128)
+                    if estimate_tokens(self.summary.model_dump_json()) > limit:
+                        await self._compact(limit)
+                    current = _truncate_to_budget(self.summary.model_dump_json(), limit)
+                    lines = _truncate_to_budget(
+                        "\n".join(_summary_line(s) for s in new),
+                        max(budget - estimate_tokens(current), 256),
+                    )
+                    with metrics.stage("llm.update", segments=len(new)):
+                        summary = await _ainvoke_structured(
+                            self.llm,
+                            update_prompt,
+                            MeetingSummary,
+                            {
+                                "current_summary": current,
+                                "segment_summaries": lines,
+                                "max_words": limit * 3 // 4,
+                            },
+                        )
+            except Exception as e:
+                # Leave the segments unfolded; the next fold (or finish) retries them
+                self.errors.append(f"update: {e}")
+                print(f">>> Live summary: update failed: {e}")
+                return
+
+            self._folded += len(ready)
+            self.summary = summary
+            if self.on_update is not None:
+                self.on_update(summary, new[-1].end_time)
+
+    async def _compact(self, limit: int) -> None:
+        """
+        Re-reduce the rolling summary to about ``limit`` tokens (kept as is on failure).
+        """
+        budget = max(
+            CONTEXT_WINDOW - SUMMARY_OUTPUT_RESERVE - _prompt_overhead(compact_prompt), 256
+        )
+        current = _truncate_to_budget(self.summary.model_dump_json(), budget)
+        try:
+            with metrics.stage("llm.compact"):
+                self.summary = await _ainvoke_structured(
+                    self.llm,
+                    compact_prompt,
+                    MeetingSummary,
+                    {"current_summary": current, "max_words": limit * 3 // 4},
+                )
+        except Exception as e:
+            # The update below still runs, on the summary truncated to the limit
+            self.errors.append(f"compact: {e}")
+            print(f">>> Live summary: compaction failed: {e}")
+
+    def snapshot(self) -> Optional[MeetingSummary]:
+        """
+        The rolling summary as of the last fold (None before the first one).
+        """
+        return self.summary
+
+    def finish(self) -> dict:
+        """
+        Summarize the remaining rows, fold everything and return the result.
+
+        Returns:
+        {
+            "collapsed_summaries": List[SegmentSummary],
+            "final_summary": MeetingSummary | None
+        }
+        """
+        with self._lock:
+            self._flush()
+            futures = list(self._futures)
+        for future in futures:
+            future.result()
+        run_on_llm_loop(self._fold(force=True))
+
+        collapsed = [self._segments[i] for i in sorted(self._segments) if self._segments[i] is not None]
+        return {
+            "collapsed_summaries": collapsed,
+            "final_summary": self.summary,
+        }
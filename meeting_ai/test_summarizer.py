@@ -0,0 +1,46 @@
+import asyncio
+import contextvars
+import json
+
+import metrics
+from bench_summarizer import start_mock_ollama, synthetic_transcript
+from summarizer import CONTEXT_WINDOW, IncrementalSummarizer, MeetingSummary, get_llm
+
+
+def test_llm_requests_carry_context_window():
+    # The reduce budget assumes CONTEXT_WINDOW; Ollama must be told to use it
+    server, stats = start_mock_ollama(latency=0)
+    try:
+        llm = get_llm(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+        asyncio.run(llm.ainvoke("hello"))
+    finally:
+        server.shutdown()
+    assert stats["requests"] == 1
+    assert stats["options"][0]["num_ctx"] == CONTEXT_WINDOW
+
+
+def test_live_summary_is_compacted_and_keeps_job_labels(tmp_path, monkeypatch):
+    log_path = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(metrics, "METRICS_LOG", str(log_path))
+    server, stats = start_mock_ollama(latency=0)
+
+    def run():
+        metrics.bind(job_id="job-1")
+        live = IncrementalSummarizer(
+            base_url=f"http://127.0.0.1:{server.server_address[1]}", refresh_every=1
+        )
+        # A rolling summary far past its share of the update prompt
+        live.summary = MeetingSummary(overall_summary="word " * CONTEXT_WINDOW)
+        live.add_rows(synthetic_transcript(20))
+        return live.finish()
+
+    try:
+        result = contextvars.copy_context().run(run)
+    finally:
+        server.shutdown()
+
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    stages = [r["stage"] for r in records]
+    assert "llm.compact" in stages and "llm.update" in stages
+    assert all(r.get("job_id") == "job-1" for r in records)
+    assert len(result["final_summary"].overall_summary) < CONTEXT_WINDOW
@@ -6,11 +6,14 @@ from contextlib import contextmanager
 
 import pandas as pd
 import torch
-import whisper
-from nemo.collections.asr.models.msdd_models import NeuralDiarizer
-from omegaconf import OmegaConf
 from pydub import AudioSegment
 import tempfile
+import wave
+
+import numpy as np
+
+import metrics
+from vad import join_speech_regions, load_nemo_vad_segments, trim_to_speech
 
 # Set the device based on availability
 device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -18,6 +21,37 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 # Global variable to store singleton instances
 MODEL_REGISTRY = {}
 
+# Whisper backend selection ("openai" or "faster-whisper") and its settings
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "openai")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "medium.en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "")
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "5"))
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "1"))
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+MODEL_DIR = "/root/.cache/torch/NeMo"
+
+# Long-form diarization: "auto" switches to overlapping windows for WAV files
+# longer than DIARIZE_LONG_FORM_MIN_S, "on" always windows, "off" never does.
+DIARIZE_LONG_FORM = os.getenv("DIARIZE_LONG_FORM", "auto")
+DIARIZE_LONG_FORM_MIN_S = float(os.getenv("DIARIZE_LONG_FORM_MIN_S", "1800"))
+DIARIZE_WINDOW_S = float(os.getenv("DIARIZE_WINDOW_S", "900"))
+DIARIZE_OVERLAP_S = float(os.getenv("DIARIZE_OVERLAP_S", "30"))
+DIARIZE_SPEAKER_THRESHOLD = float(os.getenv("DIARIZE_SPEAKER_THRESHOLD", "0.55"))
+DIARIZE_EMBEDDING_MAX_S = float(os.getenv("DIARIZE_EMBEDDING_MAX_S", "30"))
+
+RTTM_COLUMNS = [
+    "Type",
+    "FileID",
+    "ChannelID",
+    "Start",
+    "Duration",
+    "NA1",
+    "NA2",
+    "SpeakerID",
+    "NA3",
+    "NA4",
+]
+
 
 @contextmanager
 def torch_cleanup():
@@ -30,31 +64,158 @@ def torch_cleanup():
         gc.collect()
 
 
+class WhisperBackend:
+    """
+    Common interface for Whisper transcription engines.
+
+    ``transcribe`` accepts a path to an audio file (or a 16 kHz float32 array)
+    and returns a dict with at least a ``text`` key, matching openai-whisper.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        self.model_name = model_name
+
+    def transcribe(self, audio, language="en"):
+        raise NotImplementedError
+
+
+class OpenAIWhisperBackend(WhisperBackend):
+    """Reference openai-whisper engine (PyTorch, fp32 on CPU / fp16 on GPU)."""
+
+    name = "openai"
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        super().__init__(model_name)
+        import whisper
+
+        self.model = whisper.load_model(model_name, download_root=MODEL_DIR).to(device)
+
+    def transcribe(self, audio, language="en"):
+        return self.model.transcribe(audio, language=language)
+
+
+class FasterWhisperBackend(WhisperBackend):
+    """
+    CTranslate2 engine via faster-whisper.
+
+    Defaults to int8 weights on CPU (int8_float16 on GPU); beam size and
+    batched decoding are configurable via WHISPER_BEAM_SIZE / WHISPER_BATCH_SIZE.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE,
+                 beam_size=WHISPER_BEAM_SIZE, batch_size=WHISPER_BATCH_SIZE):
+        super().__init__(model_name)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "WHISPER_BACKEND=faster-whisper requires the 'faster-whisper' package"
+            ) from e
+
+        if not compute_type:
+            compute_type = "int8_float16" if device == "cuda" else "int8"
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.batch_size = batch_size
+        self.model = WhisperModel(
+            model_name,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=WHISPER_CPU_THREADS,
+            download_root=MODEL_DIR,
+        )
+        self.pipeline = None
+        if batch_size > 1:
+            from faster_whisper import BatchedInferencePipeline
+
+            self.pipeline = BatchedInferencePipeline(model=self.model)
+
+    def transcribe(self, audio, language="en"):
+        if self.pipeline is not None:
+            segments, info = self.pipeline.transcribe(
+                audio, language=language, beam_size=self.beam_size, batch_size=self.batch_size
+            )
+        else:
+            segments, info = self.model.transcribe(
+                audio, language=language, beam_size=self.beam_size
+            )
+        # segments is a lazy generator; decoding happens while it is consumed
+        segments = list(segments)
+        return {
+            "text": "".join(seg.text for seg in segments),
+            "segments": [
+                {"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments
+            ],
+            "language": info.language,
+        }
+
+
+WHISPER_BACKENDS = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
 # Function to initialize and return the Whisper model (singleton pattern)
-def get_whisper_model(model_name="medium.en"):
-    """Initialize and return the Whisper model (singleton)."""
+def get_whisper_model(model_name=None, backend=None):
+    """Initialize and return the configured Whisper backend (singleton per backend/model)."""
     global MODEL_REGISTRY
-    if "whisper_model" not in MODEL_REGISTRY:
-        print("Loading Whisper model...")
-        model_dir = "/root/.cache/torch/NeMo"
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
-        whisper_model = whisper.load_model(model_name, download_root=model_dir).to(
-            device
+    model_name = model_name or WHISPER_MODEL
+    backend = backend or WHISPER_BACKEND
+    if backend not in WHISPER_BACKENDS:
+        raise ValueError(
+            f"Unknown WHISPER_BACKEND '{backend}', expected one of {sorted(WHISPER_BACKENDS)}"
         )
-        MODEL_REGISTRY["whisper_model"] = whisper_model
+    key = ("whisper_model", backend, model_name)
+    if key not in MODEL_REGISTRY:
+        print(f"Loading Whisper model ({backend}, {model_name})...")
+        if not os.path.exists(MODEL_DIR):
+            os.makedirs(MODEL_DIR)
+        MODEL_REGISTRY[key] = WHISPER_BACKENDS[backend](model_name)
     else:
         print("Using cached Whisper model...")
-    return MODEL_REGISTRY["whisper_model"]
+    return MODEL_REGISTRY[key]
 
 
 # Function to initialize and return the Neural Diarizer model (singleton pattern)
 def get_diarizer_model(cfg):
     """Initialize and return the Neural Diarizer model (singleton pattern)."""
+    from nemo.collections.asr.models.msdd_models import NeuralDiarizer
+
+    instrument_diarizer()
     diarizer_model = NeuralDiarizer(cfg=cfg).to(device)
     return diarizer_model
 
 
+# Function to preload the transcription stack before the first job arrives
+def warm_up():
+    """Import NeMo and load the configured Whisper model so the first job starts hot."""
+    with metrics.stage("warmup"):
+        instrument_diarizer()
+        get_whisper_model()
+
+
+# Function to record NeMo's diarization sub-stages as metrics
+def instrument_diarizer():
+    """Wrap NeMo's VAD, embedding, clustering and MSDD steps in metrics stages (idempotent)."""
+    from nemo.collections.asr.models import clustering_diarizer
+    from nemo.collections.asr.models.msdd_models import NeuralDiarizer
+
+    metrics.instrument_methods(
+        clustering_diarizer.ClusteringDiarizer,
+        {
+            "_perform_speech_activity_detection": "diarize.vad",
+            "_extract_embeddings": "diarize.embeddings",
+        },
+    )
+    metrics.instrument_methods(clustering_diarizer, {"perform_clustering": "diarize.clustering"})
+    metrics.instrument_methods(NeuralDiarizer, {"run_pairwise_diarization": "diarize.msdd"})
+
+
 # Function to create the diarization configuration file and setup the environment
 def create_diarization_config(audio_filepath, output_dir, domain_type="telephonic"):
     """
@@ -74,6 +235,8 @@ def create_diarization_config(audio_filepath, output_dir, domain_type="telephoni
     if not os.path.exists(config_path):
         shutil.copy(config_filename, config_path)
 
+    from omegaconf import OmegaConf
+
     # Load the configuration file
     config = OmegaConf.load(config_path)
     # Setup directories and create manifest
@@ -105,6 +268,258 @@ def create_diarization_config(audio_filepath, output_dir, domain_type="telephoni
     return config
 
 
+# Function to load a NeMo RTTM file into a DataFrame
+def read_rttm(rttm_file):
+    """Read an RTTM file and add an ``End`` column (seconds)."""
+    rttm_df = pd.read_csv(
+        rttm_file,
+        sep=r"\s+",
+        header=None,
+        names=RTTM_COLUMNS,
+    )
+    rttm_df["End"] = rttm_df["Start"] + rttm_df["Duration"]
+    return rttm_df
+
+
+# Function to decide whether a recording should be diarized in windows
+def use_long_form_diarization(audio_file):
+    """True when ``audio_file`` should go through ``diarize_long_form``."""
+    if DIARIZE_LONG_FORM == "off" or not audio_file.lower().endswith(".wav"):
+        return False
+    if DIARIZE_LONG_FORM == "on":
+        return True
+    with wave.open(audio_file, "rb") as src:
+        duration = src.getnframes() / float(src.getframerate())
+    return duration > DIARIZE_LONG_FORM_MIN_S
+
+
+# Function to split a WAV file into overlapping windows without loading it whole
+def split_audio_windows(audio_file, output_dir, window_s=DIARIZE_WINDOW_S, overlap_s=DIARIZE_OVERLAP_S):
+    """
+    Write overlapping WAV windows of ``audio_file`` into ``output_dir``.
+
+    Frames are streamed a minute at a time, so memory stays flat regardless of
+    the recording length.
+
+    Returns:
+    - list[dict]: One entry per window with ``index``, ``path``, ``start``, ``end``
+      and the ``own_start``/``own_end`` range whose segments the window keeps.
+    """
+    if overlap_s >= window_s:
+        raise ValueError("DIARIZE_OVERLAP_S must be smaller than DIARIZE_WINDOW_S")
+    os.makedirs(output_dir, exist_ok=True)
+
+    windows = []
+    with wave.open(audio_file, "rb") as src:
+        rate = src.getframerate()
+        duration = src.getnframes() / float(rate)
+        start = 0.0
+        while True:
+            end = min(start + window_s, duration)
+            path = os.path.join(output_dir, f"window_{len(windows):03d}.wav")
+            src.setpos(int(start * rate))
+            with wave.open(path, "wb") as dst:
+                dst.setparams(src.getparams())
+                remaining = int((end - start) * rate)
+                while remaining > 0:
+                    frames = src.readframes(min(remaining, rate * 60))
+                    if not frames:
+                        break
+                    dst.writeframes(frames)
+                    remaining -= len(frames) // (src.getsampwidth() * src.getnchannels())
+            windows.append({"index": len(windows), "path": path, "start": start, "end": end})
+            if end >= duration:
+                break
+            start += window_s - overlap_s
+
+    # Each overlap is split down the middle between the two windows sharing it
+    for n, win in enumerate(windows):
+        win["own_start"] = win["start"] + (overlap_s / 2 if n > 0 else 0.0)
+        win["own_end"] = win["end"] - (overlap_s / 2 if n < len(windows) - 1 else 0.0)
+    return windows
+
+
+# Function to initialize and return the speaker embedding model (singleton pattern)
+def get_speaker_model(model_name="titanet_large"):
+    """Initialize and return the TitaNet speaker embedding model (singleton)."""
+    from nemo.collections.asr.models import EncDecSpeakerLabelModel
+
+    key = ("speaker_model", model_name)
+    if key not in MODEL_REGISTRY:
+        MODEL_REGISTRY[key] = EncDecSpeakerLabelModel.from_pretrained(
+            model_name, map_location=device
+        ).eval()
+    return MODEL_REGISTRY[key]
+
+
+# Function to embed each diarized speaker of one window
+def window_speaker_embeddings(window_path, rttm_df, max_speech_s=DIARIZE_EMBEDDING_MAX_S):
+    """
+    Compute one L2-normalized embedding per local speaker of a window.
+
+    Up to ``max_speech_s`` seconds of each speaker's longest turns are embedded.
+
+    Returns:
+    - dict: local speaker label -> (embedding, seconds of speech used).
+    """
+    speaker_model = get_speaker_model()
+    embeddings = {}
+    with wave.open(window_path, "rb") as src:
+        rate = src.getframerate()
+        for speaker, turns in rttm_df.groupby("SpeakerID"):
+            chunks, used = [], 0.0
+            for _, turn in turns.sort_values("Duration", ascending=False).iterrows():
+                if used >= max_speech_s:
+                    break
+                take = min(float(turn["Duration"]), max_speech_s - used)
+                src.setpos(int(float(turn["Start"]) * rate))
+                chunks.append(src.readframes(int(take * rate)))
+                used += take
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
+                with wave.open(temp_audio.name, "wb") as dst:
+                    dst.setparams(src.getparams())
+                    dst.writeframes(b"".join(chunks))
+            try:
+                with torch.no_grad():
+                    emb = speaker_model.get_embedding(temp_audio.name).squeeze().cpu().numpy()
+            finally:
+                os.remove(temp_audio.name)
+            embeddings[speaker] = (emb / (np.linalg.norm(emb) + 1e-10), used)
+    return embeddings
+
+
+# Function to map per-window speaker labels onto global speakers
+def assign_global_speakers(window_embeddings, threshold=DIARIZE_SPEAKER_THRESHOLD):
+    """
+    Reconcile speaker labels across windows by embedding similarity.
+
+    Windows are processed in order against running global speaker centroids.
+    Local speakers are matched greedily by cosine similarity (at most one local
+    speaker per global speaker within a window, since the window's diarizer
+    already separated them); unmatched speakers start a new global speaker.
+
+    Args:
+    - window_embeddings (list[dict]): Per window, local label -> (embedding, weight).
+    - threshold (float): Minimum cosine similarity to reuse a global speaker.
+
+    Returns:
+    - list[dict]: Per window, local label -> global speaker index.
+    """
+    centroids = []
+    mappings = []
+    for local in window_embeddings:
+        labels = list(local)
+        mapping = {}
+        if centroids and labels:
+            global_mat = np.stack([c / (np.linalg.norm(c) + 1e-10) for c in centroids])
+            local_mat = np.stack([local[label][0] for label in labels])
+            sim = local_mat @ global_mat.T
+            used_global = set()
+            for flat in np.argsort(-sim, axis=None):
+                i, j = np.unravel_index(flat, sim.shape)
+                if sim[i, j] < threshold:
+                    break
+                if labels[i] in mapping or j in used_global:
+                    continue
+                mapping[labels[i]] = int(j)
+                used_global.add(j)
+        for label in labels:
+            emb, weight = local[label]
+            if label not in mapping:
+                centroids.append(np.zeros_like(emb))
+                mapping[label] = len(centroids) - 1
+            centroids[mapping[label]] += emb * max(weight, 1e-3)
+        mappings.append(mapping)
+    return mappings
+
+
+# Function to diarize a long recording in overlapping windows with bounded memory
+def diarize_long_form(audio_file, output_dir, domain_type="telephonic", progress_bar=None):
+    """
+    Diarize ``audio_file`` window by window and write one global RTTM.
+
+    Each window is diarized independently with the usual NeMo pipeline, so peak
+    memory depends on the window length rather than the recording length.
+    Speaker labels are made consistent across windows with
+    ``assign_global_speakers``. The merged RTTM (and VAD output, when present)
+    is written where the single-pass pipeline would have put it.
+
+    Returns:
+    - str: Path to the merged RTTM file.
+    """
+    audio_name = os.path.splitext(os.path.basename(audio_file))[0]
+    windows_dir = os.path.join(output_dir, "windows")
+    windows = split_audio_windows(audio_file, windows_dir)
+
+    window_segments, window_embeddings, window_vad = [], [], []
+    for win in windows:
+        if progress_bar is not None:
+            progress_bar.write(
+                f"Diarizing window {win['index'] + 1} of {len(windows)} "
+                f"({win['start']:.0f}s to {win['end']:.0f}s)..."
+            )
+        win_dir = os.path.join(windows_dir, f"window_{win['index']:03d}")
+        os.makedirs(win_dir, exist_ok=True)
+        config = create_diarization_config(win["path"], win_dir, domain_type)
+        with torch_cleanup(), metrics.stage("diarize.window", window=win["index"]):
+            diarizer_model = get_diarizer_model(config)
+            diarizer_model.diarize()
+            del diarizer_model
+
+        win_name = os.path.splitext(os.path.basename(win["path"]))[0]
+        rttm_df = read_rttm(os.path.join(win_dir, "pred_rttms", f"{win_name}.rttm"))
+        with torch_cleanup(), metrics.stage("diarize.window_embeddings", window=win["index"]):
+            window_embeddings.append(
+                window_speaker_embeddings(win["path"], rttm_df) if len(rttm_df) else {}
+            )
+        window_segments.append(rttm_df)
+        window_vad.append(load_nemo_vad_segments(win_dir, win["path"]) or [])
+
+    mappings = assign_global_speakers(window_embeddings)
+
+    # Shift each window's segments to global time and keep only its own range
+    segments = []
+    for win, rttm_df, mapping in zip(windows, window_segments, mappings):
+        for _, row in rttm_df.iterrows():
+            start = max(win["start"] + float(row["Start"]), win["own_start"])
+            end = min(win["start"] + float(row["End"]), win["own_end"])
+            if end > start:
+                segments.append((start, end, f"speaker_{mapping[row['SpeakerID']]}"))
+    segments.sort()
+
+    rttm_dir = os.path.join(output_dir, "pred_rttms")
+    os.makedirs(rttm_dir, exist_ok=True)
+    rttm_file = os.path.join(rttm_dir, f"{audio_name}.rttm")
+    with open(rttm_file, "w") as f:
+        for start, end, speaker in segments:
+            f.write(
+                f"SPEAKER {audio_name} 1 {start:.3f} {end - start:.3f} <NA> <NA> {speaker} <NA> <NA>\n"
+            )
+
+    # Merge the windows' VAD output so speech trimming can reuse it
+    vad_dir = os.path.join(output_dir, "vad_outputs")
+    os.makedirs(vad_dir, exist_ok=True)
+    with open(os.path.join(vad_dir, "vad_out.json"), "w") as f:
+        for win, vad_segments in zip(windows, window_vad):
+            for seg_start, seg_end in vad_segments:
+                start = max(win["start"] + seg_start, win["own_start"])
+                end = min(win["start"] + seg_end, win["own_end"])
+                if end > start:
+                    f.write(json.dumps({
+                        "audio_filepath": audio_file,
+                        "offset": round(start, 3),
+                        "duration": round(end - start, 3),
+                        "label": "UNK",
+                    }) + "\n")
+
+    if progress_bar is not None:
+        progress_bar.write(
+            f"Reconciled {sum(len(m) for m in mappings)} window speakers into "
+            f"{len({v for m in mappings for v in m.values()})} global speakers."
+        )
+    return rttm_file
+
+
 # Function to merge consecutive speaker segments if they are within a specified gap
 def merge_consecutive_speaker_segments(df, gap_threshold=2.0):
     """Merge consecutive speaker segments if they are within the specified gap."""
@@ -140,6 +555,7 @@ def diarize_split_transcribe(
     domain_type="telephonic",
     merge_gap_threshold=2.0,
     progress_bar=None,
+    on_row=None,
 ):
     """
     Perform diarization and Whisper transcription in a single pipeline.
@@ -149,6 +565,7 @@ def diarize_split_transcribe(
     - domain_type (str): Diarization domain type ("telephonic", "meeting", or "general").
     - output_dir (str): Directory to store intermediate and output files.
     - merge_gap_threshold (float): Time gap (in seconds) to merge consecutive speaker segments.
+    - on_row (callable): Called with each transcribed row (dict) as soon as it is ready.
 
     Returns:
     - pd.DataFrame: DataFrame containing Speaker, Start Time, End Time, and Whisper Transcription.
@@ -164,14 +581,19 @@ def diarize_split_transcribe(
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
-        # Step 1: Create diarization config and manifest
-        config = create_diarization_config(audio_file, output_dir, domain_type)
+        if use_long_form_diarization(audio_file):
+            # Steps 1-2 (long-form): diarize overlapping windows and reconcile speakers
+            with metrics.stage("diarize", mode="long-form"):
+                diarize_long_form(audio_file, output_dir, domain_type, progress_bar)
+        else:
+            # Step 1: Create diarization config and manifest
+            config = create_diarization_config(audio_file, output_dir, domain_type)
 
-        # Step 2: Diarize using NeMo's Neural Diarizer with torch cleanup context
-        with torch_cleanup():
-            diarizer_model = get_diarizer_model(config)
-            diarizer_model.diarize()
-            del diarizer_model
+            # Step 2: Diarize using NeMo's Neural Diarizer with torch cleanup context
+            with torch_cleanup(), metrics.stage("diarize"):
+                diarizer_model = get_diarizer_model(config)
+                diarizer_model.diarize()
+                del diarizer_model
 
         # Step 3: Load RTTM file and generate segmentation boundaries
         rttm_file = os.path.join(
@@ -183,24 +605,7 @@ def diarize_split_transcribe(
             raise FileNotFoundError(f"RTTM file not found: {rttm_file}")
         if progress_bar is not None:
             progress_bar.write("Diarization completed. Checking speaker segments...")
-        rttm_df = pd.read_csv(
-            rttm_file,
-            delim_whitespace=True,
-            header=None,
-            names=[
-                "Type",
-                "FileID",
-                "ChannelID",
-                "Start",
-                "Duration",
-                "NA1",
-                "NA2",
-                "SpeakerID",
-                "NA3",
-                "NA4",
-            ],
-        )
-        rttm_df["End"] = rttm_df["Start"] + rttm_df["Duration"]
+        rttm_df = read_rttm(rttm_file)
 
         # Step 4: Merge consecutive speaker segments within the specified gap
         rttm_df = merge_consecutive_speaker_segments(
@@ -210,56 +615,69 @@ def diarize_split_transcribe(
             progress_bar.write("Collating speaker segments for transcription...")
         # Step 5: Transcribe each speaker segment using Whisper within context
         transcriptions = []
-        with torch_cleanup():
-            whisper_model = get_whisper_model()
+        with torch_cleanup(), metrics.stage("transcribe"):
+            with metrics.stage("whisper.load"):
+                whisper_model = get_whisper_model()
             audio = AudioSegment.from_file(audio_file)
+            # Speech segments from the diarizer's VAD; None falls back to the energy VAD per turn
+            vad_segments = load_nemo_vad_segments(output_dir, audio_file)
+            decoded_ms = 0
             sub_progress = (
                 progress_bar.progress(0) if progress_bar is not None else None
             )
 
-            # Iterate over the rows and adjust segment boundaries
+            # Iterate over the speaker turns and keep only their speech regions
             for n, (index, row) in enumerate(rttm_df.iterrows()):
                 speaker = row["SpeakerID"]
-                start_time = row["Start"] * 1000  # Convert start time to milliseconds
-
-                # Determine the end time: either the start time of the next segment or the end of the file
-                if n < len(rttm_df) - 1:
-                    end_time = rttm_df.iloc[n + 1]["Start"] * 1000
-                else:
-                    end_time = len(audio)  # Last segment: go till the end of the audio
+                # Use the turn's own end; the gap up to the next turn is silence or cross-talk
+                regions = trim_to_speech(
+                    audio, float(row["Start"]), float(row["End"]), vad_segments
+                )
 
                 # Update progress bar with speaker and segment information
                 if sub_progress is not None:
                     sub_progress.progress(
                         n / len(rttm_df),
                         text=f"""Transcribing `{speaker}` `{int(n)}` out of {len(rttm_df)} segments 
-                                between `{row["Start"]:.3f}s` to `{end_time / 1000.0:.3f}s`...""",
+                                between `{row["Start"]:.3f}s` to `{row["End"]:.3f}s`...""",
                     )
 
-                # Extract the audio segment for transcription
-                segment = audio[start_time:end_time]
+                if not regions:
+                    continue
+
+                # Extract only the speech of this turn for transcription
+                segment = join_speech_regions(audio, regions)
+                decoded_ms += len(segment)
 
                 # Save segment temporarily and transcribe
                 with tempfile.NamedTemporaryFile(
                     suffix=".wav", delete=False
                 ) as temp_audio:
                     segment.export(temp_audio.name, format="wav")
-                    result = whisper_model.transcribe(temp_audio.name, language="en")
+                    with metrics.stage(
+                        "whisper.segment", speaker=speaker, audio_s=len(segment) / 1000.0
+                    ):
+                        result = whisper_model.transcribe(temp_audio.name, language="en")
                     os.remove(temp_audio.name)
 
                 # Store the transcription result
                 transcriptions.append(
                     {
                         "Speaker": speaker,
-                        "Start Time": row["Start"],
-                        "End Time": end_time
-                        / 1000.0,  # Convert back to seconds for consistency
+                        "Start Time": regions[0][0],
+                        "End Time": regions[-1][1],
                         "Whisper Transcription": result["text"],
                     }
                 )
+                if on_row is not None:
+                    on_row(transcriptions[-1])
 
             if sub_progress is not None:
                 sub_progress.progress(1.0, text="Transcription completed.")
+        if progress_bar is not None:
+            progress_bar.write(
+                f"Decoded {decoded_ms / 1000.0:.1f}s of speech out of {len(audio) / 1000.0:.1f}s of audio."
+            )
         if progress_bar is not None:
             progress_bar.write("Transcription completed.")
         transcriptions_df = pd.DataFrame.from_records(transcriptions)
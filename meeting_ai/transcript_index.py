@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+# Embedding settings: "ollama" uses EMBED_MODEL on the Ollama server (provisioned by
+# docker-compose), "local" a deterministic hashing embedder that needs no server.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "ollama")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+EMBED_BASE_URL = os.getenv("EMBED_BASE_URL", os.getenv("BASE_URL", "http://localhost:11434"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+LOCAL_EMBED_DIM = int(os.getenv("LOCAL_EMBED_DIM", "384"))
+
+# Transcript rows are packed into chunks of up to this many tokens before embedding
+INDEX_CHUNK_TOKENS = int(os.getenv("INDEX_CHUNK_TOKENS", "300"))
+INDEX_FILE = "transcript_index.npz"
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+class OllamaEmbedder:
+    """Embeddings from an Ollama embedding model (``nomic-embed-text`` by default)."""
+
+    def __init__(self, model_name=EMBED_MODEL, base_url=EMBED_BASE_URL, batch_size=EMBED_BATCH_SIZE):
+        from langchain_ollama import OllamaEmbeddings
+
+        self.name = f"ollama:{model_name}"
+        self.batch_size = batch_size
+        self.client = OllamaEmbeddings(model=model_name, base_url=base_url)
+        # nomic-embed-text is trained with task prefixes for asymmetric search
+        self.nomic = model_name.startswith("nomic-embed-text")
+
+    def embed_documents(self, texts):
+        if self.nomic:
+            texts = [f"search_document: {t}" for t in texts]
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self.client.embed_documents(texts[i:i + self.batch_size]))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_query(self, text):
+        if self.nomic:
+            text = f"search_query: {text}"
+        return np.asarray(self.client.embed_query(text), dtype=np.float32)
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder: signed feature hashing of words and word bigrams.
+
+    Needs no model or server, so it stands in for the Ollama embedder in tests
+    and offline runs. Retrieval is lexical rather than semantic.
+    """
+
+    def __init__(self, dim=LOCAL_EMBED_DIM):
+        self.name = f"local-hash:{dim}"
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = _WORD.findall(text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return np.stack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+EMBEDDERS = {
+    "ollama": OllamaEmbedder,
+    "local": HashingEmbedder,
+}
+
+
+def get_embedder(backend=None):
+    """Return an embedder for ``backend`` (defaults to EMBED_BACKEND)."""
+    backend = backend or EMBED_BACKEND
+    if backend not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; choose from {sorted(EMBEDDERS)}")
+    return EMBEDDERS[backend]()
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class TranscriptIndex:
+    """
+    Vector index over packed transcript chunks with time-stamped metadata.
+
+    Vectors are L2-normalized and kept in one float32 matrix, so a query is a
+    single matrix-vector product followed by a partial sort.
+    """
+
+    def __init__(self, vectors, chunks, embedder_name):
+        self.vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self.chunks = chunks
+        self.embedder_name = embedder_name
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def build(cls, transcription_df, embedder=None, chunk_tokens=INDEX_CHUNK_TOKENS):
+        """
+        Pack the transcript rows into chunks and embed them.
+
+        Args:
+        - transcription_df (pd.DataFrame): Speaker, Start Time, End Time, Whisper Transcription.
+        - embedder: Object with embed_documents/embed_query (defaults to get_embedder()).
+        - chunk_tokens (int): Token budget per chunk.
+        """
+        from summarizer import generate_transcript_docs, pack_transcript_nodes
+
+        embedder = embedder or get_embedder()
+        nodes = pack_transcript_nodes(generate_transcript_docs(transcription_df), chunk_tokens)
+        chunks = [
+            {
+                "start": float(node.metadata["start"]),
+                "end": float(node.metadata["end"]),
+                "speakers": list(node.metadata["speakers"]),
+                "text": node.text,
+            }
+            for node in nodes
+        ]
+        vectors = embedder.embed_documents([c["text"] for c in chunks])
+        return cls(vectors.reshape(len(chunks), -1), chunks, embedder.name)
+
+    def save(self, path):
+        """Write the index to a single ``.npz`` file (no pickled objects)."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            vectors=self.vectors,
+            meta=np.array(json.dumps({"embedder": self.embedder_name, "chunks": self.chunks})),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["vectors"], meta["chunks"], meta["embedder"])
+
+    def query(self, question, k=5, speaker=None, embedder=None):
+        """
+        Return the ``k`` chunks most similar to ``question``.
+
+        Args:
+        - question (str): Free-text query.
+        - k (int): Number of snippets to return.
+        - speaker (str): Only search chunks where this speaker talks, and keep only their lines.
+        - embedder: Must match the one the index was built with (defaults to get_embedder()).
+
+        Returns:
+        - list[dict]: ``start``, ``end``, ``speakers``, ``text`` and ``score``, best first.
+        """
+        embedder = embedder or get_embedder()
+        if embedder.name != self.embedder_name:
+            raise ValueError(
+                f"Index was built with {self.embedder_name}, query embedder is {embedder.name}"
+            )
+        if not self.chunks:
+            return []
+
+        scores = self.vectors @ _normalize(embedder.embed_query(question))
+        candidates = np.arange(len(self.chunks))
+        if speaker is not None:
+            candidates = np.array(
+                [i for i, c in enumerate(self.chunks) if speaker in c["speakers"]], dtype=np.int64
+            )
+            if candidates.size == 0:
+                return []
+
+        k = min(k, candidates.size)
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            chunk = dict(self.chunks[i], score=float(scores[i]))
+            if speaker is not None:
+                chunk["text"] = "\n".join(
+                    line for line in chunk["text"].split("\n") if f"] {speaker}: " in line
+                )
+            results.append(chunk)
+        return results
+
+
+# Function to build and persist the index for a transcript
+def index_transcript(transcription_df, output_dir, embedder=None):
+    """
+    Build the transcript index and save it to ``output_dir``.
+
+    Returns:
+    - str: Path of the saved index.
+    """
+    index = TranscriptIndex.build(transcription_df, embedder)
+    path = os.path.join(output_dir, INDEX_FILE)
+    index.save(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query a transcript embedding index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index a transcript CSV")
+    build.add_argument("csv")
+    build.add_argument("--index", default=INDEX_FILE)
+    build.add_argument("--backend", choices=sorted(EMBEDDERS), default=None)
+
+    ask = sub.add_parser("query", help="Query a saved index")
+    ask.add_argument("index")
+    ask.add_argument("question")
+    ask.add_argument("-k", type=int, default=5)
+    ask.add_argument("--speaker", default=None)
+    ask.add_argument("--backend", choices=sorted(EMBEDDERS), default=None)
+
+    args = parser.parse_args()
+    embedder = get_embedder(args.backend)
+
+    if args.command == "build":
+        t0 = time.perf_counter()
+        index = TranscriptIndex.build(pd.read_csv(args.csv), embedder)
+        index.save(args.index)
+        print(f"Indexed {len(index)} chunks in {time.perf_counter() - t0:.2f}s -> {args.index}")
+    else:
+        index = TranscriptIndex.load(args.index)
+        t0 = time.perf_counter()
+        hits = index.query(args.question, k=args.k, speaker=args.speaker, embedder=embedder)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        for hit in hits:
+            print(f"[{hit['start']:.1f}s–{hit['end']:.1f}s] ({hit['score']:.3f}) {', '.join(hit['speakers'])}")
+            print(hit["text"])
+            print()
+        print(f"{len(hits)} results in {elapsed_ms:.1f} ms")
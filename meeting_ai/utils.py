@@ -1,10 +1,16 @@
 import tempfile, os, json
 from pydub import AudioSegment
 import shutil
-import base64
+import hashlib
+import html
+import time
 import streamlit as st
 
-DOWNLOAD_FOLDER = os.path.join("static", "downloads")
+from downloads import DOWNLOAD_FOLDER, STAGED_MARKER, cleanup_downloads, download_url
+
+# Seconds between sweeps of expired staged downloads
+DOWNLOAD_CLEANUP_INTERVAL = 60
+_last_download_cleanup = 0.0
 
 # Function to convert video to audio (MP3) if needed
 def convert_video_to_audio(video_file, output_file, output_format="mp3"):
@@ -28,44 +34,104 @@ def cleanup_temp_files(output_dir):
         shutil.rmtree(output_dir)
 
 
-def generate_html_download_link(file_path, link_label, file_type):
+# Function to write a text file atomically, and only when its content changed
+def write_text_if_changed(path, text):
+    """
+    Replace ``path`` with ``text`` through a temporary file and ``os.replace``.
+
+    A staged download hard-linked to the old file keeps the old, complete inode,
+    so a download in progress never sees the file being rewritten.
+
+    Returns:
+    - bool: True if the file was written.
+    """
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+# Function to place a file in DOWNLOAD_FOLDER without reading it into memory
+def stage_download(file_path, file_name=None):
+    """
+    Link (or copy) a file into DOWNLOAD_FOLDER so the download server can stream it.
+
+    Staged files are removed once their newest link has expired (see
+    downloads.cleanup_downloads); the sweep runs here at most once a minute.
+
+    Args:
+    - file_path (str): Path of the file to stage.
+    - file_name (str): Name to download it as (defaults to the file's basename).
+
+    Returns:
+    - str: Path of the staged file relative to DOWNLOAD_FOLDER.
     """
-    Generates an HTML anchor tag for downloading files using base64 encoding.
+    file_name = os.path.basename(file_name or file_path)
+    # One directory per source file so same-named outputs of different jobs don't collide
+    bucket = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:16]
+    rel_path = os.path.join(bucket, file_name)
+    staged = os.path.join(DOWNLOAD_FOLDER, rel_path)
+
+    if not os.path.exists(staged) or os.path.getmtime(staged) < os.path.getmtime(file_path):
+        os.makedirs(os.path.dirname(staged), exist_ok=True)
+        tmp_path = f"{staged}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(file_path, tmp_path)
+        except OSError:
+            # Different filesystem: copy in chunks
+            shutil.copyfile(file_path, tmp_path)
+        os.replace(tmp_path, staged)
+    # A link is about to be signed: keep this file until that link expires
+    with open(os.path.join(os.path.dirname(staged), STAGED_MARKER), "a"):
+        pass
+    os.utime(os.path.join(os.path.dirname(staged), STAGED_MARKER))
+
+    global _last_download_cleanup
+    if time.time() - _last_download_cleanup > DOWNLOAD_CLEANUP_INTERVAL:
+        _last_download_cleanup = time.time()
+        cleanup_downloads(DOWNLOAD_FOLDER)
+    return rel_path
+
+
+def generate_html_download_link(file_path, link_label, file_type, base_url=None):
+    """
+    Generates an HTML anchor tag for downloading a file through the download server.
 
     Args:
     - file_path (str): Path to the file to be downloaded.
     - link_label (str): The label to display on the download link.
-    - file_type (str): MIME type for the file ("audio/mpeg" or "text/csv").
+    - file_type (str): MIME type for the file (the server derives it from the file name).
+    - base_url (str): Public URL of the download server (defaults to DOWNLOAD_BASE_URL).
 
     Returns:
     - str: HTML anchor tag for downloading the specified file.
     """
-    # Read the file and encode it in base64
-    with open(file_path, "rb") as file:
-        file_data = file.read()
-        b64_encoded = base64.b64encode(file_data).decode()
-
-    # Generate appropriate download MIME types
-    if file_type == "audio/mpeg":
-        mime = "audio/mpeg"
-    elif file_type == "text/csv":
-        mime = "text/csv"
-    else:
-        mime = "application/octet-stream"  # Fallback MIME type for unknown files
-
-    # Create a downloadable HTML link
-    return f'<a href="data:{mime};base64,{b64_encoded}" download="{os.path.basename(file_path)}">{link_label}</a>'
+    url = download_url(stage_download(file_path), base_url)
+    return f'<a href="{html.escape(url)}" download="{html.escape(os.path.basename(file_path))}">{link_label}</a>'
 
 
 # Function to create staged download links
-def stage_file_for_download(file_path, output_file, link_label):
+def stage_file_for_download(file_path, output_file, link_label, base_url=None):
     """
     Stage the file for download by saving it in the DOWNLOAD_FOLDER and creating a link.
 
+    The file is streamed by the download server through a short-lived signed
+    link instead of being embedded in the page.
+
     Args:
     - file_path (str): Path to the file to be staged for download.
+    - output_file (str): Name to download the file as.
     - link_label (str): The label to display on the download link.
-    - file_type (str): MIME type for the file ("audio/mpeg" or "text/csv").
+    - base_url (str): Public URL of the download server (defaults to DOWNLOAD_BASE_URL).
 
     Returns:
     - str: HTML anchor tag for downloading the specified file.
@@ -74,23 +140,6 @@ def stage_file_for_download(file_path, output_file, link_label):
     if not os.path.exists(file_path):
         return f'<span style="color: #888">{link_label} (missing)</span>'
 
-    # For reliability across deployments, create a data-URI based download link
-    # This avoids depending on the app's static file serving path which can
-    # vary between environments (and was producing small/invalid downloads).
-    # For very large files this will embed the file in the page; if that's
-    # a concern, consider using `st.download_button` directly in Streamlit.
-    with open(file_path, "rb") as f:
-        b64_encoded = base64.b64encode(f.read()).decode()
-
-    # Guess MIME type from extension
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in (".mp3", ".mpeg"):
-        mime = "audio/mpeg"
-    elif ext in (".wav",):
-        mime = "audio/wav"
-    elif ext in (".csv",):
-        mime = "text/csv"
-    else:
-        mime = "application/octet-stream"
-
-    return f'<a href="data:{mime};base64,{b64_encoded}" download="{os.path.basename(file_path)}">{link_label}</a>'
+    output_file = os.path.basename(output_file or file_path)
+    url = download_url(stage_download(file_path, output_file), base_url)
+    return f'<a href="{html.escape(url)}" download="{html.escape(output_file)}">{link_label}</a>'
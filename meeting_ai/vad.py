@@ -0,0 +1,132 @@
+import json
+import os
+
+import numpy as np
+from pydub import AudioSegment
+
+# Speech trimming settings: "nemo" reuses the diarizer's VAD output (falling back
+# to the energy VAD when it is missing), "energy" always uses the energy VAD and
+# "off" sends whole speaker turns to Whisper.
+VAD_MODE = os.getenv("VAD_MODE", "nemo")
+VAD_PAD = float(os.getenv("VAD_PAD", "0.15"))
+VAD_MIN_SPEECH = float(os.getenv("VAD_MIN_SPEECH", "0.25"))
+VAD_MIN_GAP = float(os.getenv("VAD_MIN_GAP", "0.4"))
+VAD_JOIN_GAP_MS = int(os.getenv("VAD_JOIN_GAP_MS", "200"))
+ENERGY_FRAME_MS = 30
+ENERGY_THRESHOLD_DB = float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45"))
+ENERGY_RELATIVE_DB = float(os.getenv("VAD_ENERGY_RELATIVE_DB", "30"))
+
+
+# Function to load the speech segments written by NeMo's VAD stage
+def load_nemo_vad_segments(output_dir, audio_file):
+    """
+    Read the speech segments from the diarizer's ``vad_outputs/vad_out.json``.
+
+    Returns:
+    - list[tuple[float, float]] | None: Sorted (start, end) seconds, or None if
+      NeMo VAD output is unavailable or disabled.
+    """
+    if VAD_MODE != "nemo":
+        return None
+    vad_file = os.path.join(output_dir, "vad_outputs", "vad_out.json")
+    if not os.path.exists(vad_file):
+        return None
+
+    audio_name = os.path.splitext(os.path.basename(audio_file))[0]
+    segments = []
+    with open(vad_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            entry_name = os.path.splitext(os.path.basename(entry.get("audio_filepath", "")))[0]
+            if entry_name != audio_name:
+                continue
+            start = float(entry["offset"])
+            segments.append((start, start + float(entry["duration"])))
+    return sorted(segments) or None
+
+
+# Function to detect speech in an audio clip from frame energy
+def energy_vad_segments(audio, frame_ms=ENERGY_FRAME_MS, threshold_db=ENERGY_THRESHOLD_DB,
+                        relative_db=ENERGY_RELATIVE_DB):
+    """
+    Lightweight energy VAD over a pydub AudioSegment.
+
+    A frame counts as speech when its RMS level is above both ``threshold_db``
+    (dBFS) and ``relative_db`` below the loudest frame of the clip.
+
+    Returns:
+    - list[tuple[float, float]]: (start, end) seconds relative to the clip.
+    """
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    if audio.channels > 1:
+        samples = samples.reshape(-1, audio.channels).mean(axis=1)
+    samples /= float(1 << (8 * audio.sample_width - 1))
+
+    frame_len = max(int(audio.frame_rate * frame_ms / 1000), 1)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return []
+
+    frames = samples[: n_frames * frame_len].reshape(n_frames, frame_len)
+    level_db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    voiced = level_db > max(threshold_db, level_db.max() - relative_db)
+
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(int(s) * frame_ms / 1000.0, int(e) * frame_ms / 1000.0) for s, e in zip(starts, ends)]
+
+
+# Function to clip speech segments to a speaker turn and tidy them up
+def speech_regions(start, end, vad_segments, pad=VAD_PAD, min_gap=VAD_MIN_GAP,
+                   min_speech=VAD_MIN_SPEECH):
+    """
+    Intersect VAD speech segments with the turn ``[start, end]``.
+
+    Segments are padded, merged when closer than ``min_gap`` and dropped when
+    shorter than ``min_speech``.
+
+    Returns:
+    - list[tuple[float, float]]: Speech regions in seconds, inside the turn.
+    """
+    regions = []
+    # vad_segments are sorted by start, so the scan stops at the end of the turn
+    for seg_start, seg_end in vad_segments:
+        if seg_start >= end:
+            break
+        if seg_end <= start:
+            continue
+        s = max(seg_start - pad, start)
+        e = min(seg_end + pad, end)
+        if regions and s - regions[-1][1] < min_gap:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], e))
+        else:
+            regions.append((s, e))
+    return [(s, e) for s, e in regions if e - s >= min_speech]
+
+
+def trim_to_speech(audio, start, end, vad_segments=None):
+    """
+    Speech regions of the turn ``[start, end]`` (seconds) of ``audio``.
+
+    Uses ``vad_segments`` when given, otherwise runs the energy VAD on the turn.
+    """
+    if VAD_MODE == "off":
+        return [(start, end)]
+    if vad_segments is None:
+        clip = audio[int(start * 1000):int(end * 1000)]
+        vad_segments = [(s + start, e + start) for s, e in energy_vad_segments(clip)]
+    return speech_regions(start, end, vad_segments)
+
+
+def join_speech_regions(audio, regions, gap_ms=VAD_JOIN_GAP_MS):
+    """Concatenate the speech regions of ``audio`` with a short silence between them."""
+    silence = AudioSegment.silent(duration=gap_ms, frame_rate=audio.frame_rate)
+    joined = None
+    for s, e in regions:
+        piece = audio[int(s * 1000):int(e * 1000)]
+        joined = piece if joined is None else joined + silence + piece
+    return joined
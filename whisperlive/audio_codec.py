@@ -0,0 +1,108 @@
+import numpy as np
+
+# WhisperLive expects mono float32 PCM at 16 kHz. Clients may send a more compact
+# encoding and announce it in their config; the relay decodes back to this format.
+TARGET_RATE = 16000
+AUDIO_ENCODINGS = ("float32", "int16", "opus")
+
+# Config keys the relay consumes; they are stripped before the config is forwarded
+ENCODING_KEY = "audio_encoding"
+SAMPLE_RATE_KEY = "audio_sample_rate"
+
+
+class UnsupportedAudio(ValueError):
+    """The client asked for an encoding or sample rate the relay cannot decode."""
+
+
+class StreamResampler:
+    """
+    Linear-interpolation resampler that keeps its phase across frames.
+
+    Only used for PCM clients whose AudioContext cannot run at 16 kHz; browsers
+    that honour ``sampleRate: 16000`` never reach it.
+    """
+
+    def __init__(self, src_rate, dst_rate=TARGET_RATE):
+        self.step = src_rate / dst_rate
+        self.pos = 0.0  # next output position, relative to self.last
+        self.last = None
+
+    def process(self, samples):
+        if not samples.size:
+            return samples
+        # Prepend the previous frame's last sample so interpolation spans frames
+        x = samples if self.last is None else np.concatenate([self.last, samples])
+        positions = np.arange(self.pos, len(x) - 1, self.step)
+        out = np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+        self.pos = (positions[-1] + self.step if positions.size else self.pos) - (len(x) - 1)
+        self.last = x[-1:]
+        return out
+
+
+class PCMDecoder:
+    def __init__(self, encoding, sample_rate):
+        self.encoding = encoding
+        self.resampler = StreamResampler(sample_rate) if sample_rate != TARGET_RATE else None
+
+    def decode(self, data):
+        if self.encoding == "int16":
+            samples = np.frombuffer(data, dtype="<i2", count=len(data) // 2).astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(data, dtype="<f4", count=len(data) // 4)
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        return samples.astype(np.float32, copy=False).tobytes()
+
+
+class OpusDecoder:
+    """Decodes one raw Opus packet per message (as WebCodecs ``AudioEncoder`` emits them)."""
+
+    def __init__(self, sample_rate=48000):
+        try:
+            import av
+        except ImportError:
+            raise UnsupportedAudio("Opus needs PyAV (pip install av)")
+
+        self._av = av
+        self.codec = av.CodecContext.create("opus", "r")
+        self.codec.sample_rate = sample_rate
+        self.codec.layout = "mono"
+        self.resampler = av.AudioResampler(format="flt", layout="mono", rate=TARGET_RATE)
+
+    def decode(self, data):
+        chunks = []
+        for frame in self.codec.decode(self._av.Packet(data)):
+            for out in self.resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1).astype(np.float32, copy=False))
+        return np.concatenate(chunks).tobytes() if chunks else b""
+
+
+def negotiate(config):
+    """
+    Pick a decoder for a client config and strip the relay-only keys from it.
+
+    Args:
+    - config (dict): The client's parsed config message (modified in place).
+
+    Returns:
+    - PCMDecoder | OpusDecoder | None: None for float32 at 16 kHz, which is forwarded as is.
+
+    Raises:
+    - UnsupportedAudio: Unknown encoding, bad sample rate, or Opus without PyAV.
+    """
+    encoding = config.pop(ENCODING_KEY, None) or "float32"
+    sample_rate = config.pop(SAMPLE_RATE_KEY, None)
+    if encoding not in AUDIO_ENCODINGS:
+        raise UnsupportedAudio(f"Unknown audio encoding {encoding!r}; choose from {AUDIO_ENCODINGS}")
+    try:
+        sample_rate = int(sample_rate or (48000 if encoding == "opus" else TARGET_RATE))
+    except (TypeError, ValueError):
+        raise UnsupportedAudio(f"Bad audio sample rate {sample_rate!r}")
+    if not 8000 <= sample_rate <= 192000:
+        raise UnsupportedAudio(f"Audio sample rate {sample_rate} out of range")
+
+    if encoding == "opus":
+        return OpusDecoder(sample_rate)
+    if encoding == "float32" and sample_rate == TARGET_RATE:
+        return None
+    return PCMDecoder(encoding, sample_rate)
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import time
+
+from upstream import PoolExhausted, UpstreamPool
+
+# Comma-separated WhisperLive servers ("host:port" or full ws:// URLs). When unset
+# the relay uses the single WHISPER_HOST/WHISPER_PORT backend.
+WHISPER_BACKENDS = os.getenv("WHISPER_BACKENDS", "")
+# How new sessions are assigned: "least_sessions" or "latency" (measured setup time)
+WHISPER_BALANCE = os.getenv("WHISPER_BALANCE", "least_sessions")
+# Seconds to wait for SERVER_READY before failing over to the next backend
+WHISPER_READY_TIMEOUT = float(os.getenv("WHISPER_READY_TIMEOUT", "10"))
+# Seconds a backend is skipped after a failed session setup
+WHISPER_BACKEND_COOLDOWN_S = float(os.getenv("WHISPER_BACKEND_COOLDOWN_S", "15"))
+
+BALANCE_POLICIES = ("least_sessions", "latency")
+_LATENCY_ALPHA = 0.3
+
+
+class NoBackendAvailable(Exception):
+    """Every backend failed to set up the session."""
+
+
+class SetupFailed(Exception):
+    """A backend accepted the connection but did not become ready."""
+
+
+def parse_backends(spec, default_host, default_port):
+    """
+    Parse a WHISPER_BACKENDS value into WebSocket URLs.
+
+    Args:
+    - spec (str): Comma-separated ``host:port``, ``host`` or ``ws://`` URLs.
+    - default_host (str), default_port (int): Used when ``spec`` is empty or a port is missing.
+
+    Returns:
+    - list[str]: One ``ws://host:port/ws`` URL per backend.
+    """
+    urls = []
+    for item in (spec or f"{default_host}:{default_port}").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith(("ws://", "wss://")):
+            urls.append(item)
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", str(default_port))
+        urls.append(f"ws://{host}:{port}/ws")
+    return urls
+
+
+class Backend:
+    """One WhisperLive server: its connection pool plus session and latency counters."""
+
+    def __init__(self, url, **pool_kwargs):
+        self.url = url
+        self.pool = UpstreamPool(url, **pool_kwargs)
+        self.sessions_total = 0
+        self.setup_failures = 0
+        self.latency_s = None  # EWMA of connect + SERVER_READY time
+        self.down_until = 0.0
+        self.last_error = None
+        self.remote_sessions = 0  # sessions other relay workers hold on this backend
+
+    @property
+    def active_sessions(self):
+        return self.pool.in_use
+
+    @property
+    def cluster_sessions(self):
+        return self.pool.in_use + self.remote_sessions
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def record_setup(self, seconds):
+        self.sessions_total += 1
+        self.down_until = 0.0
+        self.last_error = None
+        if self.latency_s is None:
+            self.latency_s = seconds
+        else:
+            self.latency_s += _LATENCY_ALPHA * (seconds - self.latency_s)
+
+    def record_failure(self, error, cooldown_s):
+        self.setup_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.down_until = time.monotonic() + cooldown_s
+
+    def snapshot(self):
+        return {
+            **self.pool.snapshot(),
+            "available": self.available,
+            "active_sessions": self.active_sessions,
+            "remote_sessions": self.remote_sessions,
+            "sessions_total": self.sessions_total,
+            "setup_failures": self.setup_failures,
+            "setup_latency_ms": round(self.latency_s * 1000, 2) if self.latency_s is not None else None,
+            "last_setup_error": self.last_error,
+        }
+
+
+class Balancer:
+    """
+    Assigns browser sessions to WhisperLive backends and fails over during setup.
+
+    A session is set up by sending the client's config and waiting for
+    SERVER_READY. If a backend cannot be reached, refuses the client (WAIT/ERROR)
+    or does not answer within ``ready_timeout``, it is put on cooldown and the
+    next backend is tried with the same config, so the browser never notices.
+    """
+
+    def __init__(
+        self,
+        urls,
+        policy=WHISPER_BALANCE,
+        ready_timeout=WHISPER_READY_TIMEOUT,
+        cooldown_s=WHISPER_BACKEND_COOLDOWN_S,
+        **pool_kwargs,
+    ):
+        if policy not in BALANCE_POLICIES:
+            raise ValueError(f"Unknown balance policy {policy!r}; choose from {BALANCE_POLICIES}")
+        if not urls:
+            raise ValueError("At least one WhisperLive backend is required")
+        self.policy = policy
+        self.ready_timeout = ready_timeout
+        self.cooldown_s = cooldown_s
+        self.backends = [Backend(url, **pool_kwargs) for url in urls]
+
+    async def start(self):
+        for backend in self.backends:
+            await backend.pool.start()
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.pool.close()
+
+    def _key(self, backend):
+        if self.policy == "latency":
+            # Unmeasured backends go first so every backend gets a measurement
+            latency = backend.latency_s if backend.latency_s is not None else -1.0
+            return (not backend.pool.healthy, latency, backend.cluster_sessions)
+        return (not backend.pool.healthy, backend.cluster_sessions, backend.latency_s or 0.0)
+
+    def session_counts(self):
+        """This process's active sessions per backend URL, as shared with other workers."""
+        return {backend.url: backend.active_sessions for backend in self.backends}
+
+    def set_remote_sessions(self, counts):
+        """Record the sessions other relay workers hold, so assignment balances the whole cluster."""
+        for backend in self.backends:
+            backend.remote_sessions = counts.get(backend.url, 0)
+
+    def candidates(self):
+        """Backends in the order they should be tried; cooled-down ones go last."""
+        ready = sorted((b for b in self.backends if b.available), key=self._key)
+        cooling = sorted((b for b in self.backends if not b.available), key=lambda b: b.down_until)
+        return ready + cooling
+
+    async def _setup(self, backend, config):
+        ws = await backend.pool.acquire()
+        try:
+            await ws.send(config)
+            while True:
+                reply = await asyncio.wait_for(ws.recv(), self.ready_timeout)
+                try:
+                    msg = json.loads(reply)
+                except (TypeError, ValueError):
+                    continue
+                if msg.get("message") == "SERVER_READY":
+                    return ws, reply
+                if msg.get("status") in ("WAIT", "ERROR") or msg.get("message") == "DISCONNECT":
+                    raise SetupFailed(f"{msg.get('status') or msg.get('message')}: {msg.get('message')}")
+        except BaseException:
+            backend.pool.release()
+            try:
+                await ws.close()
+            except Exception:
+                pass
+            raise
+
+    async def open_session(self, config):
+        """
+        Set up a session on the best available backend.
+
+        Args:
+        - config (str): The client's JSON config message, sent to each backend tried.
+
+        Returns:
+        - (Backend, websocket, str): The backend (call ``backend.pool.release()`` when the
+          session ends), its ready connection and the SERVER_READY message to forward.
+
+        Raises:
+        - NoBackendAvailable: Every backend failed.
+        """
+        errors = []
+        for backend in self.candidates():
+            t0 = time.perf_counter()
+            try:
+                ws, ready = await self._setup(backend, config)
+            except asyncio.CancelledError:
+                raise
+            except PoolExhausted as e:
+                # Healthy but full: try the next one without a cooldown
+                errors.append(f"{backend.url}: {e}")
+                continue
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = SetupFailed(f"no SERVER_READY within {self.ready_timeout:.0f}s")
+                backend.record_failure(e, self.cooldown_s)
+                errors.append(f"{backend.url}: {backend.last_error}")
+                print(f"!!! WhisperLive backend {backend.url} failed, trying next: {backend.last_error}")
+                continue
+            backend.record_setup(time.perf_counter() - t0)
+            return backend, ws, ready
+        raise NoBackendAvailable("; ".join(errors))
+
+    def snapshot(self):
+        return {
+            "policy": self.policy,
+            "backends": [backend.snapshot() for backend in self.backends],
+        }
@@ -0,0 +1,156 @@
+"""
+Benchmark how many concurrent sessions the relay carries per worker count.
+
+For each worker count, starts the relay with workers.py in front of
+stub_whisperlive.py (so only the relay is measured), then replays a synthetic
+WAV with replay.py at increasing session counts. A level passes when every
+session completes and the p95 send lag and audio-to-partial latency stay
+under the limits; the capacity is the highest level that passed.
+
+Several replay.py processes share each level so the load generator is not the
+bottleneck. Run on a machine with at least as many cores as the largest worker
+count plus the clients, or the numbers only show the relay contending with them.
+
+Usage:
+    python bench_workers.py --workers 1 2 4 --levels 25 50 100 200 400
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def write_wav(path, seconds, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.2 * np.sin(2 * np.pi * 220 * t) + 0.02 * np.random.default_rng(0).standard_normal(len(t))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((tone * 32767).astype("<i2").tobytes())
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def stop(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# Function to run one load level split over several replay.py processes
+def run_level(args, wav, sessions):
+    clients = max(1, min(args.clients, sessions))
+    procs = []
+    for i in range(clients):
+        share = sessions // clients + (1 if i < sessions % clients else 0)
+        procs.append(subprocess.Popen(
+            [
+                sys.executable, os.path.join(HERE, "replay.py"), wav, "--json",
+                "--url", f"ws://127.0.0.1:{args.port}/ws", "--sessions", str(share),
+                "--ramp-s", str(args.ramp_s), "--drain-s", "5",
+            ],
+            stdout=subprocess.PIPE, cwd=HERE,
+        ))
+    reports = [json.loads(p.communicate()[0]) for p in procs]
+    worst = lambda key: max((r[key]["p95_ms"] or 0) for r in reports)
+    return {
+        "sessions": sessions,
+        "ok": sum(r["ok"] for r in reports),
+        "send_lag_p95_ms": worst("send_lag"),
+        "partial_p95_ms": worst("audio_to_partial"),
+        "audio_s_per_s": round(sum(r["audio_s_per_s"] or 0 for r in reports), 1),
+    }
+
+
+def bench_workers(args, wav, workers):
+    env = dict(
+        os.environ,
+        WHISPER_BACKENDS=f"localhost:{args.stub_port}",
+        WHISPER_POOL_MAX=str(max(args.levels)),
+        WHISPER_COORDINATOR=os.path.join(tempfile.gettempdir(), f"whisperlive-bench-{args.port}.sock"),
+    )
+    relay = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "workers.py"), "--workers", str(workers), "--port", str(args.port)],
+        env=env, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = []
+    try:
+        wait_for_port(args.port)
+        time.sleep(2)  # let every worker finish starting up
+        for sessions in args.levels:
+            level = run_level(args, wav, sessions)
+            level["passed"] = (
+                level["ok"] == sessions
+                and level["send_lag_p95_ms"] <= args.max_lag_ms
+                and level["partial_p95_ms"] <= args.max_partial_ms
+            )
+            results.append(level)
+            print(
+                f"  workers={workers} sessions={sessions}: {level['ok']} ok, "
+                f"send lag p95 {level['send_lag_p95_ms']} ms, partial p95 {level['partial_p95_ms']} ms "
+                f"-> {'pass' if level['passed'] else 'FAIL'}",
+                flush=True,
+            )
+            if not level["passed"]:
+                break
+    finally:
+        stop(relay)
+    capacity = max((r["sessions"] for r in results if r["passed"]), default=0)
+    return {"workers": workers, "capacity": capacity, "levels": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent session capacity of the relay per worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--levels", type=int, nargs="+", default=[25, 50, 100, 200, 400], help="Session counts to try")
+    parser.add_argument("--audio-s", type=float, default=20.0, help="Length of each replayed session")
+    parser.add_argument("--clients", type=int, default=4, help="replay.py processes per level")
+    parser.add_argument("--ramp-s", type=float, default=5.0)
+    parser.add_argument("--max-lag-ms", type=float, default=200.0, help="p95 send lag limit")
+    parser.add_argument("--max-partial-ms", type=float, default=1500.0, help="p95 audio-to-partial limit")
+    parser.add_argument("--port", type=int, default=18600)
+    parser.add_argument("--stub-port", type=int, default=19190)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    wav = os.path.join(tempfile.gettempdir(), "whisperlive-bench.wav")
+    write_wav(wav, args.audio_s)
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "stub_whisperlive.py"), "--port", str(args.stub_port)],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.stub_port)
+        print(f">>> {os.cpu_count()} CPUs; {args.audio_s:.0f}s sessions, levels {args.levels}")
+        results = [bench_workers(args, wav, n) for n in args.workers]
+    finally:
+        stop(stub)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'workers':>8}{'capacity':>10}")
+        for r in results:
+            print(f"{r['workers']:>8}{r['capacity']:>10}")
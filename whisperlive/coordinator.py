@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+# Unix socket of the coordinator shared by relay workers (set by workers.py).
+# Empty means a single relay process that keeps all state to itself.
+WHISPER_COORDINATOR = os.getenv("WHISPER_COORDINATOR", "")
+# Seconds between full state reports from each worker
+WHISPER_REPORT_INTERVAL = float(os.getenv("WHISPER_REPORT_INTERVAL", "1"))
+# Longest line either side accepts (cluster replies carry every worker's session list)
+LINE_LIMIT = 2**24
+
+
+class Coordinator:
+    """
+    Holds the state relay workers share, behind a local Unix socket.
+
+    Workers keep their sessions in-process (a WebSocket lives in one process) and
+    publish what others need: active sessions per backend, which the balancer
+    adds to its own counts, and periodic reports (session list, metrics) that any
+    worker can fetch to answer /stats or /metrics for the whole cluster.
+
+    The protocol is one JSON object per line in each direction; every reply
+    carries the other workers' backend session counts.
+    """
+
+    def __init__(self):
+        self.backend_sessions = {}  # worker -> {backend url: active sessions}
+        self.reports = {}  # worker -> latest report
+
+    def _others(self, worker):
+        totals = {}
+        for other, counts in self.backend_sessions.items():
+            if other == worker:
+                continue
+            for url, n in counts.items():
+                totals[url] = totals.get(url, 0) + n
+        return totals
+
+    def handle(self, worker, request):
+        op = request.get("op")
+        if "backends" in request:
+            self.backend_sessions[worker] = request["backends"]
+        if "report" in request:
+            self.reports[worker] = request["report"]
+        reply = {"ok": True, "other_sessions": self._others(worker)}
+        if op == "cluster":
+            reply["reports"] = self.reports
+        return reply
+
+    async def _client(self, reader, writer):
+        worker = None
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                worker = request.get("worker", worker)
+                writer.write(json.dumps(self.handle(worker, request)).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            # A worker that went away no longer holds sessions
+            self.backend_sessions.pop(worker, None)
+            self.reports.pop(worker, None)
+            writer.close()
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self._client, path=path, limit=LINE_LIMIT)
+        print(f">>> Relay coordinator listening on {path}")
+        return server
+
+
+class CoordinatorClient:
+    """A worker's connection to the Coordinator; calls fail soft (return None) and reconnect."""
+
+    def __init__(self, path, worker):
+        self.path = path
+        self.worker = str(worker)
+        self._reader = self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def call(self, op, **payload):
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        self._reader, self._writer = await asyncio.open_unix_connection(
+                            self.path, limit=LINE_LIMIT
+                        )
+                    request = {"op": op, "worker": self.worker, **payload}
+                    self._writer.write(json.dumps(request).encode() + b"\n")
+                    await self._writer.drain()
+                    line = await self._reader.readline()
+                    if not line:
+                        raise ConnectionError("coordinator closed the connection")
+                    return json.loads(line)
+                except (OSError, ValueError) as e:
+                    self._reader = self._writer = None
+                    if attempt:
+                        print(f"!!! Relay coordinator unavailable: {e}")
+            return None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
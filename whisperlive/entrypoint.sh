@@ -1,7 +1,11 @@
 #!/bin/bash
 set -euo pipefail
 
-# Start streamlit in foreground (so the container stays alive)
+# Start the relay in foreground (so the container stays alive); several
+# SO_REUSEPORT workers when WHISPER_WORKERS > 1
+if [ "${WHISPER_WORKERS:-1}" -gt 1 ]; then
+  exec python workers.py --workers "$WHISPER_WORKERS" --host 0.0.0.0 --port 8501
+fi
 exec uvicorn whisper:app --host 0.0.0.0 --port 8501 --reload
 
 # Run
@@ -3,6 +3,7 @@ let ws = null;
 let stream = null;
 let audioCtx = null;
 let processor = null;
+let paused = false; // relay asked us to stop sending audio (backpressure)
 
 const micBtn = document.getElementById("micBtn");
 const micLabel = document.getElementById("micLabel");
@@ -10,13 +11,31 @@ const micIcon = document.getElementById("micIcon");
 const copyBtn = document.getElementById("copyBtn");
 const transcriptEl = document.getElementById("transcript");
 const statusEl = document.getElementById("status");
+const transcriptLinkEl = document.getElementById("transcriptLink");
 
-let appended = [];
+let finals = []; // completed segment texts; the relay sends each one once
 
 function setStatus(text) {
   statusEl.textContent = text;
 }
 
+// The relay serves transcripts over HTTP on the host of its WebSocket endpoint
+function transcriptUrl(endpoint, id) {
+  const url = new URL(endpoint);
+  url.protocol = url.protocol === "wss:" ? "https:" : "http:";
+  url.pathname = url.pathname.replace(/\/ws\/?$/, "") + `/transcripts/${encodeURIComponent(id)}`;
+  url.search = "?format=txt";
+  return url.toString();
+}
+
+function showTranscriptLink(endpoint, id) {
+  const link = document.createElement("a");
+  link.href = transcriptUrl(endpoint, id);
+  link.target = "_blank";
+  link.textContent = id;
+  transcriptLinkEl.replaceChildren("Transcript: ", link);
+}
+
 async function loadConfig() {
   const { endpoint, model } = await chrome.storage.sync.get({
     endpoint: "",
@@ -52,10 +71,16 @@ async function startRecording() {
         task: "transcribe",
         model,
         use_vad: true,
-        send_last_n_segments: 10
+        send_last_n_segments: 10,
+        // The relay decodes int16 back to the float32 WhisperLive expects
+        audio_encoding: "int16",
+        // ...and sends only new finals plus the current partial
+        segment_deltas: true
       }));
       setStatus("Connected. Speak!");
       recording = true;
+      paused = false;
+      finals = [];
       micBtn.dataset.state = "recording";
       micIcon.dataset.state = "recording";
       micLabel.textContent = "Stop";
@@ -77,9 +102,18 @@ async function startRecording() {
     ws.onmessage = (e) => {
       try {
         const msg = JSON.parse(e.data);
+        if (msg.message === "PAUSE_AUDIO" || msg.message === "RESUME_AUDIO") {
+          paused = msg.message === "PAUSE_AUDIO";
+          return;
+        }
+        if (msg.message === "SERVER_READY") {
+          if (msg.transcript_id) showTranscriptLink(endpoint, msg.transcript_id);
+          return;
+        }
         if (msg.segments && msg.segments.length) {
-          const text = msg.segments.map(s => s.text).join(" ");
-          transcriptEl.textContent = text;
+          const partial = msg.segments.filter(s => !s.completed).map(s => s.text);
+          finals.push(...msg.segments.filter(s => s.completed).map(s => s.text));
+          transcriptEl.textContent = finals.concat(partial).join(" ");
         }
       } catch (err) {
         console.error("Bad message", err);
@@ -87,10 +121,15 @@ async function startRecording() {
     };
 
     processor.onaudioprocess = (ev) => {
-      if (!recording || !ws || ws.readyState !== 1) return;
+      if (!recording || paused || !ws || ws.readyState !== 1) return;
       const input = ev.inputBuffer.getChannelData(0);
-      // Send raw Float32 PCM
-      ws.send(input.buffer);
+      // Send 16-bit PCM: half the bandwidth of raw Float32
+      const pcm = new Int16Array(input.length);
+      for (let i = 0; i < input.length; i++) {
+        const s = Math.max(-1, Math.min(1, input[i]));
+        pcm[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
+      }
+      ws.send(pcm.buffer);
     };
 
     src.connect(processor);
@@ -0,0 +1,259 @@
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+
+SAMPLE_RATE = 16000
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 8, 13, 20)
+# Audio-to-text samples kept per session for the percentiles in /stats
+SESSION_SAMPLES = 500
+# How far behind the newest final segment the audio clock keeps timestamps
+CLOCK_HISTORY_S = 60
+# Models that get their own latency series; any other client-supplied name is
+# reported as "other", so clients cannot create unbounded label values
+WHISPER_METRIC_MODELS = frozenset(
+    os.getenv(
+        "WHISPER_METRIC_MODELS",
+        "tiny,tiny.en,base,base.en,small,small.en,medium,medium.en,large,large-v1,large-v2,"
+        "large-v3,large-v3-turbo,turbo,distil-small.en,distil-medium.en,distil-large-v2,distil-large-v3",
+    ).split(",")
+)
+
+
+def model_label(model):
+    """The ``model`` label for a client-supplied model name."""
+    if not model:
+        return "unknown"
+    return model if isinstance(model, str) and model in WHISPER_METRIC_MODELS else "other"
+
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = buckets
+        self.buckets = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+def percentiles(samples):
+    """Count, p50, p95 and max (in ms) of latency samples given in seconds."""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 1)
+    return {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": pick(1.0)}
+
+
+class AudioClock:
+    """
+    Maps stream time (seconds of 16 kHz audio forwarded so far) to the moment the
+    relay received that audio from the browser.
+
+    WhisperLive reports segment ``start``/``end`` in the same stream time, so the
+    receive time of a segment's ``end`` tells how long that audio took to become text.
+    Audio dropped by the upstream queue is not subtracted, so latencies read high
+    while a session is dropping audio.
+    """
+
+    def __init__(self):
+        self.samples = 0
+        self.audio_s = []
+        self.received = []
+        self._start = 0  # index of the oldest entry still needed
+
+    def advance(self, samples, now=None):
+        self.samples += samples
+        self.audio_s.append(self.samples / SAMPLE_RATE)
+        self.received.append(time.monotonic() if now is None else now)
+
+    def received_at(self, audio_s):
+        """Receive time of the frame containing ``audio_s`` (None before any audio)."""
+        if len(self.audio_s) == self._start:
+            return None
+        i = bisect_left(self.audio_s, audio_s, self._start)
+        return self.received[min(i, len(self.received) - 1)]
+
+    def prune(self, before_s):
+        self._start = bisect_left(self.audio_s, before_s, self._start)
+        # Compact once the dead prefix dominates, keeping pruning amortized O(1)
+        if self._start > 1024 and self._start * 2 > len(self.audio_s):
+            del self.audio_s[: self._start]
+            del self.received[: self._start]
+            self._start = 0
+
+
+class SessionLatency:
+    """Audio-to-partial and audio-to-final latency for one relay session."""
+
+    def __init__(self, metrics, labels):
+        self.metrics = metrics
+        self.labels = labels
+        self.clock = AudioClock()
+        self.last_final_end = 0.0
+        self.partial = deque(maxlen=SESSION_SAMPLES)
+        self.final = deque(maxlen=SESSION_SAMPLES)
+
+    def observe_update(self, msg, now=None):
+        """Record latencies for a WhisperLive segments update as it arrives."""
+        segments = msg.get("segments") or []
+        if not segments:
+            return
+        now = time.monotonic() if now is None else now
+        self.metrics.updates += 1
+
+        newest_final = self.last_final_end
+        for segment in segments:
+            try:
+                end = float(segment.get("end", 0))
+            except (TypeError, ValueError):
+                continue
+            if segment.get("completed") and end > self.last_final_end:
+                self._observe("final", self.final, end, now)
+                newest_final = max(newest_final, end)
+        self.last_final_end = newest_final
+
+        last = segments[-1]
+        if not last.get("completed"):
+            try:
+                self._observe("partial", self.partial, float(last.get("end", 0)), now)
+            except (TypeError, ValueError):
+                pass
+        self.clock.prune(self.last_final_end - CLOCK_HISTORY_S)
+
+    def _observe(self, kind, samples, end, now):
+        received = self.clock.received_at(end)
+        if received is None:
+            return
+        latency = max(now - received, 0.0)
+        samples.append(latency)
+        self.metrics.histogram(kind, self.labels).observe(latency)
+
+    def snapshot(self):
+        return {
+            "audio_s": round(self.clock.samples / SAMPLE_RATE, 2),
+            "audio_to_partial": percentiles(self.partial),
+            "audio_to_final": percentiles(self.final),
+        }
+
+
+class RelayMetrics:
+    """Relay-wide counters and latency histograms, rendered for Prometheus at /metrics."""
+
+    def __init__(self):
+        self.audio = {}  # encoding -> counters
+        self.latency = {}  # (kind, backend, model) -> Histogram
+        self.sessions_total = {}  # backend -> sessions started
+        self.updates = 0
+
+    def encoding(self, name):
+        return self.audio.setdefault(
+            name,
+            {
+                "sessions": 0, "bytes_in": 0, "bytes_out": 0, "frames_in": 0, "messages_out": 0,
+                "pauses": 0, "dropped_ms": 0, "downstream_dropped": 0, "downstream_overflows": 0,
+                "text_bytes_in": 0, "text_bytes_out": 0,
+            },
+        )
+
+    def histogram(self, kind, labels):
+        key = (kind, labels["backend"], labels["model"])
+        if key not in self.latency:
+            self.latency[key] = Histogram()
+        return self.latency[key]
+
+    def session(self, backend, model):
+        """Start tracking a session; returns its SessionLatency."""
+        self.sessions_total[backend] = self.sessions_total.get(backend, 0) + 1
+        return SessionLatency(self, {"backend": backend, "model": model_label(model)})
+
+    def to_state(self):
+        """JSON-serializable counters, for sharing with other relay workers."""
+        return {
+            "audio": self.audio,
+            "latency": [[*key, h.buckets, h.count, h.sum] for key, h in self.latency.items()],
+            "sessions_total": self.sessions_total,
+            "updates": self.updates,
+        }
+
+    @classmethod
+    def merged(cls, states):
+        """Sum the to_state() snapshots of several workers into one RelayMetrics."""
+        total = cls()
+        for state in states:
+            for enc, counters in state["audio"].items():
+                mine = total.encoding(enc)
+                for key, value in counters.items():
+                    mine[key] = mine.get(key, 0) + value
+            for kind, backend, model, buckets, count, sum_s in state["latency"]:
+                h = total.histogram(kind, {"backend": backend, "model": model})
+                h.buckets = [a + b for a, b in zip(h.buckets, buckets)]
+                h.count += count
+                h.sum += sum_s
+            for backend, n in state["sessions_total"].items():
+                total.sessions_total[backend] = total.sessions_total.get(backend, 0) + n
+            total.updates += state["updates"]
+        return total
+
+    def render(self, active_sessions):
+        """Return the metrics in Prometheus text format."""
+        lines = [
+            "# HELP whisperlive_active_sessions Browser sessions currently relayed.",
+            "# TYPE whisperlive_active_sessions gauge",
+            f"whisperlive_active_sessions {active_sessions}",
+            "# HELP whisperlive_sessions_total Sessions set up per backend.",
+            "# TYPE whisperlive_sessions_total counter",
+        ]
+        lines += [f'whisperlive_sessions_total{{backend="{_escape(b)}"}} {n}' for b, n in sorted(self.sessions_total.items())]
+
+        counters = (
+            ("audio_received_bytes_total", "bytes_in", "Audio bytes received from browsers."),
+            ("audio_forwarded_bytes_total", "bytes_out", "Float32 audio bytes forwarded to WhisperLive."),
+            ("upstream_messages_total", "messages_out", "Messages sent to WhisperLive (after coalescing)."),
+            ("upstream_pauses_total", "pauses", "Times a browser was asked to pause audio."),
+            ("upstream_dropped_ms_total", "dropped_ms", "Milliseconds of audio dropped by full upstream queues."),
+            ("downstream_dropped_total", "downstream_dropped", "Partial updates dropped by full downstream queues."),
+            ("downstream_overflows_total", "downstream_overflows", "Sessions closed because the browser stopped reading."),
+            ("transcript_received_bytes_total", "text_bytes_in", "Transcript bytes received from WhisperLive."),
+            ("transcript_forwarded_bytes_total", "text_bytes_out", "Transcript bytes forwarded to browsers (after deltas)."),
+        )
+        for name, key, help_text in counters:
+            lines += [f"# HELP whisperlive_{name} {help_text}", f"# TYPE whisperlive_{name} counter"]
+            lines += [
+                f'whisperlive_{name}{{encoding="{_escape(enc)}"}} {c[key]}' for enc, c in sorted(self.audio.items())
+            ]
+        lines += [
+            "# HELP whisperlive_updates_total Segment updates received from WhisperLive.",
+            "# TYPE whisperlive_updates_total counter",
+            f"whisperlive_updates_total {self.updates}",
+        ]
+
+        for kind in ("partial", "final"):
+            name = f"whisperlive_audio_to_{kind}_seconds"
+            lines += [
+                f"# HELP {name} Time from the relay receiving audio to receiving its {kind} text.",
+                f"# TYPE {name} histogram",
+            ]
+            for (k, backend, model), h in sorted(self.latency.items()):
+                if k != kind:
+                    continue
+                labels = f'backend="{_escape(backend)}",model="{_escape(model)}"'
+                for bound, count in zip(h.bounds, h.buckets):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"{name}_sum{{{labels}}} {h.sum:.4f}")
+                lines.append(f"{name}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+from collections import deque
+
+# Minimum audio (ms of float32 16 kHz) per message sent to WhisperLive. Small browser
+# frames are merged until this much is buffered; 0 only merges frames that pile up
+# while a previous send is in flight, so it never adds latency.
+WHISPER_COALESCE_MS = int(os.getenv("WHISPER_COALESCE_MS", "0"))
+# Upstream (browser -> WhisperLive) audio buffered per session: above PAUSE the
+# browser is asked to stop sending (it keeps capturing into its ring buffer) until
+# the backlog drains to half; above MAX the oldest audio is dropped, for clients
+# that ignore the pause.
+WHISPER_UPSTREAM_PAUSE_MS = int(os.getenv("WHISPER_UPSTREAM_PAUSE_MS", "2000"))
+WHISPER_UPSTREAM_MAX_MS = int(os.getenv("WHISPER_UPSTREAM_MAX_MS", "10000"))
+# Downstream (WhisperLive -> browser) messages buffered per session; beyond this the
+# oldest partial updates are dropped (later updates repeat their segments).
+WHISPER_DOWNSTREAM_MAX = int(os.getenv("WHISPER_DOWNSTREAM_MAX", "32"))
+# Hard limit once nothing is left to drop (final updates, control messages): the
+# browser has stopped reading, so the queue is discarded and the session closed.
+WHISPER_DOWNSTREAM_HARD_MAX = int(os.getenv("WHISPER_DOWNSTREAM_HARD_MAX", "256"))
+
+BYTES_PER_MS = 16000 * 4 // 1000
+PAUSE_MESSAGE = "PAUSE_AUDIO"
+RESUME_MESSAGE = "RESUME_AUDIO"
+
+
+class AudioOutbox:
+    """
+    Messages waiting to go from one browser session to WhisperLive.
+
+    Consecutive audio frames are merged into one buffer while they wait, so a
+    client sending 20 ms frames costs one upstream message per send round trip
+    instead of one per frame. Text messages (e.g. END_OF_AUDIO) keep their order
+    and flush the audio queued before them.
+
+    The backlog (queued plus in flight) is bounded: ``on_pressure(True)`` is called
+    when it passes ``pause_ms`` and ``on_pressure(False)`` once it drains to half,
+    and queued audio beyond ``max_ms`` is dropped oldest first.
+    """
+
+    def __init__(
+        self,
+        coalesce_ms=WHISPER_COALESCE_MS,
+        pause_ms=WHISPER_UPSTREAM_PAUSE_MS,
+        max_ms=WHISPER_UPSTREAM_MAX_MS,
+        on_pressure=None,
+    ):
+        self.min_bytes = coalesce_ms * BYTES_PER_MS
+        self.pause_bytes = pause_ms * BYTES_PER_MS
+        self.max_bytes = max(max_ms * BYTES_PER_MS, self.pause_bytes)
+        self.on_pressure = on_pressure
+        self.items = deque()
+        self.buffered = 0
+        self.in_flight = 0
+        self.closed = False
+        self.paused = False
+        self.frames_in = 0
+        self.messages_out = 0
+        self.pauses = 0
+        self.dropped_bytes = 0
+        self.peak_bytes = 0
+        self._ready = asyncio.Event()
+
+    def _drop_oldest(self, excess):
+        # Whole samples only, so the float32 stream stays aligned
+        excess += -excess % 4
+        for item in self.items:
+            if excess <= 0:
+                break
+            if isinstance(item, bytearray) and item:
+                cut = min(excess, len(item))
+                del item[:cut]
+                excess -= cut
+                self.buffered -= cut
+                self.dropped_bytes += cut
+
+    def put_audio(self, data):
+        if self.items and isinstance(self.items[-1], bytearray):
+            self.items[-1] += data
+        else:
+            self.items.append(bytearray(data))
+        self.buffered += len(data)
+        self.frames_in += 1
+
+        if self.buffered > self.max_bytes:
+            self._drop_oldest(self.buffered - self.max_bytes)
+        backlog = self.buffered + self.in_flight
+        self.peak_bytes = max(self.peak_bytes, backlog)
+        if not self.paused and backlog >= self.pause_bytes:
+            self.paused = True
+            self.pauses += 1
+            if self.on_pressure:
+                self.on_pressure(True)
+        if self.buffered >= self.min_bytes:
+            self._ready.set()
+
+    def put_text(self, text):
+        self.items.append(text)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self):
+        """
+        Wait for the next batch to send; call ``done()`` once it has been sent.
+
+        Returns:
+        - list[bytes | str] | None: Messages in order, or None once closed and drained.
+        """
+        while True:
+            if not self.closed:
+                await self._ready.wait()
+                self._ready.clear()
+            if self.items:
+                batch = [bytes(item) if isinstance(item, bytearray) else item for item in self.items if item]
+                self.items.clear()
+                self.in_flight = self.buffered
+                self.buffered = 0
+                self.messages_out += len(batch)
+                return batch
+            if self.closed:
+                return None
+
+    def done(self):
+        """The last batch from ``get()`` was sent; resume the browser if drained."""
+        self.in_flight = 0
+        if self.paused and self.buffered <= self.pause_bytes // 2:
+            self.paused = False
+            if self.on_pressure:
+                self.on_pressure(False)
+
+    def snapshot(self):
+        return {
+            "depth_ms": (self.buffered + self.in_flight) // BYTES_PER_MS,
+            "peak_ms": self.peak_bytes // BYTES_PER_MS,
+            "paused": self.paused,
+            "pauses": self.pauses,
+            "dropped_ms": self.dropped_bytes // BYTES_PER_MS,
+            "frames_in": self.frames_in,
+            "messages_out": self.messages_out,
+        }
+
+
+def final_end(msg):
+    """End time of the last completed segment in a WhisperLive update (0.0 if none)."""
+    end = 0.0
+    for segment in msg.get("segments") or ():
+        if segment.get("completed"):
+            try:
+                end = max(end, float(segment.get("end", 0)))
+            except (TypeError, ValueError):
+                pass
+    return end
+
+
+class DownstreamQueue:
+    """
+    Messages waiting to go from WhisperLive to one browser, bounded by ``max_messages``.
+
+    WhisperLive repeats the last N segments in every update, so when the browser
+    falls behind the oldest queued update that completes no new segment (a
+    "partial") can be dropped without losing text. Control messages and updates
+    carrying a new final segment are never dropped, so past ``hard_max`` messages
+    the queue overflows: it is discarded and closed, which ends the session.
+    """
+
+    def __init__(self, max_messages=WHISPER_DOWNSTREAM_MAX, hard_max=WHISPER_DOWNSTREAM_HARD_MAX):
+        self.max_messages = max_messages
+        self.hard_max = max(hard_max, max_messages)
+        self.items = deque()  # (text, droppable)
+        self.closed = False
+        self.overflowed = False
+        self.dropped = 0
+        self.peak = 0
+        self.last_final_end = 0.0
+        self._ready = asyncio.Event()
+
+    def put(self, data, droppable=False):
+        if self.closed:
+            return
+        self.items.append((data, droppable))
+        if len(self.items) > self.max_messages:
+            for i, (_, can_drop) in enumerate(self.items):
+                if can_drop:
+                    del self.items[i]
+                    self.dropped += 1
+                    break
+        self.peak = max(self.peak, len(self.items))
+        if len(self.items) > self.hard_max:
+            self.overflowed = True
+            self.items.clear()
+            self.closed = True
+        self._ready.set()
+
+    def put_update(self, data, msg=None):
+        """
+        Queue a message from WhisperLive, classifying segment updates as droppable or not.
+
+        Args:
+        - data (str | bytes): The message as received.
+        - msg (dict): ``data`` already parsed, if the caller has it.
+        """
+        if msg is None and isinstance(data, str):
+            try:
+                msg = json.loads(data)
+            except ValueError:
+                pass
+        droppable = False
+        if isinstance(msg, dict) and "segments" in msg and "message" not in msg and "status" not in msg:
+            end = final_end(msg)
+            droppable = end <= self.last_final_end
+            self.last_final_end = max(self.last_final_end, end)
+        self.put(data, droppable)
+
+    def put_control(self, message, uid=None):
+        self.put(json.dumps({"uid": uid, "message": message}))
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self):
+        """
+        Returns:
+        - str | bytes | None: The next message, or None once closed and drained.
+        """
+        while not self.items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self.items.popleft()[0]
+
+    def snapshot(self):
+        return {
+            "depth": len(self.items),
+            "peak": self.peak,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+        }
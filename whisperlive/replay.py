@@ -0,0 +1,246 @@
+"""
+Load-test the relay by replaying recorded sessions or WAV files.
+
+Drives N concurrent synthetic sessions against the relay's /ws endpoint, pacing
+frames in real time (or ``--speed`` times faster), obeying the relay's
+PAUSE_AUDIO/RESUME_AUDIO backpressure, and reports connect and setup times,
+throughput, send lag and audio-to-partial/final latency as the client sees it.
+
+Sources are session logs written with WHISPER_RECORD_DIR (``.wlr``) or 16-bit
+PCM WAV files, which are sent as int16 at their native rate (the relay resamples).
+Point the relay at stub_whisperlive.py to measure the relay alone.
+
+Usage:
+    python stub_whisperlive.py --port 19090 &
+    WHISPER_BACKENDS=localhost:19090 uvicorn whisper:app --port 8501 &
+    python replay.py meeting.wav --sessions 50 --speed 2
+    python replay.py recordings/*.wlr --sessions 200 --ramp-s 10 --json
+"""
+import argparse
+import asyncio
+import json
+import time
+import wave
+
+import numpy as np
+import websockets
+
+from relay_metrics import RelayMetrics, percentiles
+from session_log import AUDIO, CONFIG, TEXT, read_session
+
+DEFAULT_CONFIG = {
+    "language": None,
+    "task": "transcribe",
+    "model": "turbo",
+    "use_vad": True,
+    "send_last_n_segments": 10,
+}
+BYTES_PER_SAMPLE = {"int16": 2, "float32": 4}
+
+
+class Script:
+    """A session to replay: its config and timed frames (seconds, kind, payload)."""
+
+    def __init__(self, name, config, frames):
+        self.name = name
+        self.config = config
+        self.frames = frames
+        encoding = config.get("audio_encoding") or "float32"
+        rate = int(config.get("audio_sample_rate") or 16000)
+        # 16 kHz samples per byte, for the latency clock; None for Opus (frame length unknown)
+        width = BYTES_PER_SAMPLE.get(encoding)
+        self.samples_per_byte = 16000 / rate / width if width else None
+        self.duration_s = frames[-1][0] if frames else 0.0
+
+
+def load_log(path):
+    config, frames, t0 = dict(DEFAULT_CONFIG), [], None
+    for kind, t, payload in read_session(path):
+        if kind == CONFIG:
+            config = json.loads(payload)
+            continue
+        if t0 is None:
+            t0 = t
+        if kind == AUDIO:
+            frames.append((t - t0, AUDIO, payload))
+        elif kind == TEXT:
+            frames.append((t - t0, TEXT, payload.decode("utf-8")))
+    return Script(path, config, frames)
+
+
+def load_wav(path, frame_ms):
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        rate, channels = w.getframerate(), w.getnchannels()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1).astype("<i2")
+    step = rate * frame_ms // 1000
+    frames = [
+        (i / rate, AUDIO, pcm[i:i + step].tobytes()) for i in range(0, len(pcm), step)
+    ]
+    frames.append((len(pcm) / rate, TEXT, "END_OF_AUDIO"))
+    config = dict(DEFAULT_CONFIG, audio_encoding="int16", audio_sample_rate=rate)
+    return Script(path, config, frames)
+
+
+class SessionResult:
+    def __init__(self):
+        self.ok = False
+        self.error = None
+        self.connect_s = None
+        self.setup_s = None
+        self.bytes_sent = 0
+        self.audio_s = 0.0
+        self.messages = 0
+        self.pauses = 0
+        self.max_lag_s = 0.0
+        self.partial = []
+        self.final = []
+
+
+async def run_session(index, url, script, speed, drain_s, metrics):
+    result = SessionResult()
+    latency = metrics.session(url, script.config.get("model"))
+    config = dict(script.config, uid=f"replay-{index}")
+    resume = asyncio.Event()
+    resume.set()
+    done = asyncio.Event()
+
+    async def reader(ws):
+        async for message in ws:
+            result.messages += 1
+            try:
+                msg = json.loads(message)
+            except (TypeError, ValueError):
+                continue
+            if msg.get("message") == "PAUSE_AUDIO":
+                result.pauses += 1
+                resume.clear()
+            elif msg.get("message") == "RESUME_AUDIO":
+                resume.set()
+            elif msg.get("message") == "DISCONNECT":
+                break
+            elif msg.get("segments"):
+                latency.observe_update(msg)
+        done.set()
+
+    t0 = time.perf_counter()
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            result.connect_s = time.perf_counter() - t0
+            await ws.send(json.dumps(config))
+            t1 = time.perf_counter()
+            while True:
+                msg = json.loads(await asyncio.wait_for(ws.recv(), 30))
+                if msg.get("message") == "SERVER_READY":
+                    break
+                if msg.get("status") in ("WAIT", "ERROR"):
+                    raise RuntimeError(f"{msg.get('status')}: {msg.get('message')}")
+            result.setup_s = time.perf_counter() - t1
+
+            read_task = asyncio.create_task(reader(ws))
+            start = time.perf_counter()
+            paused_s = 0.0
+            for t, kind, payload in script.frames:
+                if not resume.is_set():
+                    pause_start = time.perf_counter()
+                    await resume.wait()
+                    paused_s += time.perf_counter() - pause_start
+                due = start + paused_s + t / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    result.max_lag_s = max(result.max_lag_s, -delay)
+                await ws.send(payload)
+                if kind == AUDIO:
+                    result.bytes_sent += len(payload)
+                    if script.samples_per_byte:
+                        samples = int(len(payload) * script.samples_per_byte)
+                        latency.clock.advance(samples)
+                        result.audio_s += samples / 16000
+            try:
+                await asyncio.wait_for(done.wait(), drain_s)
+            except asyncio.TimeoutError:
+                pass
+            read_task.cancel()
+        result.ok = True
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.partial = list(latency.partial)
+    result.final = list(latency.final)
+    return result
+
+
+async def run(args):
+    scripts = [
+        load_log(path) if path.endswith(".wlr") else load_wav(path, args.frame_ms)
+        for path in args.sources
+    ]
+    metrics = RelayMetrics()
+
+    async def delayed(i):
+        if args.ramp_s and args.sessions > 1:
+            await asyncio.sleep(args.ramp_s * i / (args.sessions - 1))
+        return await run_session(i, args.url, scripts[i % len(scripts)], args.speed, args.drain_s, metrics)
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(delayed(i) for i in range(args.sessions)))
+    wall_s = time.perf_counter() - t0
+
+    ok = [r for r in results if r.ok]
+    errors = {}
+    for r in results:
+        if r.error:
+            errors[r.error] = errors.get(r.error, 0) + 1
+    audio_s = sum(r.audio_s for r in ok)
+    return {
+        "sessions": args.sessions,
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "errors": errors,
+        "wall_s": round(wall_s, 2),
+        "connect": percentiles([r.connect_s for r in results if r.connect_s is not None]),
+        "setup": percentiles([r.setup_s for r in results if r.setup_s is not None]),
+        "audio_s": round(audio_s, 1),
+        "audio_s_per_s": round(audio_s / wall_s, 2) if wall_s else None,
+        "sent_mb_per_s": round(sum(r.bytes_sent for r in ok) / wall_s / 2**20, 3) if wall_s else None,
+        "messages_received": sum(r.messages for r in ok),
+        "pauses": sum(r.pauses for r in ok),
+        "send_lag": percentiles([r.max_lag_s for r in ok]),
+        "audio_to_partial": percentiles([x for r in results for x in r.partial]),
+        "audio_to_final": percentiles([x for r in results for x in r.final]),
+    }
+
+
+def print_report(report):
+    print(f"Sessions: {report['ok']}/{report['sessions']} ok in {report['wall_s']}s")
+    for error, count in report["errors"].items():
+        print(f"  {count} x {error}")
+    print(f"Audio: {report['audio_s']}s sent, {report['audio_s_per_s']} audio-s/s, {report['sent_mb_per_s']} MB/s")
+    print(f"Messages received: {report['messages_received']}, pauses: {report['pauses']}")
+    print(f"{'ms':<18}{'p50':>10}{'p95':>10}{'max':>10}")
+    for key in ("connect", "setup", "send_lag", "audio_to_partial", "audio_to_final"):
+        cells = ["-" if report[key][q] is None else report[key][q] for q in ("p50_ms", "p95_ms", "max_ms")]
+        print(f"{key:<18}" + "".join(f"{cell:>10}" for cell in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay sessions against the WhisperLive relay.")
+    parser.add_argument("sources", nargs="+", help="Session logs (.wlr) or 16-bit WAV files")
+    parser.add_argument("--url", default="ws://localhost:8501/ws")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions (sources are cycled)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback rate (2 = twice real time)")
+    parser.add_argument("--ramp-s", type=float, default=0.0, help="Spread session starts over this many seconds")
+    parser.add_argument("--frame-ms", type=int, default=40, help="Frame size for WAV sources")
+    parser.add_argument("--drain-s", type=float, default=10.0, help="Wait this long for final text after the audio")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
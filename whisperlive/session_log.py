@@ -0,0 +1,88 @@
+import os
+import re
+import struct
+import time
+
+# When set, every relay session's config and inbound frames are written to
+# WHISPER_RECORD_DIR/<time>-<uid>.wlr for replay.py
+WHISPER_RECORD_DIR = os.getenv("WHISPER_RECORD_DIR", "")
+
+MAGIC = b"WLRLOG1\n"
+# Record header: kind, milliseconds since the session started, payload length
+_HEADER = struct.Struct("<cII")
+CONFIG, AUDIO, TEXT = b"C", b"A", b"T"
+
+
+class SessionRecorder:
+    """
+    Compact binary log of one session as the browser sent it.
+
+    Audio is stored exactly as received (int16, Opus, ...), so a log replays the
+    same wire format and costs no more disk than the session cost bandwidth.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "wb", buffering=64 * 1024)
+        self.f.write(MAGIC)
+        self.t0 = time.monotonic()
+
+    def _write(self, kind, payload):
+        ms = int((time.monotonic() - self.t0) * 1000)
+        self.f.write(_HEADER.pack(kind, ms, len(payload)))
+        self.f.write(payload)
+
+    def config(self, text):
+        self._write(CONFIG, text.encode("utf-8"))
+
+    def audio(self, data):
+        self._write(AUDIO, data)
+
+    def text(self, text):
+        self._write(TEXT, text.encode("utf-8"))
+
+    def close(self):
+        self.f.close()
+
+
+def safe_name(uid):
+    """A client-supplied id reduced to characters that are safe in a file name."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(uid or "session"))[:64]
+
+
+def open_recorder(uid, record_dir=WHISPER_RECORD_DIR):
+    """Return a SessionRecorder for a new session, or None when recording is off or fails."""
+    if not record_dir:
+        return None
+    name = safe_name(uid)
+    path = os.path.join(record_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.wlr")
+    try:
+        os.makedirs(record_dir, exist_ok=True)
+        return SessionRecorder(path)
+    except OSError as e:
+        print(f"!!! Cannot record session to {path}: {e}")
+        return None
+
+
+def read_session(path):
+    """
+    Read a session log.
+
+    Returns:
+    - list[(bytes, float, bytes)]: (kind, seconds since session start, payload) records.
+      A log cut short by a crash is read up to its last complete record.
+    """
+    records = []
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a relay session log")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            kind, ms, length = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                break
+            records.append((kind, ms / 1000, payload))
+    return records
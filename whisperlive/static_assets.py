@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import io
+import os
+import time
+import zipfile
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is still served
+    brotli = None
+
+# Seconds between checks of the extension folder for changes
+EXTENSION_RECHECK_S = float(os.getenv("EXTENSION_RECHECK_S", "2"))
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class StaticAsset:
+    """
+    An in-memory response body with precompressed variants and ETags.
+
+    Compression happens once, when the asset is built; serving only picks the
+    variant the client accepts, or answers 304 when its cached copy is current.
+    """
+
+    def __init__(self, body, media_type, headers=None, compress=True):
+        self.media_type = media_type
+        self.headers = headers or {}
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        # Each encoding is a different byte sequence, so each gets its own strong ETag
+        self.variants = {"identity": (body, f'"{digest}"')}
+        if compress and len(body) >= MIN_COMPRESS_BYTES:
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+            self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+
+    def _pick(self, accept_encoding):
+        accepted = set()
+        for part in (accept_encoding or "").lower().replace(" ", "").split(","):
+            token, _, params = part.partition(";")
+            try:
+                if params.startswith("q=") and float(params[2:]) == 0:
+                    continue  # explicitly refused
+            except ValueError:
+                pass
+            accepted.add(token)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, request):
+        encoding = self._pick(request.headers.get("accept-encoding"))
+        body, etag = self.variants[encoding]
+        headers = {
+            **self.headers,
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache",  # cache, but revalidate (cheap: 304)
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def _tree_signature(root):
+    return tuple(
+        (os.path.relpath(os.path.join(dirpath, name), root), st.st_mtime_ns, st.st_size)
+        for dirpath, dirnames, filenames in sorted(os.walk(root))
+        for name in sorted(filenames)
+        for st in [os.stat(os.path.join(dirpath, name))]
+    )
+
+
+def build_zip(root):
+    """Deflated ZIP of ``root`` under its own folder name, in a stable order."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for dirpath, dirnames, filenames in sorted(os.walk(root)):
+            for fname in sorted(filenames):
+                full = os.path.join(dirpath, fname)
+                zipf.write(full, os.path.join(os.path.basename(root), os.path.relpath(full, root)))
+    return buf.getvalue()
+
+
+class ZipAsset:
+    """
+    The extension folder as a cached ZIP, rebuilt only when a file in it changes.
+
+    The folder is stat'ed at most every ``recheck_s`` seconds.
+    """
+
+    def __init__(self, root, filename, recheck_s=EXTENSION_RECHECK_S):
+        self.root = root
+        self.filename = filename
+        self.recheck_s = recheck_s
+        self.signature = None
+        self.asset = None
+        self.checked_at = 0.0
+        self.builds = 0
+
+    def get(self):
+        """Return the current StaticAsset, or None when the folder does not exist."""
+        now = time.monotonic()
+        if self.asset is not None and now - self.checked_at < self.recheck_s:
+            return self.asset
+        self.checked_at = now
+        if not os.path.isdir(self.root):
+            self.asset = self.signature = None
+            return None
+        signature = _tree_signature(self.root)
+        if signature != self.signature:
+            self.asset = StaticAsset(
+                build_zip(self.root),
+                "application/zip",
+                headers={"Content-Disposition": f"attachment; filename={self.filename}"},
+                compress=False,  # already deflated
+            )
+            self.signature = signature
+            self.builds += 1
+        return self.asset
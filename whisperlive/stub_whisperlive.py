@@ -0,0 +1,122 @@
+"""
+Stand-in WhisperLive server for testing the relay without a GPU.
+
+Speaks the WhisperLive WebSocket protocol: takes a JSON config, answers
+SERVER_READY, then turns received float32 16 kHz audio into a partial segment
+every ``--partial-s`` seconds of audio and completes it every ``--final-s``.
+``--max-clients`` makes it answer WAIT like a full server, ``--ready-delay``
+simulates a slow model load, ``--stall-ms`` a backend that falls behind the audio
+and ``--refuse`` closes every session on connect.
+
+Usage:
+    python stub_whisperlive.py --port 19090 --port 19091
+    WHISPER_BACKENDS=localhost:19090,localhost:19091 uvicorn whisper:app --port 8501
+"""
+import argparse
+import asyncio
+import json
+
+import websockets
+
+SAMPLE_RATE = 16000
+
+
+class StubServer:
+    def __init__(self, port, ready_delay=0.0, max_clients=0, refuse=False, partial_s=0.5, final_s=3.0, stall_ms=0):
+        self.port = port
+        self.ready_delay = ready_delay
+        self.max_clients = max_clients
+        self.refuse = refuse
+        self.partial_s = partial_s
+        self.final_s = final_s
+        self.stall_ms = stall_ms
+        self.clients = 0
+        self.sessions = 0
+
+    async def handle(self, ws):
+        if self.refuse:
+            await ws.close()
+            return
+        try:
+            config = json.loads(await ws.recv())
+        except (ValueError, websockets.ConnectionClosed):
+            return
+        uid = config.get("uid")
+
+        if self.max_clients and self.clients >= self.max_clients:
+            await ws.send(json.dumps({"uid": uid, "status": "WAIT", "message": 1.0}))
+            await ws.close()
+            return
+
+        self.clients += 1
+        self.sessions += 1
+        try:
+            await asyncio.sleep(self.ready_delay)
+            await ws.send(json.dumps({"uid": uid, "message": "SERVER_READY", "backend": f"stub:{self.port}"}))
+            await ws.send(json.dumps({"uid": uid, "language": config.get("language") or "en", "language_prob": 1.0}))
+            await self._transcribe(ws, uid)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.clients -= 1
+
+    async def _transcribe(self, ws, uid):
+        samples = 0
+        emitted = 0.0
+        completed = []
+        segment_start = 0.0
+        async for data in ws:
+            if isinstance(data, str):
+                if data == "END_OF_AUDIO":
+                    break
+                continue
+            samples += len(data) // 4  # float32
+            if self.stall_ms:
+                await asyncio.sleep(self.stall_ms / 1000)
+            audio_s = samples / SAMPLE_RATE
+            if audio_s - emitted < self.partial_s:
+                continue
+            emitted = audio_s
+            done = audio_s - segment_start >= self.final_s
+            segment = {
+                "start": f"{segment_start:.3f}",
+                "end": f"{audio_s:.3f}",
+                "text": f"[{self.port}] segment {len(completed) + 1} at {audio_s:.1f}s",
+                "completed": done,
+            }
+            segments = completed[-9:] + [segment]
+            if done:
+                completed.append(segment)
+                segment_start = audio_s
+            await ws.send(json.dumps({"uid": uid, "segments": segments}))
+        await ws.send(json.dumps({"uid": uid, "message": "DISCONNECT"}))
+
+    async def serve(self):
+        async with websockets.serve(self.handle, "0.0.0.0", self.port, max_size=None):
+            print(f">>> Stub WhisperLive listening on ws://localhost:{self.port}/ws")
+            await asyncio.Future()
+
+
+async def main(args):
+    servers = [
+        StubServer(port, args.ready_delay, args.max_clients, args.refuse, args.partial_s, args.final_s, args.stall_ms)
+        for port in args.port
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub WhisperLive server for relay tests.")
+    parser.add_argument("--port", type=int, action="append", help="Port to listen on (repeatable)")
+    parser.add_argument("--ready-delay", type=float, default=0.0, help="Seconds before SERVER_READY")
+    parser.add_argument("--max-clients", type=int, default=0, help="Answer WAIT above this many sessions (0 = no limit)")
+    parser.add_argument("--refuse", action="store_true", help="Close every connection without answering")
+    parser.add_argument("--partial-s", type=float, default=0.5, help="Audio seconds between updates")
+    parser.add_argument("--stall-ms", type=float, default=0, help="Delay after each audio message (slow backend)")
+    parser.add_argument("--final-s", type=float, default=3.0, help="Audio seconds per completed segment")
+    args = parser.parse_args()
+    args.port = args.port or [9090]
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,126 @@
+import json
+import os
+import secrets
+import time
+
+from session_log import safe_name
+
+# Finished session transcripts are written here as <transcript_id>.json (empty = don't save).
+# The default is outside the source tree, which the container mounts from the host.
+WHISPER_TRANSCRIPT_DIR = os.getenv(
+    "WHISPER_TRANSCRIPT_DIR", os.path.join(os.path.expanduser("~"), ".whisperlive", "transcripts")
+)
+# Relay-only config key: the client wants deltas instead of the full segment window
+DELTA_KEY = "segment_deltas"
+# Key added to SERVER_READY: the id the client uses to fetch its transcript
+TRANSCRIPT_ID_KEY = "transcript_id"
+
+
+def _segment_key(segment):
+    return segment.get("id") or (segment.get("start"), segment.get("end"), segment.get("text"))
+
+
+class TranscriptAssembler:
+    """
+    Builds one session's transcript from WhisperLive updates.
+
+    WhisperLive resends the last ``send_last_n_segments`` segments in every
+    update. The assembler keeps each completed segment once and, for clients that
+    asked for deltas, turns every update into just the new finals plus the
+    current partial (or nothing, when neither changed).
+
+    Each transcript gets a random ``transcript_id``. Only the session's client is
+    told it, and it is the only way to fetch the transcript, so a client-chosen
+    (and possibly guessable) uid never exposes anyone's text.
+    """
+
+    def __init__(self, uid, **meta):
+        self.uid = uid
+        self.transcript_id = secrets.token_urlsafe(16)
+        self.meta = meta
+        self.started = time.time()
+        self.language = None
+        self.finals = []
+        self.partial = None
+        self._seen = set()
+
+    def apply(self, msg):
+        """
+        Fold a WhisperLive message into the transcript.
+
+        Returns:
+        - dict | None: The delta update to forward, or None if nothing changed.
+        """
+        if msg.get("language"):
+            self.language = msg["language"]
+        segments = msg.get("segments")
+        if not segments:
+            return msg
+
+        new_finals = []
+        for segment in segments:
+            if not segment.get("completed"):
+                continue
+            key = _segment_key(segment)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            new_finals.append(segment)
+        self.finals.extend(new_finals)
+
+        last = segments[-1]
+        partial = None if last.get("completed") else last
+        changed = bool(new_finals) or (partial or {}).get("text") != (self.partial or {}).get("text")
+        self.partial = partial
+        if not changed:
+            return None
+        return {"uid": msg.get("uid", self.uid), "segments": new_finals + ([partial] if partial else []), "delta": True}
+
+    def to_dict(self):
+        return {
+            "uid": self.uid,
+            "transcript_id": self.transcript_id,
+            **self.meta,
+            "language": self.language,
+            "started": self.started,
+            "ended": time.time(),
+            "segments": [
+                {"start": s.get("start"), "end": s.get("end"), "text": (s.get("text") or "").strip()}
+                for s in self.finals
+            ],
+            "partial": (self.partial or {}).get("text"),
+        }
+
+    def save(self, transcript_dir=WHISPER_TRANSCRIPT_DIR):
+        """Write the transcript to ``transcript_dir``; returns the path, or None when disabled or empty."""
+        if not transcript_dir or not self.finals:
+            return None
+        os.makedirs(transcript_dir, exist_ok=True)
+        path = os.path.join(transcript_dir, f"{self.transcript_id}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+
+def to_text(transcript):
+    """Plain-text rendering of a transcript dict, one ``[start-end] text`` line per segment."""
+    lines = []
+    for s in transcript["segments"]:
+        try:
+            lines.append(f"[{float(s['start']):.1f}s-{float(s['end']):.1f}s] {s['text']}")
+        except (TypeError, ValueError):
+            lines.append(s["text"])
+    return "\n".join(lines) + "\n"
+
+
+def load_transcript(transcript_id, transcript_dir=WHISPER_TRANSCRIPT_DIR):
+    """Load a saved transcript by its transcript_id; None if there is none."""
+    if not transcript_dir:
+        return None
+    path = os.path.join(transcript_dir, f"{safe_name(transcript_id)}.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+import websockets
+
+# Warm connections kept open per backend, and the hard cap on connections
+# (warm + in use) per backend. WhisperLive binds one transcription session to
+# one socket, so a pooled connection is used by exactly one browser session and
+# the pool replaces it in the background.
+WHISPER_POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", "2"))
+WHISPER_POOL_MAX = int(os.getenv("WHISPER_POOL_MAX", "32"))
+WHISPER_POOL_MAX_IDLE_S = float(os.getenv("WHISPER_POOL_MAX_IDLE_S", "120"))
+WHISPER_POOL_HEALTH_INTERVAL = float(os.getenv("WHISPER_POOL_HEALTH_INTERVAL", "10"))
+WHISPER_CONNECT_TIMEOUT = float(os.getenv("WHISPER_CONNECT_TIMEOUT", "5"))
+
+
+class PoolExhausted(Exception):
+    """The backend already has WHISPER_POOL_MAX connections open."""
+
+
+class _WarmConnection:
+    def __init__(self, ws, connect_s):
+        self.ws = ws
+        self.connect_s = connect_s
+        self.created_at = time.monotonic()
+
+
+def _is_open(ws):
+    return ws.close_code is None
+
+
+class UpstreamPool:
+    """
+    Pre-warmed WebSocket connections to one WhisperLive backend.
+
+    ``acquire()`` hands out a warm connection when one is ready (the TCP and
+    WebSocket handshakes were paid in advance) and falls back to connecting on
+    demand. A background task keeps ``size`` warm connections open, pings idle
+    ones and recycles those older than ``max_idle_s``.
+    """
+
+    def __init__(
+        self,
+        url,
+        size=WHISPER_POOL_SIZE,
+        max_connections=WHISPER_POOL_MAX,
+        max_idle_s=WHISPER_POOL_MAX_IDLE_S,
+        health_interval=WHISPER_POOL_HEALTH_INTERVAL,
+        connect_timeout=WHISPER_CONNECT_TIMEOUT,
+    ):
+        self.url = url
+        self.size = size
+        self.max_connections = max_connections
+        self.max_idle_s = max_idle_s
+        self.health_interval = health_interval
+        self.connect_timeout = connect_timeout
+
+        self.in_use = 0
+        self.connecting = 0
+        self.healthy = True
+        self.last_error = None
+        self.stats = {
+            "warm_hits": 0,
+            "cold_connects": 0,
+            "connect_failures": 0,
+            "health_failures": 0,
+            "recycled": 0,
+            "connect_s_total": 0.0,
+            "connects": 0,
+            "saved_s": 0.0,
+        }
+        self._idle = deque()
+        self._wake = asyncio.Event()
+        self._task = None
+
+    @property
+    def total(self):
+        return self.in_use + self.connecting + len(self._idle)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._idle:
+            await self._discard(self._idle.popleft())
+
+    async def _connect(self):
+        t0 = time.perf_counter()
+        try:
+            ws = await asyncio.wait_for(websockets.connect(self.url), self.connect_timeout)
+        except Exception as e:
+            self.stats["connect_failures"] += 1
+            self.healthy = False
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+        connect_s = time.perf_counter() - t0
+        self.stats["connects"] += 1
+        self.stats["connect_s_total"] += connect_s
+        self.healthy = True
+        self.last_error = None
+        return _WarmConnection(ws, connect_s)
+
+    async def _discard(self, conn):
+        try:
+            await conn.ws.close()
+        except Exception:
+            pass
+
+    async def acquire(self):
+        """
+        Return an open connection for one session; call ``release()`` when it ends.
+
+        Raises:
+        - PoolExhausted: The backend is at ``max_connections``.
+        - OSError / TimeoutError / websockets errors: A cold connect failed.
+        """
+        while self._idle:
+            conn = self._idle.popleft()
+            if _is_open(conn.ws) and time.monotonic() - conn.created_at < self.max_idle_s:
+                self.in_use += 1
+                self.stats["warm_hits"] += 1
+                self.stats["saved_s"] += conn.connect_s
+                self._wake.set()
+                return conn.ws
+            self.stats["recycled"] += 1
+            await self._discard(conn)
+
+        if self.total >= self.max_connections:
+            raise PoolExhausted(f"{self.url} has {self.total} connections open")
+
+        # Reserve the slot before awaiting so concurrent acquires respect the cap
+        self.in_use += 1
+        try:
+            conn = await self._connect()
+        except BaseException:
+            self.in_use -= 1
+            raise
+        self.stats["cold_connects"] += 1
+        self._wake.set()
+        return conn.ws
+
+    def release(self):
+        """Mark a session's connection as finished (the session closes the socket)."""
+        self.in_use = max(self.in_use - 1, 0)
+        self._wake.set()
+
+    async def _check_idle(self):
+        """Ping warm connections; drop dead and expired ones."""
+        for conn in list(self._idle):
+            expired = time.monotonic() - conn.created_at >= self.max_idle_s
+            ok = _is_open(conn.ws) and not expired
+            if ok:
+                try:
+                    pong = await conn.ws.ping()
+                    await asyncio.wait_for(pong, self.connect_timeout)
+                except Exception:
+                    ok = False
+                    self.stats["health_failures"] += 1
+            if ok:
+                continue
+            try:
+                self._idle.remove(conn)
+            except ValueError:
+                continue  # handed out while we were pinging
+            self.stats["recycled"] += int(expired)
+            await self._discard(conn)
+
+    async def _maintain(self):
+        backoff = 1.0
+        last_check = time.monotonic()
+        while True:
+            try:
+                while len(self._idle) < self.size and self.total < self.max_connections:
+                    self.connecting += 1
+                    try:
+                        conn = await self._connect()
+                    finally:
+                        self.connecting -= 1
+                    self._idle.append(conn)
+                backoff = 1.0
+                if time.monotonic() - last_check >= self.health_interval:
+                    await self._check_idle()
+                    last_check = time.monotonic()
+                timeout = self.health_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"!!! Upstream pool {self.url}: {e}")
+                timeout = backoff
+                backoff = min(backoff * 2, 30.0)
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self):
+        """Pool state and counters as a JSON-serializable dict."""
+        stats = dict(self.stats)
+        connects = stats.pop("connects")
+        connect_s_total = stats.pop("connect_s_total")
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "last_error": self.last_error,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "max_connections": self.max_connections,
+            "avg_connect_ms": round(connect_s_total / connects * 1000, 2) if connects else None,
+            **stats,
+            "saved_s": round(stats["saved_s"], 3),
+        }
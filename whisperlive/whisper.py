@@ -1,17 +1,68 @@
 import asyncio
+import itertools
 import json
+import time
 import websockets
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import HTMLResponse
-import io, os, zipfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import PlainTextResponse
+import os
 from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
-
-app = FastAPI()
-
-WHISPER_HOST = "192.168.27.13"
-WHISPER_PORT = 9090
-WHISPER_WS_URL = f"ws://{WHISPER_HOST}:{WHISPER_PORT}/ws"
+from audio_codec import UnsupportedAudio, negotiate
+from balancer import WHISPER_BACKENDS, Balancer, NoBackendAvailable, parse_backends
+from coordinator import WHISPER_COORDINATOR, WHISPER_REPORT_INTERVAL, CoordinatorClient
+from relay_metrics import RelayMetrics
+from relay_queues import PAUSE_MESSAGE, RESUME_MESSAGE, AudioOutbox, DownstreamQueue
+from session_log import open_recorder
+from static_assets import StaticAsset, ZipAsset
+from transcript import DELTA_KEY, TRANSCRIPT_ID_KEY, TranscriptAssembler, load_transcript, to_text
+
+WHISPER_HOST = os.getenv("WHISPER_HOST", "192.168.27.13")
+WHISPER_PORT = int(os.getenv("WHISPER_PORT", "9090"))
+
+# One or more WhisperLive servers, each with a pool of pre-warmed connections
+# (see balancer.py and upstream.py for the settings)
+balancer = Balancer(parse_backends(WHISPER_BACKENDS, WHISPER_HOST, WHISPER_PORT))
+
+# Under workers.py several relay processes share one port; they exchange session
+# counts and stats through the coordinator (see coordinator.py)
+WHISPER_WORKER_ID = os.getenv("WHISPER_WORKER_ID", str(os.getpid()))
+coordinator = CoordinatorClient(WHISPER_COORDINATOR, WHISPER_WORKER_ID) if WHISPER_COORDINATOR else None
+
+
+# Function to share this worker's session counts and pick up everyone else's
+async def sync_sessions(op="sync", **payload):
+    reply = await coordinator.call(op, backends=balancer.session_counts(), **payload)
+    if reply:
+        balancer.set_remote_sessions(reply["other_sessions"])
+    return reply
+
+
+# Function to publish this worker's stats and metrics to the coordinator periodically
+async def report_loop():
+    while True:
+        await sync_sessions("report", report=worker_report())
+        await asyncio.sleep(WHISPER_REPORT_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await balancer.start()
+    reporter = asyncio.create_task(report_loop()) if coordinator else None
+    yield
+    if reporter:
+        reporter.cancel()
+        await coordinator.close()
+    await balancer.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Audio throughput per encoding and audio-to-text latency per backend and model
+relay_metrics = RelayMetrics()
+# Live relay sessions with their queues, for /stats
+active_sessions = {}
+session_ids = itertools.count(1)
 
 HTML_PAGE = r"""
 <!DOCTYPE html>
@@ -208,6 +259,8 @@ h1 {
 #helpPanel h3{ margin-top:0; margin-bottom:8px; }
 #helpPanel p{ margin:6px 0; font-size:14px; opacity:0.95 }
 #helpPanel li{ margin:6px 0; font-size:14px; opacity:0.95 }
+#transcriptLink{ margin-top:6px; text-align:center; font-size:14px; opacity:0.85; }
+#transcriptLink a{ color:var(--accent); }
 #helpPanel .download{ display:inline-block; margin-top:8px; padding:8px 12px; background:var(--accent); color:#fff; border-radius:8px; text-decoration:none; }
 #helpPanel .closeX{ position:absolute; right:8px; top:8px; background:none; border:none; color:inherit; font-weight:700; cursor:pointer; }
 </style>
@@ -243,6 +296,7 @@ h1 {
 </div>
 
 <div id="status">Idle</div>
+<div id="transcriptLink"></div>
 
 <!-- Mic Button -->
 <div id="mic" onclick="toggleRecord()">
@@ -285,6 +339,48 @@ h1 {
 
 <script>
 let ws=null, audioCtx=null, processor=null, stream=null;
+let encoder=null, encodedFrames=0;
+// Wire format: int16 PCM by default (half of float32); ?codec=opus uses WebCodecs
+// Opus when the browser supports it. The relay decodes both back to float32.
+const WANT_OPUS = new URLSearchParams(location.search).get("codec") === "opus";
+const OPUS_CONFIG = {codec:"opus", sampleRate:16000, numberOfChannels:1, bitrate:24000};
+
+// Capture runs in an AudioWorklet (off the main thread) and is sent in frames of
+// ?frame_ms= milliseconds (default 40). Audio captured before SERVER_READY is kept
+// in the worklet's ring buffer (up to RING_SECONDS) and sent once the server is ready.
+const FRAME_MS = Math.min(Math.max(parseInt(new URLSearchParams(location.search).get("frame_ms")) || 40, 10), 250);
+const RING_SECONDS = 2;
+const CAPTURE_WORKLET = `
+class CaptureProcessor extends AudioWorkletProcessor {
+  constructor(options){
+    super();
+    const o = options.processorOptions;
+    this.frame = o.frameSamples;
+    this.ring = new Float32Array(o.ringSamples);
+    this.write = 0;  // total samples written
+    this.read = 0;   // total samples posted (or overwritten)
+    this.sending = false;
+    this.port.onmessage = e => { this.sending = e.data.sending; };
+  }
+  process(inputs){
+    const ch = inputs[0] && inputs[0][0];
+    if (!ch) return true;
+    const n = this.ring.length;
+    for (let i = 0; i < ch.length; i++) this.ring[(this.write + i) % n] = ch[i];
+    this.write += ch.length;
+    if (this.write - this.read > n) this.read = this.write - n;  // drop the oldest audio
+    while (this.sending && this.write - this.read >= this.frame){
+      const out = new Float32Array(this.frame);
+      for (let i = 0; i < this.frame; i++) out[i] = this.ring[(this.read + i) % n];
+      this.read += this.frame;
+      this.port.postMessage(out, [out.buffer]);
+    }
+    return true;
+  }
+}
+registerProcessor("capture-processor", CaptureProcessor);
+`;
+let workletUrl = null;
 
 let recording=false, serverReady=false;
 let appended = new Set();
@@ -297,6 +393,17 @@ let currentLangBlock = null;  // DOM element for that section
 const transcriptEl = document.getElementById("transcript");
 const STATUS = txt => document.getElementById("status").innerText = txt;
 
+// Link to this session's transcript; the id in SERVER_READY is the only way to fetch it
+function SHOW_TRANSCRIPT_LINK(id){
+  const url = `/transcripts/${encodeURIComponent(id)}`;
+  const box = document.getElementById("transcriptLink");
+  box.innerHTML = `Transcript <code></code>: <a target="_blank">text</a> · <a target="_blank">JSON</a>`;
+  box.querySelector("code").textContent = id;
+  const [txt, json] = box.querySelectorAll("a");
+  txt.href = `${url}?format=txt`;
+  json.href = url;
+}
+
 /* ================================
   Utility: map language → flag
 ================================== */
@@ -373,6 +480,48 @@ function resetTranscript() {
   currentLangBlock = null;
 }
 
+/* ================================
+  Audio encoding
+================================== */
+function floatToInt16(f32){
+  const out = new Int16Array(f32.length);
+  for (let i=0; i<f32.length; i++){
+   const s = Math.max(-1, Math.min(1, f32[i]));
+   out[i] = s < 0 ? s*0x8000 : s*0x7FFF;
+  }
+  return out.buffer;
+}
+
+async function createOpusEncoder(){
+  if (!WANT_OPUS || !("AudioEncoder" in window)) return null;
+  try{
+   if (!(await AudioEncoder.isConfigSupported(OPUS_CONFIG)).supported) return null;
+  }catch{ return null; }
+  const enc = new AudioEncoder({
+   output: chunk=>{
+    if (ws?.readyState!==1) return;
+    const buf = new ArrayBuffer(chunk.byteLength);
+    chunk.copyTo(buf);
+    ws.send(buf);
+   },
+   error: e=>console.error("Opus encoder:", e)
+  });
+  enc.configure(OPUS_CONFIG);
+  return enc;
+}
+
+function sendAudio(f32){
+  if (!encoder){
+   ws.send(floatToInt16(f32));
+   return;
+  }
+  encoder.encode(new AudioData({
+   format:"f32", sampleRate:16000, numberOfChannels:1,
+   numberOfFrames:f32.length, timestamp:encodedFrames*1e6/16000, data:f32
+  }));
+  encodedFrames += f32.length;
+}
+
 /* ================================
   Start recording
 ================================== */
@@ -388,16 +537,27 @@ async function startRecord(){
   audioCtx = new AudioContext({sampleRate:16000});
   if (audioCtx.state==="suspended") await audioCtx.resume();
 
+  workletUrl = workletUrl || URL.createObjectURL(new Blob([CAPTURE_WORKLET], {type:"application/javascript"}));
+  await audioCtx.audioWorklet.addModule(workletUrl);
+
   const src = audioCtx.createMediaStreamSource(stream);
-  processor = audioCtx.createScriptProcessor(4096,1,1);
+  processor = new AudioWorkletNode(audioCtx, "capture-processor", {
+   numberOfInputs:1, numberOfOutputs:0, channelCount:1,
+   processorOptions:{
+    frameSamples: Math.round(audioCtx.sampleRate*FRAME_MS/1000),
+    ringSamples: audioCtx.sampleRate*RING_SECONDS
+   }
+  });
+
+  encoder = await createOpusEncoder();
+  encodedFrames = 0;
 
-  processor.onaudioprocess = e=>{
-   if (!serverReady || ws?.readyState!==1) return;
-   ws.send(e.inputBuffer.getChannelData(0).buffer);
+  processor.port.onmessage = e=>{
+   if (ws?.readyState!==1) return;
+   sendAudio(e.data);
   };
 
   src.connect(processor);
-  processor.connect(audioCtx.destination);
 
   ws = new WebSocket("ws://"+window.location.host+"/ws");
 
@@ -405,6 +565,8 @@ async function startRecord(){
    STATUS("Sending config…");
    ws.send(JSON.stringify({
     uid:Math.random().toString(36).slice(2),
+    audio_encoding: encoder ? "opus" : "int16",
+    segment_deltas: true,          // relay sends only new finals + the current partial
     language: languageOverride,    // null => auto detect
     task:"transcribe",
     model:"turbo",
@@ -421,9 +583,17 @@ async function startRecord(){
   ws.onmessage = ev=>{
    let msg; try{ msg=JSON.parse(ev.data);}catch{return;}
 
+   // Backpressure from the relay: hold audio in the worklet's ring buffer meanwhile
+   if (msg.message==="PAUSE_AUDIO" || msg.message==="RESUME_AUDIO"){
+    processor?.port.postMessage({sending: msg.message==="RESUME_AUDIO"});
+    return;
+   }
+
    if (msg.message==="SERVER_READY"){
     serverReady=true;
+    processor?.port.postMessage({sending:true});
     STATUS("Speak now!");
+    if (msg.transcript_id) SHOW_TRANSCRIPT_LINK(msg.transcript_id);
     return;
    }
 
@@ -538,10 +708,11 @@ function stopRecord(){
   try{ ws?.close(); }catch{}
 
   try{ processor?.disconnect(); }catch{}
+  try{ encoder?.close(); }catch{}
   try{ audioCtx?.close(); }catch{}
   try{ stream?.getTracks().forEach(t=>t.stop()); }catch{}
 
-  ws=null; processor=null; audioCtx=null; stream=null;
+  ws=null; processor=null; audioCtx=null; stream=null; encoder=null;
   STATUS("Stopped");
 }
 </script>
@@ -555,70 +726,261 @@ function stopRecord(){
 # FastAPI <-> WhisperLive Relay
 # ======================================================
 
+# Static assets are built and compressed once; /extension.zip is rebuilt only
+# when a file in the extension folder changes
+html_page = StaticAsset(HTML_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+extension_zip = ZipAsset(os.path.join(os.path.dirname(os.path.abspath(__file__)), "extension"), "extension.zip")
+
 @app.get("/")
-async def index():
-    return HTMLResponse(HTML_PAGE)
+async def index(request: Request):
+    return html_page.response(request)
 
 @app.get("/extension.zip")
-async def extension():
-    root = os.path.join(os.path.dirname(__file__), "extension")
-    if not os.path.isdir(root):
+async def extension(request: Request):
+    asset = extension_zip.get()
+    if asset is None:
       raise HTTPException(status_code=404, detail="extension folder not found")
-
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zipf:
-      for dirpath, dirnames, filenames in os.walk(root):
-        for fname in filenames:
-          full = os.path.join(dirpath, fname)
-          arcname = os.path.join(os.path.basename(root), os.path.relpath(full, root))
-          zipf.write(full, arcname)
-    buf.seek(0)
-
-    return StreamingResponse(buf, media_type="application/zip",
-                 headers={"Content-Disposition": "attachment; filename=extension.zip"})
+    return asset.response(request)
+
+# Function to describe this worker's live sessions and counters
+def worker_report():
+    sessions = [
+        {
+            **{k: v for k, v in session.items() if k not in ("upstream", "downstream", "latency", "transcript")},
+            "worker": WHISPER_WORKER_ID,
+            "upstream": session["upstream"].snapshot(),
+            "downstream": session["downstream"].snapshot(),
+            "latency": session["latency"].snapshot(),
+            "finals": len(session["transcript"].finals),
+        }
+        for session in active_sessions.values()
+    ]
+    return {"worker": WHISPER_WORKER_ID, "pid": os.getpid(), "sessions": sessions, "metrics": relay_metrics.to_state()}
+
+
+# Function to gather every worker's report (just this one when running alone)
+async def cluster_reports():
+    report = worker_report()
+    if coordinator:
+        reply = await sync_sessions("cluster", report=report)
+        if reply:
+            return list(reply["reports"].values())
+    return [report]
+
+
+@app.get("/stats")
+async def stats():
+    reports = await cluster_reports()
+    audio = RelayMetrics.merged(r["metrics"] for r in reports).audio
+    workers = [{"worker": r["worker"], "pid": r["pid"], "active_sessions": len(r["sessions"])} for r in reports]
+    sessions = [s for r in reports for s in r["sessions"]]
+    return {**balancer.snapshot(), "workers": workers, "audio": audio, "sessions": sessions}
+
+@app.get("/transcripts/{transcript_id}")
+async def get_transcript(transcript_id: str, format: str = "json"):
+    # Only the session's client knows its transcript_id (sent in SERVER_READY).
+    # Live sessions on this worker first, then the saved transcripts.
+    live = next(
+        (s["transcript"] for s in active_sessions.values() if s["transcript"].transcript_id == transcript_id), None
+    )
+    data = live.to_dict() if live else load_transcript(transcript_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="transcript not found")
+    if format == "txt":
+        return PlainTextResponse(to_text(data))
+    return data
+
+@app.get("/metrics")
+async def metrics():
+    reports = await cluster_reports()
+    merged = RelayMetrics.merged(r["metrics"] for r in reports)
+    return PlainTextResponse(merged.render(sum(len(r["sessions"]) for r in reports)))
 
 @app.websocket("/ws")
 async def relay(websocket: WebSocket):
     await websocket.accept()
     print(">>> Browser connected")
-    print(f">>> Connecting to WhisperLive: {WHISPER_WS_URL}")
 
+    # The first message is the client's config; keep it so setup can be retried
+    # on another backend. Audio sent meanwhile waits in the browser socket.
     try:
-        whisper_ws = await websockets.connect(WHISPER_WS_URL)
-        print(">>> Connected to WhisperLive")
+        raw_config = await websocket.receive_text()
+        config = json.loads(raw_config)
+        if not isinstance(config, dict):
+            raise ValueError("config is not a JSON object")
     except Exception as e:
+        print("!!! Browser closed before sending a config:", e)
+        return
+
+    async def reject(message):
+        try:
+            await websocket.send_text(json.dumps({"uid": config.get("uid"), "status": "ERROR", "message": message}))
+            await websocket.close()
+        except Exception:
+            pass
+
+    # Compact wire formats (int16, Opus) are decoded back to float32 16 kHz here
+    try:
+        encoding = config.get("audio_encoding") or "float32"
+        decoder = negotiate(config)
+    except UnsupportedAudio as e:
+        print("!!! Unsupported client audio:", e)
+        await reject(str(e))
+        return
+    # Clients that assemble text themselves can ask for new segments only
+    deltas = bool(config.pop(DELTA_KEY, False))
+    counters = relay_metrics.encoding(encoding)
+    counters["sessions"] += 1
+
+    try:
+        if coordinator:
+            await sync_sessions()
+        backend, whisper_ws, ready = await balancer.open_session(json.dumps(config))
+        print(f">>> Connected to WhisperLive: {backend.url} ({encoding} audio)")
+    except NoBackendAvailable as e:
         print("!!! WhisperLive connection failed:", e)
-        await websocket.close()
+        await reject("No WhisperLive server available")
         return
 
-    async def browser_to_whisper():
+    # Each direction goes through a bounded queue drained by its own task, so a
+    # slow browser or a stalled backend cannot grow memory without limit
+    uid = config.get("uid")
+    downstream = DownstreamQueue()
+
+    def on_pressure(paused):
+        downstream.put_control(PAUSE_MESSAGE if paused else RESUME_MESSAGE, uid)
+
+    outbox = AudioOutbox(on_pressure=on_pressure)
+    latency = relay_metrics.session(backend.url, config.get("model"))
+    transcript = TranscriptAssembler(uid, backend=backend.url, model=config.get("model"))
+    # Tell the client (only) how to fetch its transcript
+    try:
+        ready = json.dumps({**json.loads(ready), TRANSCRIPT_ID_KEY: transcript.transcript_id})
+    except ValueError:
+        pass
+    try:
+        await websocket.send_text(ready)
+    except Exception as e:
+        print("!!! Browser left during setup:", e)
+        backend.pool.release()
+        await whisper_ws.close()
+        return
+    session_id = next(session_ids)
+    active_sessions[session_id] = {
+        "uid": uid,
+        "backend": backend.url,
+        "encoding": encoding,
+        "model": config.get("model"),
+        "started": time.time(),
+        "upstream": outbox,
+        "downstream": downstream,
+        "latency": latency,
+        "transcript": transcript,
+    }
+    if coordinator:
+        await sync_sessions()
+    # Optional binary log of what the browser sent, for replay.py
+    recorder = open_recorder(uid)
+    if recorder:
+        recorder.config(raw_config)
+
+    async def browser_to_relay():
         try:
             while True:
                 msg = await websocket.receive()
                 if msg["type"] != "websocket.receive":
                     break
                 if msg.get("text") is not None:
-                    await whisper_ws.send(msg["text"])
+                    if recorder:
+                        recorder.text(msg["text"])
+                    outbox.put_text(msg["text"])
                 elif msg.get("bytes") is not None:
-                    await whisper_ws.send(msg["bytes"])
+                    audio = msg["bytes"]
+                    if recorder:
+                        recorder.audio(audio)
+                    counters["bytes_in"] += len(audio)
+                    if decoder is not None:
+                        audio = decoder.decode(audio)
+                    if audio:
+                        counters["bytes_out"] += len(audio)
+                        latency.clock.advance(len(audio) // 4)
+                        outbox.put_audio(audio)
         except Exception as e:
-            print("browser_to_whisper:", e)
+            print("browser_to_relay:", e)
+        finally:
+            outbox.close()
+
+    async def relay_to_whisper():
+        try:
+            while (batch := await outbox.get()) is not None:
+                for item in batch:
+                    await whisper_ws.send(item)
+                outbox.done()
+        except Exception as e:
+            print("relay_to_whisper:", e)
         finally:
             try: await whisper_ws.close()
             except: pass
 
-    async def whisper_to_browser():
+    async def whisper_to_relay():
         try:
             while True:
                 data = await whisper_ws.recv()
+                msg = None
+                if isinstance(data, str):
+                    try:
+                        msg = json.loads(data)
+                    except ValueError:
+                        pass
+                counters["text_bytes_in"] += len(data)
+                if isinstance(msg, dict):
+                    if msg.get("segments"):
+                        latency.observe_update(msg)
+                    delta = transcript.apply(msg)
+                    if deltas and msg.get("segments"):
+                        if delta is None:
+                            continue
+                        msg, data = delta, json.dumps(delta)
+                counters["text_bytes_out"] += len(data)
+                downstream.put_update(data, msg)
+        except Exception as e:
+            print("whisper_to_relay:", e)
+        finally:
+            downstream.close()
+
+    async def relay_to_browser():
+        try:
+            while (data := await downstream.get()) is not None:
                 if isinstance(data, str):
                     await websocket.send_text(data)
                 else:
                     await websocket.send_bytes(data)
+            if downstream.overflowed:
+                print(f"!!! Browser stopped reading; closing session {uid}")
         except Exception as e:
-            print("whisper_to_browser:", e)
+            print("relay_to_browser:", e)
         finally:
             try: await websocket.close()
             except: pass
 
-    await asyncio.gather(browser_to_whisper(), whisper_to_browser())
+    try:
+        await asyncio.gather(browser_to_relay(), relay_to_whisper(), whisper_to_relay(), relay_to_browser())
+    finally:
+        backend.pool.release()
+        del active_sessions[session_id]
+        if coordinator:
+            await sync_sessions()
+        if recorder:
+            recorder.close()
+        try:
+            path = transcript.save()
+            if path:
+                print(f">>> Transcript saved: {path}")
+        except OSError as e:
+            print("!!! Could not save transcript:", e)
+        up = outbox.snapshot()
+        for key in ("frames_in", "messages_out", "pauses", "dropped_ms"):
+            counters[key] += up[key]
+        counters["downstream_dropped"] += downstream.dropped
+        if downstream.overflowed:
+            counters["downstream_overflows"] += 1
@@ -0,0 +1,104 @@
+"""
+Run the relay as several worker processes sharing one port.
+
+Each worker is a separate Python process with its own event loop, listening on
+the same host:port with SO_REUSEPORT so the kernel spreads new browser
+connections across them. This process runs the coordinator (coordinator.py)
+that workers use to balance backends together and to answer /stats and
+/metrics for the whole relay, and restarts workers that exit.
+
+Usage:
+    python workers.py --workers 4 --port 8501
+    WHISPER_WORKERS=4 ./entrypoint.sh
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+import tempfile
+
+# Worker processes started by the launcher (1 = plain single-process relay)
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", str(os.cpu_count() or 1)))
+# Seconds to wait before restarting a worker that exited
+WORKER_RESTART_S = 1.0
+
+
+def reuseport_socket(host, port):
+    """A listening TCP socket other processes can bind to the same address."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT is not supported on this platform; run a single relay instead")
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+# Function to run one relay worker on a SO_REUSEPORT socket (in the child process)
+def serve_worker(host, port):
+    import uvicorn
+
+    sock = reuseport_socket(host, port)
+    config = uvicorn.Config("whisper:app")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+async def supervise(args):
+    from coordinator import Coordinator
+
+    path = os.getenv("WHISPER_COORDINATOR") or os.path.join(
+        tempfile.gettempdir(), f"whisperlive-relay-{args.port}.sock"
+    )
+    server = await Coordinator().serve(path)
+    # Fail fast (before starting any worker) if the port or SO_REUSEPORT is unusable
+    reuseport_socket(args.host, args.port).close()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    async def worker(index):
+        env = dict(os.environ, WHISPER_COORDINATOR=path, WHISPER_WORKER_ID=str(index))
+        while not stopping.is_set():
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__), "--serve-worker",
+                "--host", args.host, "--port", str(args.port),
+                env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            print(f">>> Relay worker {index} started (pid {proc.pid})")
+            wait = asyncio.create_task(proc.wait())
+            stop = asyncio.create_task(stopping.wait())
+            await asyncio.wait({wait, stop}, return_when=asyncio.FIRST_COMPLETED)
+            if stopping.is_set():
+                proc.terminate()
+                await wait
+                return
+            stop.cancel()
+            print(f"!!! Relay worker {index} exited with {proc.returncode}; restarting")
+            await asyncio.sleep(WORKER_RESTART_S)
+
+    print(f">>> Starting {args.workers} relay workers on {args.host}:{args.port}")
+    await asyncio.gather(*(worker(i) for i in range(args.workers)))
+    server.close()
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the WhisperLive relay as several worker processes.")
+    parser.add_argument("--workers", type=int, default=WHISPER_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--serve-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_worker:
+        serve_worker(args.host, args.port)
+    else:
+        asyncio.run(supervise(args))